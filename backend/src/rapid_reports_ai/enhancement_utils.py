@@ -12,6 +12,8 @@ from functools import wraps
 from types import SimpleNamespace
 from typing import Any, Dict, List, Optional, Tuple
 from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+import httpx
 from pydantic import BaseModel
 from pydantic_ai import RunContext
 
@@ -29,11 +31,32 @@ import hashlib
 _CEREBRAS_MAX_CONCURRENT = int(os.environ.get("CEREBRAS_MAX_CONCURRENT", "4"))
 _cerebras_semaphore = asyncio.Semaphore(_CEREBRAS_MAX_CONCURRENT)
 
+# Pooled HTTP client shared by the Groq and OpenAI-compatible providers (Cerebras,
+# Fireworks) so back-to-back agent runs reuse TCP/TLS connections instead of
+# each provider opening its own. Bound to the event loop that created it.
+_shared_http_client: Optional[httpx.AsyncClient] = None
+_shared_http_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _get_shared_http_client() -> Optional[httpx.AsyncClient]:
+    """Return the pooled client for the running event loop (None outside a loop)."""
+    global _shared_http_client, _shared_http_client_loop
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+    if _shared_http_client is None or _shared_http_client.is_closed or _shared_http_client_loop is not loop:
+        # Same timeouts pydantic-ai uses for its default provider clients
+        _shared_http_client = httpx.AsyncClient(timeout=httpx.Timeout(timeout=600, connect=5))
+        _shared_http_client_loop = loop
+    return _shared_http_client
+
 from perplexity import Perplexity
 from pydantic_ai import Agent
 from pydantic_ai.models.anthropic import AnthropicModel
 from pydantic_ai.models.groq import GroqModel, GroqModelSettings
 from pydantic_ai.models.openai import OpenAIModel
+from pydantic_ai.providers.groq import GroqProvider
 from pydantic_ai.providers.openai import OpenAIProvider
 
 from .enhancement_models import (
@@ -3725,19 +3748,25 @@ def _create_pydantic_model(model_name: str, api_key: str, use_thinking: bool = F
     provider = _get_model_provider(model_name)
     
     if provider == 'groq':
-        return GroqModel(model_name)
+        provider_obj = GroqProvider(
+            api_key=api_key,
+            http_client=_get_shared_http_client(),
+        )
+        return GroqModel(model_name, provider=provider_obj)
     elif provider == 'anthropic':
         return AnthropicModel(model_name)
     elif provider == 'cerebras':
         provider_obj = OpenAIProvider(
             base_url='https://api.cerebras.ai/v1',
             api_key=api_key,
+            http_client=_get_shared_http_client(),
         )
         return OpenAIModel(model_name, provider=provider_obj)
     elif provider == 'fireworks':
         provider_obj = OpenAIProvider(
             base_url='https://api.fireworks.ai/inference/v1',
             api_key=api_key,
+            http_client=_get_shared_http_client(),
         )
         return OpenAIModel(model_name, provider=provider_obj)
     else:
@@ -4780,6 +4809,15 @@ Report:
     return validated_content
 
 
+# ── Template linguistic validation cache ──────────────────────────────────────
+# Keyed by SHA-256 of validator model + rendered prompts (the prompt already
+# carries report content, scan type, section style config and findings context),
+# so re-validating an identical report skips the second LLM hop. Process-local
+# with oldest-first eviction; reset on restart.
+_TEMPLATE_VALIDATION_CACHE: Dict[str, str] = {}
+_TEMPLATE_VALIDATION_CACHE_MAX = 512
+
+
 async def validate_template_linguistics(
     report_content: str,
     template_config: dict,
@@ -4939,6 +4977,14 @@ Preserve all spacing, line breaks, and structural formatting exactly.
         "max_completion_tokens": 6000,  # Sufficient for full reports
     }
     
+    cache_key = hashlib.sha256(
+        "\x1f".join((model_name, system_prompt, user_prompt)).encode()
+    ).hexdigest()
+    cached_content = _TEMPLATE_VALIDATION_CACHE.get(cache_key)
+    if cached_content is not None:
+        print(f"[TEMPLATE LINGUISTIC VALIDATION] ✅ Cache hit - reusing previous validation")
+        return cached_content
+
     print(f"[TEMPLATE LINGUISTIC VALIDATION]   Model settings: temperature=0.3, max_completion_tokens=6000")
     print(f"[TEMPLATE LINGUISTIC VALIDATION] Calling validation model...")
     
@@ -4958,7 +5004,12 @@ Preserve all spacing, line breaks, and structural formatting exactly.
     # Ensure we got valid output
     if not validated_content or len(validated_content) < 50:
         raise ValueError(f"Template linguistic validation returned invalid output (length: {len(validated_content)})")
-    
+
+    if len(_TEMPLATE_VALIDATION_CACHE) >= _TEMPLATE_VALIDATION_CACHE_MAX:
+        oldest = next(iter(_TEMPLATE_VALIDATION_CACHE))
+        del _TEMPLATE_VALIDATION_CACHE[oldest]
+    _TEMPLATE_VALIDATION_CACHE[cache_key] = validated_content
+
     elapsed = time.time() - start_time
     
     # Calculate changes
@@ -665,6 +665,7 @@ class GenerateFindingsContentRequest(BaseModel):
     protocol_details: Optional[str] = None
     content_style: str  # "guided_template", "checklist", "headers", "normal_template", or "structured_template"
     instructions: Optional[str] = None
+    regenerate: bool = False  # Skip the cached result for identical inputs
 
 
 class ExtractPlaceholdersRequest(BaseModel):
@@ -686,6 +687,7 @@ class SuggestInstructionsRequest(BaseModel):
     section: str  # "FINDINGS" or "IMPRESSION"
     scan_type: str
     content_style: Optional[str] = None
+    regenerate: bool = False  # Skip the cached suggestions for identical inputs
 
 
 class AnalyzeReportsRequest(BaseModel):
@@ -922,18 +924,19 @@ async def chat(
         print(f"[DEBUG] Auto report - signature present: {signature_value is not None and signature_value.strip() != ''}")
         print(f"[DEBUG] Auto report - signature length: {len(signature_value) if signature_value else 0}")
         
-        clinical_history = (request.variables or {}).get("CLINICAL_HISTORY", "")
+        request_variables = request.variables or {}
+        clinical_history = request_variables.get("CLINICAL_HISTORY", "")
 
         # ── Fire prefetch pipeline in parallel with report generation ─────────
         _chat_gen_t0 = time.perf_counter()
-        _findings_text = (request.variables or {}).get("FINDINGS", "").strip()
+        _findings_text = request_variables.get("FINDINGS", "").strip()
         if _findings_text and request.use_case:
             _prefetch_id = str(uuid.uuid4())
             _findings_hash = hashlib.sha256(
                 f"{str(current_user.id)}:{_findings_text}".encode()
             ).hexdigest()[:16]
             PREFETCH_INDEX[_findings_hash] = _prefetch_id
-            _scan_type_hint = (request.variables or {}).get("SCAN_TYPE", "")
+            _scan_type_hint = request_variables.get("SCAN_TYPE", "")
             print(
                 f"[FLOW_TIMING] chat: prefetch_scheduled prefetch_id={_prefetch_id} "
                 f"findings_hash={_findings_hash} findings_len={len(_findings_text)}"
@@ -1723,15 +1726,16 @@ async def generate_report_from_template(
         user_inputs = actual_user_inputs
         _tpl_gen_t0 = time.perf_counter()
         # ── Prefetch in parallel with templated report LLM (same as /api/chat) ──
-        _findings_text = (user_inputs.get("FINDINGS") or "").strip() if isinstance(user_inputs, dict) else ""
+        _prefetch_inputs = user_inputs if isinstance(user_inputs, dict) else {}
+        _findings_text = (_prefetch_inputs.get("FINDINGS") or "").strip()
         if _findings_text:
             _prefetch_id = str(uuid.uuid4())
             _findings_hash = hashlib.sha256(
                 f"{str(current_user.id)}:{_findings_text}".encode()
             ).hexdigest()[:16]
             PREFETCH_INDEX[_findings_hash] = _prefetch_id
-            _scan_type_hint = (user_inputs.get("SCAN_TYPE") or "") if isinstance(user_inputs, dict) else ""
-            _clinical = (user_inputs.get("CLINICAL_HISTORY") or "") if isinstance(user_inputs, dict) else ""
+            _scan_type_hint = _prefetch_inputs.get("SCAN_TYPE") or ""
+            _clinical = _prefetch_inputs.get("CLINICAL_HISTORY") or ""
             print(
                 f"[FLOW_TIMING] template_generate: prefetch_scheduled prefetch_id={_prefetch_id} "
                 f"findings_hash={_findings_hash} findings_len={len(_findings_text)}"
@@ -2129,7 +2133,8 @@ async def generate_findings_content_endpoint(
             protocol_details=request.protocol_details or "",
             content_style=request.content_style,
             instructions=request.instructions or "",
-            api_key=api_key
+            api_key=api_key,
+            use_cache=not request.regenerate
         )
         
         return {"success": True, "content": content}
@@ -2155,7 +2160,8 @@ async def suggest_instructions_endpoint(
             section=request.section,
             scan_type=request.scan_type,
             content_style=request.content_style,
-            api_key=api_key
+            api_key=api_key,
+            use_cache=not request.regenerate
         )
         
         return {"success": True, "suggestions": suggestions}
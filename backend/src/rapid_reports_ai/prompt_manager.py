@@ -4,9 +4,14 @@ Loads and manages prompts for different use cases and models
 """
 import os
 import json
-from typing import Dict, Optional
+import re
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional
 from pathlib import Path
 
+# {{VARIABLE_NAME}} placeholders in prompt templates
+_PLACEHOLDER_RE = re.compile(r'\{\{(\w+)\}\}')
+
 
 class PromptManager:
     """Manages prompts for different use cases and models"""
@@ -24,8 +29,9 @@ class PromptManager:
         
         self.prompts_dir = Path(prompts_dir)
         self._prompts_cache = {}
+        self._merged_prompts_cache = {}
     
-    def load_prompt(self, use_case: str, model: str = "default", primary_model: str = None) -> Dict[str, str]:
+    def load_prompt(self, use_case: str, model: str = "default", primary_model: str = None) -> Mapping[str, str]:
         """
         Load a prompt for a specific use case and model
         
@@ -35,7 +41,8 @@ class PromptManager:
             primary_model: Optional primary model identifier (e.g., "gpt-oss-120b") for auto template selection
         
         Returns:
-            Dictionary with template, description, and variables
+            Read-only mapping with template, description, and variables.
+            The same cached mapping is returned for a given metadata/template pair.
         """
         try:
             # New structure: prompts/{use_case}/ directory
@@ -105,13 +112,17 @@ class PromptManager:
             if not template_file.exists():
                 raise FileNotFoundError(f"Template not found for {use_case} with model {model}")
             
-            template_data = self._load_json(template_file)
-            
-            # Merge metadata + template
-            return {
-                **metadata,
-                **template_data
-            }
+            # Merge metadata + template once per file pair
+            cache_key = (metadata_file, template_file)
+            merged = self._merged_prompts_cache.get(cache_key)
+            if merged is None:
+                template_data = self._load_json(template_file)
+                merged = MappingProxyType({
+                    **metadata,
+                    **template_data
+                })
+                self._merged_prompts_cache[cache_key] = merged
+            return merged
         
         except Exception as e:
             raise ValueError(f"Failed to load prompt for {use_case}: {str(e)}")
@@ -134,35 +145,42 @@ class PromptManager:
         Returns:
             List of variable names found in the template
         """
-        import re
         # Find all {{VARIABLE_NAME}} patterns
-        pattern = r'\{\{(\w+)\}\}'
-        variables = re.findall(pattern, template)
-        return list(set(variables))  # Remove duplicates
+        variables = _PLACEHOLDER_RE.findall(template)
+        return list(dict.fromkeys(variables))  # Remove duplicates, keep first-seen order
     
-    def render_prompt(self, prompt: Dict, variables: Dict[str, str] = None) -> str:
+    def render_prompt(self, prompt: Dict, variables: Dict[str, str] = None, strict: bool = False) -> str:
         """
         Render a prompt template with variables
         
         Args:
             prompt: The prompt dictionary from load_prompt
             variables: Variables to substitute in the template
+            strict: If True, placeholders with no matching variable are removed
+                so no stray {{NAME}} reaches the model; otherwise they are left as-is
         
         Returns:
-            Rendered prompt string
+            Rendered prompt string. None values render as empty strings and
+            other non-string values via str().
         """
         if variables is None:
             variables = {}
         
         template = prompt.get('template', '')
-        
-        # Replace {{variable_name}} with actual values
-        try:
-            for var_name, var_value in variables.items():
-                template = template.replace(f'{{{{{var_name}}}}}', var_value)
+
+        # Fully static template (or nothing to substitute) - skip the scan
+        if '{{' not in template or (not variables and not strict):
             return template
-        except KeyError as e:
-            raise ValueError(f"Missing variable in prompt template: {e}")
+
+        variables = {
+            name: value if isinstance(value, str) else ('' if value is None else str(value))
+            for name, value in variables.items()
+        }
+
+        # Replace {{variable_name}} with actual values in a single pass
+        if strict:
+            return _PLACEHOLDER_RE.sub(lambda m: variables.get(m.group(1), ''), template)
+        return _PLACEHOLDER_RE.sub(lambda m: variables.get(m.group(1), m.group(0)), template)
     
     def get_available_use_cases(self, model: str = None) -> list:
         """Get list of all available use cases, optionally filtered by model
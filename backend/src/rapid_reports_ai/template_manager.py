@@ -1,341 +1,194 @@
 """Template Manager for Custom Templates
 Handles custom template operations similar to PromptManager but for user-created templates
 """
+import asyncio
+import hashlib
+import json
 import logging
+import os
 import re
-from typing import Dict, List, Optional, Any
+from collections import Counter
+from dataclasses import dataclass
+from functools import lru_cache
+from types import MappingProxyType, SimpleNamespace
+from typing import Dict, List, Optional, Any, Tuple, Union
+
+from pydantic import BaseModel, ConfigDict
 
 logger = logging.getLogger(__name__)
 
+# Post-generation linguistic validation of template reports; read once at import
+# (.env is loaded by the database package before this module is imported)
+_ENABLE_LINGUISTIC_VALIDATION = os.getenv("ENABLE_ZAI_GLM_LINGUISTIC_VALIDATION", "true").lower() == "true"
+
+# Placeholder patterns for custom and structured templates
+_DOUBLE_BRACE_VARIABLE_RE = re.compile(r'\{\{(\w+)\}\}')  # {{VARIABLE}}
+_VARIABLE_RE = re.compile(r'\{(\w+)\}')  # {VARIABLE}
+_MEASUREMENT_RE = re.compile(r'\b[Xx]{3}\b')  # xxx / XXX measurement slots
+_ALTERNATIVE_RE = re.compile(r'\[([^\]]+?/[^\]]+?)\]')  # [option1/option2]
+# // guidance lines (excluding //UNFILLED: markers); only scanned when '//' occurs
+_INSTRUCTION_RE = re.compile(r'^//\s*(?!UNFILLED:)(.+)$', re.MULTILINE)
+# Validation-only: half-open braces ({VAR / VAR}) and bare word/word alternatives
+_INCOMPLETE_OPEN_RE = re.compile(r'\{[^\s}]+(?!\})')
+_INCOMPLETE_CLOSE_RE = re.compile(r'(?<!\{)[^\s{}]+\}')
+_UNBRACKETED_ALTERNATIVE_RE = re.compile(r'\b([\w-]+(?:/[\w-]+)+)\b')
+_CHECKED_LINE_RE = re.compile(r'^.*[\[\]{}/].*$', re.MULTILINE)  # lines worth validating
+# Slash-separated units that are not [option1/option2] alternatives
+_UNIT_PATTERNS = frozenset({
+    'ml/m2', 'm/s', 'mmhg', 'cm2', 'mm2', 'cm3', 'ml/min', 'kg/m2', 'g/m2', 'l/min',
+    'bpm', 'beats/min', 'ml/m²', 'g/m²', 'l/min/m²',
+})
+
+# JSON recovery from string-mode model responses (report fallback, skill sheets)
+_JSON_FENCED_OBJECT_RE = re.compile(r'```(?:json)?\s*(\{.*?\})\s*```', re.DOTALL)
+_JSON_FENCE_RE = re.compile(r'```(?:json)?\s*([\s\S]*?)```')
+_JSON_OBJECT_RE = re.compile(r'\{.*\}', re.DOTALL)  # outermost { ... } block
+
+# Advanced-config defaults filled in by _normalize_advanced_config (read-only)
+_FINDINGS_ADVANCED_DEFAULTS = MappingProxyType({
+    'instructions': '',
+    'writing_style': 'prose',  # concise or prose
+    'follow_template_style': True,  # Only applies to normal_template and guided_template
+    'format': 'prose',  # prose, bullets
+    'use_subsection_headers': False,  # Standalone: can combine with any format
+    'organization': 'template_order',  # clinical_priority, template_order
+    'measurement_style': 'inline',
+    'negative_findings_style': 'grouped',  # grouped, distributed, minimal, comprehensive
+    'paragraph_grouping': 'by_finding',  # continuous, by_finding, by_region, by_subsection
+    'descriptor_density': 'standard'
+})
+_IMPRESSION_ADVANCED_DEFAULTS = MappingProxyType({
+    'verbosity_style': 'prose',
+    'format': 'prose',  # Frontend key; also canonical for impression_format
+    'impression_format': 'prose',
+    'differential_approach': 'if_needed',  # Frontend key
+    'differential_style': 'if_needed',
+    'comparison_terminology': 'measured',
+    'measurement_inclusion': 'key_only',
+    'incidental_handling': 'action_threshold',
+    'recommendations': {  # Copied per call by _normalize_advanced_config
+        'specialist_referral': True,
+        'further_workup': True,
+        'imaging_followup': False,
+        'clinical_correlation': False
+    },
+    'instructions': ''
+})
+
+# Invariant blocks of the templated report prompt (generate_report_from_config)
+_REPORT_SYSTEM_PROMPT = """You are an expert NHS consultant radiologist. Generate professional radiology reports in British English following NHS standards.
 
-class TemplateManager:
-    """Manages custom user-created templates"""
-    
-    def extract_variables(self, template: str) -> List[str]:
-        """
-        Extract variable names from a template string
-        Looks for {{VARIABLE_NAME}} pattern
-        
-        Args:
-            template: The template string
-            
-        Returns:
-            List of variable names found in the template
-        """
-        # Find all {{VARIABLE_NAME}} patterns
-        pattern = r'\{\{(\w+)\}\}'
-        variables = re.findall(pattern, template)
-        return list(set(variables))  # Remove duplicates
-    
-    def extract_structured_placeholders(self, template: str) -> Dict[str, List[str]]:
-        """
-        Extract placeholders from a structured template.
-        
-        Args:
-            template: The structured template string
-            
-        Returns:
-            Dict with keys:
-            - 'variables': List of {VARIABLE} patterns
-            - 'measurements': List of XXX placeholder locations (case insensitive)
-            - 'alternatives': List of [option1/option2] patterns (with brackets)
-            - 'instructions': List of // instruction lines
-        """
-        # Extract {VARIABLE} patterns (changed from ~VARIABLE~)
-        variables = re.findall(r'\{(\w+)\}', template)
-        
-        # Count XXX measurement placeholders (case insensitive: xxx, XXX, Xxx, etc.)
-        measurements = re.findall(r'\b[Xx]{3}\b', template, re.IGNORECASE)
-        
-        # Extract [option1/option2] alternatives (must have brackets, support spaces and hyphens)
-        # Match anything inside brackets that contains a slash
-        alternatives = re.findall(r'\[([^\]]+?/[^\]]+?)\]', template)
-        
-        # Extract // instruction lines (exclude //UNFILLED: markers)
-        instructions = re.findall(r'^//\s*(?!UNFILLED:)(.+)$', template, re.MULTILINE)
-        
-        return {
-            'variables': list(set(variables)),
-            'measurements': measurements,  # Keep duplicates for count
-            'alternatives': list(set(alternatives)),
-            'instructions': instructions
-        }
-    
-    def validate_structured_template(self, template: str) -> Dict[str, Any]:
-        """
-        Validate a structured template and return errors, warnings, and stats.
-        
-        Args:
-            template: The structured template string
-            
-        Returns:
-            Dict with keys:
-            - 'valid': bool - True if no errors
-            - 'errors': List of error dicts with 'type', 'message', 'line' (optional)
-            - 'warnings': List of warning dicts with 'type', 'message'
-            - 'stats': Dict with 'variables', 'measurements', 'conditionals', 'alternatives' counts
-        """
-        errors = []
-        warnings = []
-        lines = template.split('\n')
-        
-        # Extract stats using existing method
-        placeholders = self.extract_structured_placeholders(template)
-        stats = {
-            'variables': len(placeholders['variables']),
-            'measurements': len(placeholders['measurements']),
-            'alternatives': len(placeholders['alternatives']),
-            'instructions': len(placeholders['instructions'])
-        }
-        
-        # Check for errors (breaks functionality)
-        for i, line in enumerate(lines, 1):
-            # Unbalanced brackets
-            open_brackets = line.count('[')
-            close_brackets = line.count(']')
-            if open_brackets != close_brackets:
-                errors.append({
-                    'type': 'unbalanced_bracket',
-                    'message': f'Unbalanced brackets at line {i}',
-                    'line': i
-                })
-            
-            # Unclosed variables (missing opening or closing brace)
-            # Check for incomplete patterns that aren't part of valid {VAR} patterns
-            if '{' in line or '}' in line:
-                # Find all valid {VAR} patterns and their positions
-                valid_patterns = []
-                for match in re.finditer(r'\{(\w+)\}', line):
-                    valid_patterns.append((match.start(), match.end()))
-                
-                # Find all potential incomplete patterns ({VAR or VAR})
-                incomplete_matches = []
-                # Pattern for {VAR (starts with { but doesn't have closing })
-                for match in re.finditer(r'\{[^\s}]+(?!\})', line):
-                    incomplete_matches.append((match.start(), match.end(), match.group()))
-                # Pattern for VAR} (ends with } but doesn't have opening {)
-                for match in re.finditer(r'(?<!\{)[^\s{}]+\}', line):
-                    incomplete_matches.append((match.start(), match.end(), match.group()))
-                
-                # Filter out incomplete patterns that overlap with valid patterns
-                actual_incomplete = []
-                for inc_start, inc_end, inc_text in incomplete_matches:
-                    overlaps = False
-                    for val_start, val_end in valid_patterns:
-                        # Check if incomplete pattern overlaps with any valid pattern
-                        if not (inc_end <= val_start or inc_start >= val_end):
-                            overlaps = True
-                            break
-                    if not overlaps:
-                        actual_incomplete.append(inc_text)
-                
-                for var in actual_incomplete:
-                    errors.append({
-                        'type': 'unclosed_variable',
-                        'message': f'Unclosed variable "{var}" at line {i}',
-                        'line': i
-                    })
-            
-            # Check for unbracketed alternatives (warn user to use brackets)
-            # Look for word/word patterns that aren't units and aren't already in brackets
-            unit_patterns = {'ml/m2', 'm/s', 'mmhg', 'cm2', 'mm2', 'cm3', 'ml/min', 'kg/m2', 'g/m2', 'l/min', 'bpm', 'beats/min', 'ml/m²', 'g/m²', 'l/min/m²'}
-            
-            # Find all [option1/option2] patterns (already bracketed alternatives)
-            # Support spaces, hyphens, and any characters inside brackets
-            bracketed_ranges = []  # Store (start, end) positions of bracketed alternatives
-            for match in re.finditer(r'\[([^\]]+?/[^\]]+?)\]', line):
-                # Store the character range of the entire bracket pattern including brackets
-                bracketed_ranges.append((match.start(), match.end()))
-            
-            # Find all word/word patterns (including multi-option like word1/word2/word3)
-            # Updated to support hyphens in words: [\w-]+ instead of \w+
-            alternative_pattern = r'\b([\w-]+(?:/[\w-]+)+)\b'
-            for match in re.finditer(alternative_pattern, line):
-                alt_text = match.group(1)
-                alt_start = match.start()
-                alt_end = match.end()
-                
-                # Skip if it's a known unit
-                if alt_text.lower() in unit_patterns:
-                    continue
-                
-                # Skip if this alternative is inside any bracketed alternative range
-                is_inside_brackets = False
-                for br_start, br_end in bracketed_ranges:
-                    # Check if the unbracketed alternative is inside the bracketed range
-                    # (accounting for the brackets themselves)
-                    if br_start < alt_start and alt_end < br_end:
-                        is_inside_brackets = True
-                        break
-                
-                if is_inside_brackets:
-                    continue
-                
-                # Only warn if NOT already bracketed
-                warnings.append({
-                    'type': 'unbracketed_alternative',
-                    'message': f'Alternative "{alt_text}" at line {i} should be wrapped in brackets: [{alt_text}]',
-                    'line': i
-                })
-        
-        # Check for double braces (malformed)
-        if '{{' in template or '}}' in template:
-            errors.append({
-                'type': 'malformed_braces',
-                'message': 'Found double braces ({{ or }}) - did you mean single brace ({VAR})?'
-            })
-        
-        # Check for warnings (UX/quality concerns)
-        if stats['variables'] > 10:
-            warnings.append({
-                'type': 'too_many_variables',
-                'message': f'{stats["variables"]} variables detected - consider reducing to 5-7 for better UX',
-                'count': stats['variables']
-            })
-        
-        # Check for duplicate variable names (count occurrences in original template)
-        all_variables = re.findall(r'\{(\w+)\}', template)
-        variable_counts = {}
-        for var in all_variables:
-            variable_counts[var] = variable_counts.get(var, 0) + 1
-        
-        duplicates = [var for var, count in variable_counts.items() if count > 1]
-        if duplicates:
-            warnings.append({
-                'type': 'duplicate_variables',
-                'message': f'Duplicate variable names found: {", ".join(duplicates)}'
-            })
-        
-        # Check if no placeholders detected (might not be a structured template)
-        total_placeholders = stats['variables'] + stats['measurements'] + stats['alternatives']
-        if total_placeholders == 0 and len(template.strip()) > 0:
-            warnings.append({
-                'type': 'no_placeholders',
-                'message': 'No placeholders detected - this may not be a structured template'
-            })
-        
-        result = {
-            'valid': len(errors) == 0,
-            'errors': errors,
-            'warnings': warnings,
-            'stats': stats,
-            'placeholders': placeholders
-        }
-        return result
-    
-    # ========================================================================
-    # Style Guidance and Normalization
-    # ========================================================================
-    
-    def _normalize_advanced_config(self, advanced: dict, section_type: str = 'findings') -> dict:
-        """
-        Normalize advanced config by filling in defaults for missing fields.
-        Ensures backward compatibility with templates created before new fields.
-        
-        Args:
-            advanced: Current advanced config (may be incomplete)
-            section_type: 'findings' or 'impression'
-        
-        Returns:
-            Complete advanced config with defaults filled in
-        """
-        if section_type == 'findings':
-            defaults = {
-                'instructions': '',
-                'writing_style': 'prose',  # concise or prose
-                'follow_template_style': True,  # Only applies to normal_template and guided_template
-                'format': 'prose',  # prose, bullets
-                'use_subsection_headers': False,  # Standalone: can combine with any format
-                'organization': 'template_order',  # clinical_priority, template_order
-                'measurement_style': 'inline',
-                'negative_findings_style': 'grouped',  # grouped, distributed, minimal, comprehensive
-                'paragraph_grouping': 'by_finding',  # continuous, by_finding, by_region, by_subsection
-                'descriptor_density': 'standard'
-            }
-        else:  # impression
-            defaults = {
-                'verbosity_style': 'prose',
-                'format': 'prose',  # Frontend key; also canonical for impression_format
-                'impression_format': 'prose',
-                'differential_approach': 'if_needed',  # Frontend key
-                'differential_style': 'if_needed',
-                'comparison_terminology': 'measured',
-                'measurement_inclusion': 'key_only',
-                'incidental_handling': 'action_threshold',
-                'recommendations': {
-                    'specialist_referral': True,
-                    'further_workup': True,
-                    'imaging_followup': False,
-                    'clinical_correlation': False
-                },
-                'instructions': ''
-            }
-        
-        # Merge: existing values override defaults
-        merged = {**defaults, **advanced}
-        
-        # BACKWARD COMPATIBILITY: Convert old fields to new structure
-        if section_type == 'impression':
-            # Normalize frontend keys to canonical keys for downstream consumers
-            if 'format' in advanced and 'impression_format' not in advanced:
-                merged['impression_format'] = advanced['format']
-            if 'differential_approach' in advanced:
-                diff_val = advanced['differential_approach']
-                merged['differential_style'] = 'always_brief' if diff_val == 'always' else diff_val
-            # Convert old verbosity (0-2) to new verbosity_style
-            if 'verbosity_style' not in advanced and 'verbosity' in advanced:
-                old_verbosity = advanced.get('verbosity', 0)
-                if old_verbosity == 0:
-                    merged['verbosity_style'] = 'brief'
-                elif old_verbosity == 1:
-                    merged['verbosity_style'] = 'prose'
-                else:  # 2
-                    merged['verbosity_style'] = 'prose'
-        
-        return merged
-    
-    # ========================================================================
-    # Template Content Generation (AI-Powered)
-    # ========================================================================
-    
-    async def generate_findings_content(
-        self,
-        scan_type: str,
-        contrast: str,
-        protocol_details: str,
-        content_style: str,
-        instructions: str = "",
-        api_key: str = None
-    ) -> str:
-        """
-        Generate FINDINGS template content via AI.
-        Uses conditional prompt construction based on content_style for optimal results.
-        
-        Args:
-            scan_type: Type of scan (e.g., "Chest CT")
-            contrast: Contrast protocol
-            protocol_details: Additional protocol details
-            content_style: "normal_template", "guided_template", "checklist", "headers", or "structured_template"
-            instructions: Optional custom instructions
-            api_key: API key for LLM call
-            
-        Returns:
-            Generated template content string
-        """
-        from pydantic import BaseModel
-        from .enhancement_utils import (
-            MODEL_CONFIG,
-            _get_model_provider,
-            _get_api_key_for_provider,
-            _run_agent_with_model,
-        )
+CRITICAL: All output must use British English spelling and terminology.
 
-        class TemplateContentOutput(BaseModel):
-            content: str
-        
-        # Conditional system prompt based on style
-        if content_style == "normal_template":
-            system_prompt = """You are a senior consultant radiologist creating a FINDINGS section template.
+OUTPUT FORMAT: Provide structured JSON with three fields:
+- "report_content": Complete radiology report with proper formatting (line breaks between sections, paragraph structure)
+- "description": Brief 5-15 word summary for history (max 150 chars, exclude scan type)
+- "scan_type": Extract from context (e.g., "CT head non-contrast")
+
+CORE PRINCIPLES:
+- NO hallucination - include ONLY information from provided inputs
+- NO duplication - each finding mentioned once only
+- Protocol consistency - verify findings match scan type/protocol
+- British English throughout
+"""
+
+# TEMPLATE PHILOSOPHY block, picked by whether any section is "Exact" (structured_template)
+_PHILOSOPHY_WITH_EXACT = """
+=== TEMPLATE PHILOSOPHY ===
+This report contains "Flexible" and/or "Structured Fill-In" sections. 
+- FLEXIBLE SECTIONS (Normal, Guided, Checklist, Headers): 
+  • Template provides the organizational framework and style guide
+  • User's style settings control HOW findings are organized and expressed
+  • Each anatomical structure/finding mentioned ONCE only
+  
+- STRUCTURED FILL-IN SECTIONS: 
+  • Preserve template structure and wording precisely
+  • Fill placeholders following // instruction guidance
+  • Minor grammatical adjustments for natural flow only
+  • Do NOT fundamentally change core structure or terminology
+"""
+
+_PHILOSOPHY_FLEXIBLE_ONLY = """
+=== TEMPLATE PHILOSOPHY ===
+All sections in this report are "Flexible".
+- Template provides the organizational framework and style guide
+- User's style settings control HOW findings are organized and expressed  
+- Each anatomical structure/finding mentioned ONCE only
+"""
+
+_OUTPUT_CONSISTENCY_RULE = """
+=== OUTPUT CONSISTENCY RULE ===
+Any section of the output that synthesises, summarises, or concludes from findings above it must remain faithful to the state of those findings. Specifically:
+
+- A synthesising statement must NOT assert normality or completeness for any finding that remains unfilled, unresolved, or marked //UNFILLED: in the body above.
+- A synthesising statement must NOT contradict or flatten any abnormality, augmentation, or pathological selection present in the body above.
+- Where findings are partially documented, the synthesising statement must reflect that partial state rather than defaulting to either normality or abnormality.
+
+This applies to any template section that draws on preceding content — whether labelled Summary, Conclusion, Impression, Assessment, or otherwise.
+"""
+
+# Filled with %-interpolation per request so literal braces in the prose never
+# need escaping; the skeleton itself never changes
+_REPORT_USER_PROMPT = """Generate a radiology report for:
+
+**SCAN TYPE**: %(scan_type)s
+**CONTRAST**: %(contrast)s
+**PROTOCOL**: %(protocol_details)s
+
+%(philosophy_instr)s
+
+=== INPUT DATA ===
+
+**Clinical History**:
+%(clinical_history)s
+
+**Findings**:
+%(findings_input)s
+
+=== SECTION-SPECIFIC GENERATION INSTRUCTIONS ===
+
+%(section_instructions)s
+
+=== OUTPUT TEMPLATE STRUCTURE ===
+
+%(template_string)s
+
+=== GENERATION REQUIREMENTS ===
+
+1. Follow each section's specific instructions above
+2. Maintain section order as shown in template
+3. Use proper formatting (double line breaks between sections)
+4. Ensure report_content contains ONLY the report sections shown in template structure
+5. Clinical History: %(clinical_history_instruction)s
+6. Generate concise description for history tab
+7. Extract accurate scan_type
+8. NO DUPLICATION: Each anatomical structure/finding mentioned once only, regardless of organization method
+
+Generate the report now as valid JSON.
+"""
+
+# Skill-sheet-guided user prompt pieces (_generate_report_skill_sheet_guided)
+_SKILL_SHEET_INPUTS_BLOCK = """## INPUTS
+
+Scan Type: %(scan_type)s
+Clinical History: %(clinical_history)s
+Findings: %(findings_input)s
+
+"""
+
+_SKILL_SHEET_ANTHROPIC_INSTRUCTIONS = """Generate the report now. Output the report content ONLY — no analysis, no commentary, no restatement of the skill sheet. Emit exactly the sections declared in the skill sheet's Structural Pattern, in order.
+
+**Voice.** Write as a consultant dictating clinical observations at pace — each finding a compressed declarative, noun-dense, connective-sparse. Separate observations get separate sentences; a consultant states what is, not what they saw. Hedge only where diagnostic uncertainty is genuine.
+
+**Impression.** Write as a consultant handing over to the referring clinician — they need to know what you concluded and what to do about it, and nothing else. Every sentence earns its place by changing what happens next. The voice is clinical handover: specific, unsentimental, and calibrated by consequence rather than adjective."""
+
+
+# generate_findings_content prompts by content_style; user prompts take
+# %(scan_type)s, %(contrast)s, %(protocol_details)s and %(instructions)s. The
+# request inputs sit just before each closing line so the system prompt and the
+# static rules form a byte-identical prefix that providers can prompt-cache.
+_FINDINGS_SYSTEM_PROMPTS = {
+    "normal_template": """You are a senior consultant radiologist creating a FINDINGS section template.
 
 Generate a SUCCINCT normal findings template - gold standard concise normal statements.
 
@@ -361,10 +214,9 @@ EXAMPLES OF CONCISE VS VERBOSE:
 ❌ VERBOSE: "The pleural spaces are clear with no pleural effusion, pneumothorax, or thickening. The pleural surfaces appear smooth with no pleural plaques or calcifications. The costophrenic angles are sharp with no blunting."
 ✅ CONCISE: "The pleural spaces are clear with no effusion or pneumothorax."
 
-Do NOT include the "FINDINGS:" header - just the template content."""
+Do NOT include the "FINDINGS:" header - just the template content.""",
 
-        elif content_style == "guided_template":
-            system_prompt = """You are a senior consultant radiologist creating a FINDINGS section template.
+    "guided_template": """You are a senior consultant radiologist creating a FINDINGS section template.
 
 Generate a template with normal findings as prose defining the REPORT STRUCTURE, enriched with // contextual annotations.
 
@@ -389,10 +241,9 @@ FORMAT RULES:
 - // lines are contextual enrichers for AI - they will NOT appear in final reports
 - Use British English
 
-Do NOT include the "FINDINGS:" header - just the template content."""
+Do NOT include the "FINDINGS:" header - just the template content.""",
 
-        elif content_style == "checklist":
-            system_prompt = """You are a senior consultant radiologist creating a FINDINGS section template.
+    "checklist": """You are a senior consultant radiologist creating a FINDINGS section template.
 
 Generate a systematic checklist as a bullet-point list of anatomical structures.
 
@@ -403,10 +254,9 @@ FORMAT RULES:
 - AI will generate complete findings covering each item systematically
 - Use British English
 
-Do NOT include the "FINDINGS:" header - just the template content."""
+Do NOT include the "FINDINGS:" header - just the template content.""",
 
-        elif content_style == "headers":
-            system_prompt = """You are a senior consultant radiologist creating a FINDINGS section template.
+    "headers": """You are a senior consultant radiologist creating a FINDINGS section template.
 
 Generate section headers ONLY for anatomical regions.
 
@@ -417,10 +267,9 @@ FORMAT RULES:
 - AI will generate content under each header based on findings
 - Use British English
 
-Do NOT include the "FINDINGS:" header - just the template content."""
+Do NOT include the "FINDINGS:" header - just the template content.""",
 
-        elif content_style == "structured_template":
-            system_prompt = """You are a senior consultant radiologist creating a FINDINGS section template for structured fill-in reporting.
+    "structured_template": """You are a senior consultant radiologist creating a FINDINGS section template for structured fill-in reporting.
 
 CORE PHILOSOPHY:
 Generate templates that read like natural medical prose when filled, not robotic checklists. Balance systematic coverage with efficient, readable language.
@@ -700,20 +549,13 @@ ANTI-PATTERNS TO AVOID:
 ═══════════════════════════════════════════════════════════════════
 
 Now generate the structured fill-in template for the requested study. Focus on natural prose construction and efficient organization. Do NOT include the "FINDINGS:" header - just the template content.
-"""
-        
-        else:
-            # Fallback
-            system_prompt = """You are a senior consultant radiologist creating a FINDINGS section template. Use British English."""
+""",
+}
 
-        # Conditional user prompt based on style
-        if content_style == "normal_template":
-            user_prompt = f"""Create a SUCCINCT NORMAL TEMPLATE for the FINDINGS section.
+_FINDINGS_FALLBACK_SYSTEM_PROMPT = """You are a senior consultant radiologist creating a FINDINGS section template. Use British English."""
 
-Scan Type: {scan_type}
-Contrast: {contrast}
-Protocol: {protocol_details or "Standard protocol"}
-Instructions: {instructions or "Standard systematic anatomical review"}
+_FINDINGS_USER_PROMPTS = {
+    "normal_template": """Create a SUCCINCT NORMAL TEMPLATE for the FINDINGS section.
 
 Write CONCISE, gold-standard normal findings. Brief statements covering all structures. The user will dictate only abnormalities later, and AI will replace the relevant normal statements.
 
@@ -730,15 +572,14 @@ The mediastinum is unremarkable with no lymphadenopathy. The heart is normal in
 
 The visualised upper abdomen is unremarkable.
 
-Generate the CONCISE normal template now. Remember: brevity is key - this is a template, not a comprehensive report."""
+Scan Type: %(scan_type)s
+Contrast: %(contrast)s
+Protocol: %(protocol_details)s
+Instructions: %(instructions)s
 
-        elif content_style == "guided_template":
-            user_prompt = f"""Create a GUIDED TEMPLATE for the FINDINGS section.
+Generate the CONCISE normal template now. Remember: brevity is key - this is a template, not a comprehensive report.""",
 
-Scan Type: {scan_type}
-Contrast: {contrast}
-Protocol: {protocol_details or "Standard protocol"}
-Instructions: {instructions or "Standard systematic anatomical review"}
+    "guided_template": """Create a GUIDED TEMPLATE for the FINDINGS section.
 
 Write template content describing normal findings, with // comment lines providing guidance on what to assess.
 
@@ -758,15 +599,14 @@ The trachea and main bronchi are patent and of normal calibre.
 The lungs are well aerated.
 // Assess: consolidation, ground glass opacities, nodules, masses (with size and location)
 
-Generate the complete guided template now."""
+Scan Type: %(scan_type)s
+Contrast: %(contrast)s
+Protocol: %(protocol_details)s
+Instructions: %(instructions)s
 
-        elif content_style == "checklist":
-            user_prompt = f"""Create a CHECKLIST template for the FINDINGS section.
+Generate the complete guided template now.""",
 
-Scan Type: {scan_type}
-Contrast: {contrast}
-Protocol: {protocol_details or "Standard protocol"}
-Instructions: {instructions or "Standard systematic anatomical review"}
+    "checklist": """Create a CHECKLIST template for the FINDINGS section.
 
 Write a bullet-point checklist of anatomical structures to assess systematically.
 
@@ -779,15 +619,14 @@ Example:
 - Mediastinum (lymph nodes with size, masses, vessels)
 - Heart (size, chambers, pericardial effusion)
 
-Generate the complete checklist now."""
+Scan Type: %(scan_type)s
+Contrast: %(contrast)s
+Protocol: %(protocol_details)s
+Instructions: %(instructions)s
 
-        elif content_style == "headers":
-            user_prompt = f"""Create a HEADERS-ONLY template for the FINDINGS section.
+Generate the complete checklist now.""",
 
-Scan Type: {scan_type}
-Contrast: {contrast}
-Protocol: {protocol_details or "Standard protocol"}
-Instructions: {instructions or "Standard systematic anatomical review"}
+    "headers": """Create a HEADERS-ONLY template for the FINDINGS section.
 
 Write section headers for anatomical regions. Headers only - no content, no guidance.
 
@@ -810,19 +649,18 @@ Mediastinum:
 
 Heart:
 
-Generate the complete headers template now."""
+Scan Type: %(scan_type)s
+Contrast: %(contrast)s
+Protocol: %(protocol_details)s
+Instructions: %(instructions)s
 
-        elif content_style == "structured_template":
-            user_prompt = f"""Create a STRUCTURED FILL-IN TEMPLATE for the FINDINGS section.
+Generate the complete headers template now.""",
 
-Scan Type: {scan_type}
-Contrast: {contrast}
-Protocol: {protocol_details or "Standard protocol"}
-Instructions: {instructions or "Standard systematic anatomical review"}
+    "structured_template": """Create a STRUCTURED FILL-IN TEMPLATE for the FINDINGS section.
 
 CRITICAL PLACEHOLDER RULES:
 
-1. {{VAR}} for named variables (5-7 max critical measurements only)
+1. {VAR} for named variables (5-7 max critical measurements only)
 
 2. xxx for generic measurements (lowercase)
 
@@ -845,74 +683,28 @@ STRUCTURE GUIDANCE:
 - Don't over-complicate with excessive alternatives
 - Focus on clarity and ease of use
 
-Generate the template now. Remember: simplicity and clarity are key."""
+Scan Type: %(scan_type)s
+Contrast: %(contrast)s
+Protocol: %(protocol_details)s
+Instructions: %(instructions)s
 
-        else:
-            # Fallback
-            user_prompt = f"""Create a FINDINGS section template for {scan_type} with {contrast} contrast."""
+Generate the template now. Remember: simplicity and clarity are key.""",
+}
 
-        # Get API key
-        model_name = MODEL_CONFIG["TEMPLATE_FINDINGS_GENERATOR"]
-        if not api_key:
-            provider = _get_model_provider(model_name)
-            api_key = _get_api_key_for_provider(provider)
-        
-        # Call LLM with higher temperature for variety
-        result = await _run_agent_with_model(
-            model_name=model_name,
-            output_type=TemplateContentOutput,
-            system_prompt=system_prompt,
-            user_prompt=user_prompt,
-            api_key=api_key,
-            use_thinking=False,
-            model_settings={
-                "temperature": 0.8,
-                "top_p": 0.9,
-                "max_completion_tokens": 4096
-            }
-        )
-        
-        return result.output.content
-    
-    async def suggest_instructions(
-        self,
-        section: str,
-        scan_type: str,
-        content_style: str = None,
-        api_key: str = None
-    ) -> List[str]:
-        """
-        AI-suggest instructions for FINDINGS or IMPRESSION sections.
-        
-        Args:
-            section: "FINDINGS" or "IMPRESSION"
-            scan_type: Type of scan
-            content_style: Optional content style for FINDINGS
-            api_key: API key for LLM call
-            
-        Returns:
-            List of instruction suggestions
-        """
-        from pydantic import BaseModel
-        from .enhancement_utils import (
-            MODEL_CONFIG,
-            _get_model_provider,
-            _get_api_key_for_provider,
-            _run_agent_with_model,
-        )
+_FINDINGS_FALLBACK_USER_PROMPT = """Create a FINDINGS section template for %(scan_type)s with %(contrast)s contrast."""
 
-        class InstructionsSuggestionsOutput(BaseModel):
-            suggestions: List[str]
-        
-        system_prompt = """You are a senior consultant radiologist suggesting instructions for template sections.
+
+# suggest_instructions prompts by section (anything other than FINDINGS gets the
+# IMPRESSION prompt); user prompts take %(scan_type)s, FINDINGS also %(content_style)s
+_INSTRUCTIONS_SYSTEM_PROMPT = """You are a senior consultant radiologist suggesting instructions for template sections.
 
 Generate 3-5 concise instruction suggestions that guide AI report generation."""
 
-        if section == "FINDINGS":
-            user_prompt = f"""Suggest instructions for FINDINGS section template.
+_INSTRUCTIONS_USER_PROMPTS = {
+    "FINDINGS": """Suggest instructions for FINDINGS section template.
 
-Scan Type: {scan_type}
-Content Style: {content_style or "Not specified"}
+Scan Type: %(scan_type)s
+Content Style: %(content_style)s
 
 Generate 3-5 instruction suggestions (one per line) that would help guide AI generation.
 Examples:
@@ -920,11 +712,11 @@ Examples:
 - "Always comment on lymph nodes"
 - "Group related structures together"
 
-Generate suggestions now."""
-        else:  # IMPRESSION
-            user_prompt = f"""Suggest instructions for IMPRESSION section template.
+Generate suggestions now.""",
 
-Scan Type: {scan_type}
+    "IMPRESSION": """Suggest instructions for IMPRESSION section template.
+
+Scan Type: %(scan_type)s
 
 Generate 3-5 instruction suggestions (one per line) for how the IMPRESSION should be generated.
 Examples:
@@ -932,88 +724,15 @@ Examples:
 - "Include differential if relevant"
 - "Brief recommendations if non-obvious"
 
-Generate suggestions now."""
-
-        # Get API key  
-        model_name = MODEL_CONFIG["TEMPLATE_INSTRUCTION_SUGGESTER"]
-        if not api_key:
-            provider = _get_model_provider(model_name)
-            api_key = _get_api_key_for_provider(provider)
-        
-        result = await _run_agent_with_model(
-            model_name=model_name,
-            output_type=InstructionsSuggestionsOutput,
-            system_prompt=system_prompt,
-            user_prompt=user_prompt,
-            api_key=api_key,
-            use_thinking=False,
-            model_settings={
-                "temperature": 0.7,
-                "top_p": 0.9,
-                "max_completion_tokens": 512
-            }
-        )
-        
-        return result.output.suggestions
-    
-    def _build_detailed_style_guidance(self, advanced: dict, section_type: str = 'findings', template_type: str = None) -> str:
-        """
-        Generate detailed, contextual writing style guidance from metadata.
-        Provides concrete examples for each setting to ensure LLM compliance.
-        
-        Args:
-            advanced: Advanced config dict with style preferences
-            section_type: 'findings' or 'impression'
-            template_type: 'normal_template', 'guided_template', or 'checklist' (optional)
-        
-        Returns:
-            Formatted string with detailed style instructions
-        """
-        guidance_parts = []
-        
-        # Get template type from advanced dict if not passed explicitly
-        if template_type is None:
-            template_type = advanced.get('template_type', 'normal_template')
-        
-        # Check if template fidelity option is available (not for checklist)
-        is_checklist = template_type == 'checklist'
-        follow_template_style = False if is_checklist else advanced.get('follow_template_style', True)
-        template_defines_style = False
-        
-        if not is_checklist:
-            # Template fidelity option available for normal/guided templates
-            if follow_template_style:
-                # Template fidelity mode - principle-based, flexible guidance
-                guidance_parts.append("""WRITING STYLE - TEMPLATE FIDELITY:
-
-Emulate the template's linguistic character:
-  - Observe the template's sentence structure patterns (complete vs. telegraphic vs. mixed)
-  - Match its formality register (formal prose vs. concise clinical notes)
-  - Mirror its use of medical terminology density and descriptor richness
-  - Maintain similar rhythm and flow in phrasing
+Generate suggestions now.""",
+}
 
-Your goal: Write in a voice that feels consistent with the template's established style
-
-Refine for quality:
-  - British English spelling and conventions
-  - Medical terminology accuracy
-  - Grammatical correctness and clarity
-  - Measurement formatting consistency
-
-Example: If template uses formal complete prose like "The liver demonstrates normal echotexture with no focal lesion", continue in that register throughout rather than shifting to telegraphic style.
 
-Principle: Linguistic consistency with template, not rigid constraint. Adapt naturally while maintaining the established voice.""")
-                
-                # Skip the explicit style choice - template defines the style approach
-                template_defines_style = True
-        
-        # Only proceed with style dict if template doesn't define style
-        if not template_defines_style:
-            # WRITING STYLE (merged verbosity + sentence structure for FINDINGS)
-            writing_style = advanced.get('writing_style', 'prose')
-            
-            style_guidance = {
-                'concise': """=== WRITING STYLE: CONCISE ===
+# ── Style-guidance tables ─────────────────────────────────────────────────────
+# Option → guidance text for the findings/impression prompt builders. Built once
+# at import; the builders only look entries up.
+_FINDINGS_WRITING_STYLE_GUIDANCE = MappingProxyType({
+    'concise': """=== WRITING STYLE: CONCISE ===
 
 COMMUNICATION GOAL:
 Rapid consultant-to-consultant reporting. Maximum information density with zero ambiguity.
@@ -1088,8 +807,8 @@ Negatives:
 ✗ "No thrombosis, no portal hypertension, no free fluid" (repetitive)
 
 CRITICAL: Apply this adaptive telegraphic style UNIFORMLY throughout the ENTIRE report - all findings, normal and abnormal.""",
-                
-                'prose': """=== WRITING STYLE: PROSE (Balanced NHS Prose) ===
+
+    'prose': """=== WRITING STYLE: PROSE (Balanced NHS Prose) ===
 
 COMMUNICATION GOAL:
 Natural, readable medical prose. Professional register without unnecessary verbosity.
@@ -1163,25 +882,10 @@ FORBIDDEN PATTERNS:
 - "with no evidence of" → use "no" or "without"
 
 CRITICAL: Apply this balanced prose style UNIFORMLY throughout the ENTIRE report - all findings, normal and abnormal. Aim for natural consultant dictation, not template reading."""
-            }
-            guidance_parts.append(style_guidance.get(writing_style, style_guidance['prose']))
-        
-        # MEASUREMENT STYLE
-        measurement_style = advanced.get('measurement_style', 'inline')
-        if measurement_style == 'inline':
-            guidance_parts.append("MEASUREMENTS - INLINE INTEGRATION:\n  - Integrate measurements directly into descriptors\n  - Example: 'A 4cm spiculated mass...'\n  - NOT: 'A spiculated mass is present, measuring 4cm'")
-        else:
-            guidance_parts.append("MEASUREMENTS - SEPARATE CLAUSES:\n  - Report findings first, measurements after\n  - Example: 'A spiculated mass is present, measuring 4cm in maximum diameter'\n  - NOT: 'A 4cm spiculated mass...'")
-        
-        # ORGANIZATION (how findings are sequenced)
-        organization = advanced.get('organization', 'clinical_priority')
-        
-        # Consolidation: 'problem_oriented' is now merged into 'clinical_priority'
-        if organization == 'problem_oriented':
-            organization = 'clinical_priority'
-            
-        org_guidance = {
-            'clinical_priority': """ORGANIZATION - CLINICAL PRIORITY:
+})
+
+_FINDINGS_ORGANIZATION_GUIDANCE = MappingProxyType({
+    'clinical_priority': """ORGANIZATION - CLINICAL PRIORITY:
   KEY PRINCIPLE: Template structure is your organizational framework. Clinical priority elevates significant findings to lead position.
   
   SEQUENCE: 
@@ -1203,29 +907,18 @@ CRITICAL: Apply this balanced prose style UNIFORMLY throughout the ENTIRE report
   
   IMPORTANT DISTINCTION: This controls ORGANIZATION/STRUCTURE only (what order to report findings). Your LANGUAGE STYLE (how to phrase findings) is controlled by the Writing Style setting above - apply that style uniformly throughout the entire report, regardless of organizational sequence.
 """,
-            
-            'template_order': """ORGANIZATION - TEMPLATE ORDER:
+
+    'template_order': """ORGANIZATION - TEMPLATE ORDER:
   KEY PRINCIPLE: Strictly follow template's defined anatomical sequence
   SEQUENCE: Exact order specified in template (may be custom, not standard anatomical)
   EXAMPLE: If template specifies "Pelvis → Abdomen → Chest", report in that exact order regardless of clinical significance
   
   NOTE: This controls STRUCTURE/SEQUENCE only. Language style is controlled by Writing Style setting - apply uniformly throughout.
 """
-        }
-        guidance_parts.append(org_guidance.get(organization, org_guidance['clinical_priority']))
-        
-        # NEGATIVE FINDINGS HANDLING
-        if follow_template_style:
-            guidance_parts.append("""NEGATIVE FINDINGS - PRESERVE TEMPLATE LANGUAGE:
-  Keep all normal statements exactly as authored in the template.
-  Do not consolidate, rephrase, or group structures differently
-  from how they appear in the template body.
-  Enumerate structures explicitly as the template does — do not
-  collapse named structures into grouped summaries for brevity.""")
-        else:
-            negative_style = advanced.get('negative_findings_style', 'grouped')
-            negative_guidance = {
-                'minimal': """NEGATIVE FINDINGS - PERTINENT ONLY:
+})
+
+_FINDINGS_NEGATIVE_GUIDANCE = MappingProxyType({
+    'minimal': """NEGATIVE FINDINGS - PERTINENT ONLY:
   STRUCTURE: Include ONLY negatives relevant to the abnormality and clinical context
   PRINCIPLE: Adapt negative findings to what's clinically significant given the positive findings
   SEQUENCE: Report negatives that help answer the clinical question or are relevant to staging/assessment
@@ -1236,7 +929,7 @@ CRITICAL: Apply this balanced prose style UNIFORMLY throughout the ENTIRE report
     - Omit routine normals (e.g., "liver normal") if not relevant to clinical question
   
   KEY PRINCIPLE: Clinical relevance determines inclusion, not completeness""",
-                'grouped': """NEGATIVE FINDINGS - GROUPED:
+    'grouped': """NEGATIVE FINDINGS - GROUPED:
   STRUCTURE: Combine related normal structures efficiently in single statements
   PRINCIPLE: Efficient consolidation of normals without excessive verbosity
   SEQUENCE: Group anatomically related structures together
@@ -1247,7 +940,7 @@ CRITICAL: Apply this balanced prose style UNIFORMLY throughout the ENTIRE report
     - "The kidneys and adrenal glands demonstrate no focal abnormality."
   
   KEY PRINCIPLE: Balance between completeness and efficiency""",
-                'comprehensive': """NEGATIVE FINDINGS - COMPREHENSIVE:
+    'comprehensive': """NEGATIVE FINDINGS - COMPREHENSIVE:
   STRUCTURE: Explicit statement for every anatomical system reviewed
   PRINCIPLE: Complete documentation of all normals, regardless of clinical relevance
   SEQUENCE: Systematic coverage of all systems imaged
@@ -1257,61 +950,10 @@ CRITICAL: Apply this balanced prose style UNIFORMLY throughout the ENTIRE report
   
   KEY PRINCIPLE: Complete documentation takes priority over efficiency
   USE CASE: Screening studies, teaching files, medico-legal documentation"""
-            }
-            if negative_style == 'distributed':
-                negative_style = 'comprehensive'
-            guidance_parts.append(negative_guidance.get(negative_style, negative_guidance['grouped']))
-        
-        # DESCRIPTOR DENSITY
-        descriptor = advanced.get('descriptor_density', 'standard')
-        if descriptor == 'sparse':
-            guidance_parts.append("""
-DESCRIPTOR DENSITY - SPARSE:
-  - Use MINIMAL adjectives and descriptors
-  - Include ONLY essential descriptive words
-  - Omit shape, margins, enhancement patterns unless critical
-  - Focus on WHAT it is, not HOW it looks
-  - Applies to POSITIVE FINDINGS ONLY (not negative findings or review structure)
-  
-  EXAMPLES: 'Mass in liver' | 'Nodule in lung' | 'Lesion in kidney'
-  
-  NOTE: This controls adjectives only, independent of writing style (sentence structure/length)
-""")
-        elif descriptor == 'rich':
-            guidance_parts.append("""
-DESCRIPTOR DENSITY - RICH:
-  - Use COMPREHENSIVE adjectives and descriptors
-  - Include shape, margins, enhancement patterns, internal characteristics
-  - Add anatomical precision (segments, stations, regions)
-  - Full morphological characterization
-  - Applies to POSITIVE FINDINGS ONLY (not negative findings or review structure)
-  
-  EXAMPLES: 'Well-defined 4cm ovoid mass in segment 7 of the liver with smooth margins and homogeneous enhancement'
-  
-  NOTE: This controls adjectives only, independent of writing style (sentence structure/length)
-""")
-        else:  # standard
-            guidance_parts.append("""
-DESCRIPTOR DENSITY - STANDARD:
-  - Use BALANCED adjectives and descriptors
-  - Include key characteristics (size, basic shape/margins when relevant)
-  - Omit excessive morphological detail
-  - Standard NHS reporting level
-  - Applies to POSITIVE FINDINGS ONLY (not negative findings or review structure)
-  
-  EXAMPLES: '4cm well-defined mass in liver' | '3cm spiculated nodule in right upper lobe'
-  
-  NOTE: This controls adjectives only, independent of writing style (sentence structure/length)
-""")
-        
-        # PARAGRAPH GROUPING
-        para_grouping = advanced.get('paragraph_grouping', 'by_finding')
-        # Handle backward compatibility: map 'by_subsection' to 'by_region'
-        if para_grouping == 'by_subsection':
-            para_grouping = 'by_region'
-        
-        para_guidance = {
-            'continuous': """PARAGRAPH GROUPING - CONTINUOUS:
+})
+
+_FINDINGS_PARAGRAPH_GUIDANCE = MappingProxyType({
+    'continuous': """PARAGRAPH GROUPING - CONTINUOUS:
   STRUCTURE: One or two long paragraphs for entire findings section
   PRINCIPLE: Flowing continuous prose without paragraph breaks
   SEQUENCE: All findings in continuous text, no visual separation
@@ -1321,8 +963,8 @@ DESCRIPTOR DENSITY - STANDARD:
   
   KEY PRINCIPLE: Single flowing narrative, no paragraph breaks
   USE CASE: Brief reports, rapid dictation""",
-            
-            'by_finding': """PARAGRAPH GROUPING - BY FINDING:
+
+    'by_finding': """PARAGRAPH GROUPING - BY FINDING:
   STRUCTURE: Each significant finding or related group gets its own paragraph
   PRINCIPLE: Break into digestible paragraphs for enhanced readability
   SEQUENCE: Logical groupings by related anatomy or findings
@@ -1336,8 +978,8 @@ DESCRIPTOR DENSITY - STANDARD:
   
   KEY PRINCIPLE: Paragraph breaks enhance readability, group related findings
   USE CASE: Standard reporting, most common approach""",
-            
-            'by_region': """PARAGRAPH GROUPING - BY ANATOMICAL REGION:
+
+    'by_region': """PARAGRAPH GROUPING - BY ANATOMICAL REGION:
   STRUCTURE: Separate paragraph for each major anatomical region/system
   PRINCIPLE: Clear visual separation between anatomical systems
   SEQUENCE: Each paragraph = one anatomical region/system
@@ -1352,19 +994,16 @@ DESCRIPTOR DENSITY - STANDARD:
   KEY PRINCIPLE: Anatomical organization with clear regional separation via paragraph breaks
   USE CASE: Multi-region studies, systematic documentation
   NOTE: This works WITH organization settings - if organization is "systematic", this aligns naturally. Do NOT add headers or colons - use paragraph breaks only."""
-        }
-        guidance_parts.append(para_guidance.get(para_grouping, para_guidance['by_finding']))
-        
-        # FORMAT (presentation style)
-        format_style = advanced.get('format', 'prose')
-        format_guidance = {
-            'prose': """FORMAT - FLOWING PROSE:
+})
+
+_FINDINGS_FORMAT_GUIDANCE = MappingProxyType({
+    'prose': """FORMAT - FLOWING PROSE:
   - Paragraph-based narrative structure
   - Traditional medical prose style
   - Continuous sentences forming paragraphs
   - Use case: Standard reporting, most common""",
-            
-            'bullets': """FORMAT - BULLET POINTS:
+
+    'bullets': """FORMAT - BULLET POINTS:
   - Use bullet points for each discrete finding
   - Each point = one observation
   - Example:
@@ -1372,143 +1011,549 @@ DESCRIPTOR DENSITY - STANDARD:
     • No lymphadenopathy
     • Small pleural effusion
   - Use case: Rapid reporting, structured lists"""
-        }
-        guidance_parts.append(format_guidance.get(format_style, format_guidance['prose']))
-        
-        # SUBSECTION HEADERS (standalone, can combine with any format)
-        use_headers = advanced.get('use_subsection_headers', False)
-        if use_headers:
-            guidance_parts.append("""SUBSECTION HEADERS - ENABLED:
-  - Use explicit anatomical region headers in CAPS (e.g., "CHEST:", "ABDOMEN:", "PLEURA:")
-  - Blank line before each header
-  - Headers followed by content in the selected format (prose/bullets/mixed)
-  - Example with prose:
-    CHEST WALL:
-    No fracture. Soft tissues unremarkable.
-    
-    LUNGS:
-    4cm spiculated mass in RUL. Otherwise clear.
-    
-    PLEURA:
-    Small right pleural effusion.
-  - Example with bullets:
-    CHEST WALL:
-    • No fracture
-    • Soft tissues unremarkable
-    
-    LUNGS:
-    • 4cm spiculated mass in RUL
-    • Otherwise clear
-  - Use case: Structured reports, multi-region studies, teaching files, enhanced readability""")
-        
-        return "\n\n".join(guidance_parts)
-    
-    def _build_impression_prompt_with_structured_evaluation(
-        self,
-        clinical_history: str,
-        advanced: dict,
-        recommendations_config: dict,
-        custom_instructions: str = ''
-    ) -> str:
-        """
-        Build impression prompt with stepwise evaluation workflow.
-        Uses conditional language injection and directive boundaries.
-        
-        This replaces the old flat structure with:
-        - Step 1A: Incidental findings evaluation (conditional)
-        - Step 1B: Recommendations assessment (conditional)
-        - Step 2: Generation with Tier 1 (mandatory) vs Tier 2 (style) hierarchy
-        
-        Args:
-            clinical_history: Clinical question from patient history
-            advanced: Advanced impression config (verbosity, format, etc.)
-            recommendations_config: Dict of enabled recommendation types
-            custom_instructions: Optional custom instructions
-            
-        Returns:
-            Complete prompt string with structured evaluation workflow
-        """
-        prompt_parts = []
-        
-        # === HEADER ===
-        prompt_parts.append(
-            "=== STRUCTURED EVALUATION & GENERATION WORKFLOW ===\n"
-            "\n"
-            "Complete Steps 1A-1B (evaluation), then Step 2 (generation).\n"
-            "\n"
-            f"**Clinical Question** (from history):\n{clinical_history}"
-        )
-        
-        # === STEP 1A: INCIDENTAL FINDINGS FILTER ===
-        incidental_mode = advanced.get('incidental_handling', 'action_threshold')
-        
-        if incidental_mode == 'action_threshold':
-            prompt_parts.append("""
-**STEP 1A: ACTIONABLE INCIDENTAL FILTER**
+})
+
+_IMPRESSION_VERBOSITY_GUIDANCE = MappingProxyType({
+    'brief': (
+        "VERBOSITY STYLE: Brief\n"
+        "\n"
+        "Terse, direct phrasing:\n"
+        "- Strip to essential wording\n"
+        "- Minimal elaboration\n"
+        "- Example: 'Acute appendicitis. No perforation or abscess.'\n"
+        "\n"
+        "Transform verbose phrasing:\n"
+        "✗ 'Acute appendicitis is present without evidence of perforation'\n"
+        "✓ 'Acute appendicitis. No perforation.'"
+    ),
+    'prose': (
+        "VERBOSITY STYLE: Prose\n"
+        "\n"
+        "Balanced sentence structure with natural medical prose:\n"
+        "- Primary diagnosis with confidence level when uncertain\n"
+        "- Basic morphological descriptors when relevant\n"
+        "- Standard NHS reporting style\n"
+        "- Example: 'There is a spiculated mass in the right upper lobe, highly suspicious for primary lung malignancy.'"
+    )
+})
+
+_IMPRESSION_FORMAT_GUIDANCE = MappingProxyType({
+    'prose': "FORMAT: Flowing prose sentences\n- Natural narrative structure",
+    'bullets': "FORMAT: Bullet points\n- Each bullet = one key finding/conclusion\n- Use bullet symbol (•)",
+    'numbered': "FORMAT: Numbered list\n- Numbered items (1., 2., etc.)"
+})
+
+_IMPRESSION_DIFFERENTIAL_GUIDANCE = MappingProxyType({
+    'none': "DIFFERENTIAL DIAGNOSIS:\n- Do NOT include differential diagnosis\n- State primary diagnosis only",
+    'if_needed': "DIFFERENTIAL DIAGNOSIS:\n- Include differential ONLY when diagnosis is uncertain or findings are non-specific\n- Provide 2-3 most likely alternatives with reasoning when needed\n- Skip if diagnosis is clear and definitive",
+    'always': "DIFFERENTIAL DIAGNOSIS:\n- ALWAYS include 2-3 top differential diagnoses\n- Brief mention with most likely listed first",
+    'always_brief': "DIFFERENTIAL DIAGNOSIS:\n- ALWAYS include 2-3 top differential diagnoses\n- Brief mention with most likely listed first",
+    'always_detailed': "DIFFERENTIAL DIAGNOSIS:\n- ALWAYS include comprehensive differential diagnosis\n- List 3-5 possibilities with clinical reasoning for each\n- Discuss distinguishing features and supporting/contradicting findings"
+})
+
+_IMPRESSION_COMPARISON_GUIDANCE = MappingProxyType({
+    'simple': "COMPARISON TERMS:\n- Use descriptive terms: 'larger', 'smaller', 'stable', 'new', 'resolved'\n- No measurements or dates",
+    'measured': "COMPARISON TERMS:\n- Include prior and current measurements when comparing\n- Example: 'increased from 3.2cm to 4cm'",
+    'dated': "COMPARISON TERMS:\n- Include specific dates of prior studies\n- Include measurements and explicit temporal references"
+})
+
+_LEGACY_IMPRESSION_VERBOSITY_GUIDANCE = MappingProxyType({
+    'brief': (
+        "VERBOSITY STYLE: Brief\n"
+        "\n"
+        "HOW TO EXPRESS:\n"
+        "  - Direct, concise diagnostic statements\n"
+        "  - Minimal adjectives (only if essential for diagnosis)\n"
+        "  - Eliminate filler words and verbose phrasing\n"
+        "  - Think: corridor conversation between consultants\n"
+        "\n"
+        "GOOD EXAMPLES:\n"
+        "  - 'Right upper lobe lung mass.'\n"
+        "  - '4cm right upper lobe mass.' (with measurements)\n"
+        "  - 'No acute intracranial abnormality.'\n"
+        "  - '4cm right upper lobe mass. Recommend CT chest staging.' (with recommendations)\n"
+        "\n"
+        "BAD EXAMPLES:\n"
+        "  - 'There is a spiculated mass located in the right upper lobe which appears suspicious...'\n"
+        "  - 'The scan demonstrates no evidence of acute intracranial abnormality with normal brain parenchyma...'"
+    ),
+    'prose': (
+        "VERBOSITY STYLE: Prose\n"
+        "\n"
+        "HOW TO EXPRESS:\n"
+        "  - Balanced sentence structure with natural medical prose\n"
+        "  - Primary diagnosis with confidence level when uncertain ('highly suspicious for', 'consistent with')\n"
+        "  - Basic morphological descriptors when relevant\n"
+        "  - Standard NHS reporting style\n"
+        "\n"
+        "STRUCTURE:\n"
+        "  - Main finding with clinical impression\n"
+        "  - Significant secondary findings (if present)\n"
+        "  - Recommendations/differential as configured\n"
+        "\n"
+        "GOOD EXAMPLE:\n"
+        "  'There is a spiculated mass in the right upper lobe, highly suspicious for primary lung\n"
+        "   malignancy. A small right pleural effusion is present.'"
+    )
+})
+
+_LEGACY_IMPRESSION_FORMAT_GUIDANCE = MappingProxyType({
+    'prose': "FORMAT: Flowing prose sentences\n  - Natural narrative structure\n  - Traditional medical prose style",
+    'bullets': "FORMAT: Bullet points\n  - Each bullet = one key finding/conclusion\n  - Use bullet symbol (•) for each point",
+    'numbered': "FORMAT: Numbered list\n  - Numbered items (1., 2., etc.)\n  - Clear sequential structure"
+})
+
+_LEGACY_IMPRESSION_DIFFERENTIAL_GUIDANCE = MappingProxyType({
+    'none': "DIFFERENTIAL DIAGNOSIS:\n  - Do NOT include differential diagnosis\n  - State primary diagnosis only",
+    'if_needed': "DIFFERENTIAL DIAGNOSIS:\n  - Include differential ONLY when diagnosis is uncertain or findings are non-specific\n  - Provide 2-3 most likely alternatives with reasoning when needed\n  - Skip if diagnosis is clear and definitive",
+    'always': "DIFFERENTIAL DIAGNOSIS:\n  - ALWAYS include 2-3 top differential diagnoses\n  - Brief mention with most likely listed first\n  - Consider imaging findings and clinical context",
+    'always_brief': "DIFFERENTIAL DIAGNOSIS:\n  - ALWAYS include 2-3 top differential diagnoses\n  - Brief mention with most likely listed first\n  - Consider imaging findings and clinical context",
+    'always_detailed': "DIFFERENTIAL DIAGNOSIS:\n  - ALWAYS include comprehensive differential diagnosis\n  - List 3-5 possibilities with clinical reasoning for each\n  - Discuss distinguishing features and supporting/contradicting findings\n  - Order by likelihood based on imaging features"
+})
+
+_LEGACY_IMPRESSION_COMPARISON_GUIDANCE = MappingProxyType({
+    'simple': "COMPARISON TERMS:\n  - Use descriptive terms only: 'larger', 'smaller', 'stable', 'new', 'resolved'\n  - No measurements or dates\n  - Example: 'larger than previously', 'stable compared to prior study'",
+    'measured': "COMPARISON TERMS:\n  - Include prior and current measurements when comparing\n  - Use specific size changes\n  - Example: 'increased from 3.2cm to 4cm', 'decreased from 5cm to 3.5cm'",
+    'dated': "COMPARISON TERMS:\n  - Include specific dates of prior studies\n  - Include measurements and explicit temporal references\n  - Example: 'increased from 3.2cm (15/01/2025) to 4cm on current study'"
+})
+
+@dataclass(frozen=True)
+class _FindingsOrderText:
+    """Organization-dependent lines of a findings-section prompt"""
+    priority_reminder: str
+    anatomical_instr: str
+
+
+_TEMPLATE_ORDER_REMINDER = "**PRIORITY REMINDER**: Template structure takes precedence. The style settings below guide HOW to express findings, not WHAT structure to use."
+_TEMPLATE_ADAPTATION_REMINDER = "**TEMPLATE ADAPTATION**: Emulate the template's language and content, but PRIORITIZE findings according to the organization style below."
+
+# (template style, template_order organization?) -> prompt lines for the
+# _build_findings_prompt_* builders
+_FINDINGS_ORDER_TEXT = MappingProxyType({
+    ('normal_template', True): _FindingsOrderText(
+        priority_reminder=_TEMPLATE_ORDER_REMINDER,
+        anatomical_instr="- Maintain anatomical flow and organization from template",
+    ),
+    ('normal_template', False): _FindingsOrderText(
+        priority_reminder=_TEMPLATE_ADAPTATION_REMINDER,
+        anatomical_instr="- Apply organization style below (see ORGANIZATION guidance)\n- ANTI-DUPLICATION: Each structure mentioned ONCE only\n- If Clinical Priority: Lead with significant findings + immediate context, then return to template structure\n- When returning to template flow, skip any structures already addressed in priority section",
+    ),
+    # Guided templates should maintain their structure - style settings refine
+    # expression, not organization
+    ('guided_template', True): _FindingsOrderText(
+        priority_reminder=_TEMPLATE_ORDER_REMINDER,
+        anatomical_instr="- Follow the template's organizational flow line by line",
+    ),
+    ('guided_template', False): _FindingsOrderText(
+        priority_reminder="**TEMPLATE STRUCTURE**: The prose defines your report structure and flow - follow this line by line. Style settings control HOW to express findings within this structure.",
+        anatomical_instr="- Follow the template's prose structure line by line - it defines your organizational flow\n- Style settings (like Clinical Priority) control emphasis and expression WITHIN each section, not overall reorganization\n- ANTI-DUPLICATION: Each structure mentioned ONCE only\n- Replace normal statements with abnormal findings while maintaining the template's structural sequence",
+    ),
+    ('checklist', True): _FindingsOrderText(
+        priority_reminder=_TEMPLATE_ORDER_REMINDER,
+        anatomical_instr="- Systematically cover each anatomical structure in checklist",
+    ),
+    ('checklist', False): _FindingsOrderText(
+        priority_reminder=_TEMPLATE_ADAPTATION_REMINDER,
+        anatomical_instr="- Apply organization style below (see ORGANIZATION guidance)\n- ANTI-DUPLICATION: Each structure mentioned ONCE only\n- If Clinical Priority: Lead with significant findings + immediate context, then return to template structure\n- When returning to template flow, skip any structures already addressed in priority section",
+    ),
+    ('headers', True): _FindingsOrderText(
+        priority_reminder=_TEMPLATE_ORDER_REMINDER,
+        anatomical_instr="- Fill content under each header based on user findings\n- Leave headers in place, maintain their order",
+    ),
+    ('headers', False): _FindingsOrderText(
+        priority_reminder=_TEMPLATE_ADAPTATION_REMINDER,
+        anatomical_instr="- Fill content under each header based on user findings\n- Apply organization style below (see ORGANIZATION guidance)\n- ANTI-DUPLICATION: Each structure mentioned ONCE only\n- If Clinical Priority: Lead with significant findings + immediate context, then return to template structure\n- When returning to template flow, skip any structures already addressed in priority section",
+    ),
+})
+
+# ── Findings-section prompts ──────────────────────────────────────────────────
+# Bodies of the _build_findings_prompt_* builders, one per template style, filled
+# with %-interpolation per report.
+_NORMAL_TEMPLATE_FINDINGS_PROMPT = """
+### FINDINGS SECTION - Normal Template Mode
+
+%(priority_reminder)s
+
+**Template**: Complete normal findings template provided below
+**Your Task**: Replace ONLY the relevant normal statements with the abnormal findings dictated
+
+**Normal Template**:
+%(template_content)s
+
+**User Dictated Abnormalities**:
+%(findings_input)s
+
+**Critical Instructions**:
+- Keep all normal statements that are NOT contradicted by user findings
+- Replace only the specific normal statements that relate to dictated abnormalities
+%(anatomical_instr)s
+- Do NOT add findings beyond what user dictated
+
+**WRITING STYLE REQUIREMENTS**:
+
+%(style_guidance)s
+%(custom_block)s"""
+
+_GUIDED_TEMPLATE_FINDINGS_PROMPT = """
+### FINDINGS SECTION - Guided Prose Mode
+
+%(priority_reminder)s
+
+**Template Structure**: Prose statements (report structure) + // comment lines (contextual enrichers)
+
+**Template**:
+%(template_content)s
+
+**User Dictated Findings**:
+%(findings_input)s
+
+**Critical Instructions**:
+- The prose lines define your REPORT STRUCTURE - follow this organizational flow line by line
+- Lines starting with '//' are CONTEXTUAL ENRICHERS - like a colleague's annotations explaining what each section assesses and providing principle-based guidance
+- Replace normal prose statements with abnormal findings where applicable, but MAINTAIN the template's structural flow
+- The // comments explain the assessment principles and coverage for each section - they are NOT output text
+%(anatomical_instr)s
+
+**WRITING STYLE REQUIREMENTS**:
+
+%(style_guidance)s
+%(custom_block)s"""
+
+_CHECKLIST_FINDINGS_PROMPT = """
+### FINDINGS SECTION - Checklist Mode
+
+%(priority_reminder)s
+
+**Checklist**:
+%(template_content)s
+
+**User Dictated Findings**:
+%(findings_input)s
+
+**Critical Instructions**:
+%(anatomical_instr)s
+- Integrate user findings where relevant
+- Report normal for structures not mentioned in user findings
+
+**WRITING STYLE REQUIREMENTS**:
+
+%(style_guidance)s
+%(custom_block)s"""
+
+_HEADERS_FINDINGS_PROMPT = """
+### FINDINGS SECTION - Headers Mode
+
+%(priority_reminder)s
+
+**Headers Provided**:
+%(template_content)s
+
+**User Dictated Findings**:
+%(findings_input)s
+
+**Critical Instructions**:
+%(anatomical_instr)s
+
+**WRITING STYLE REQUIREMENTS**:
+
+%(style_guidance)s
+%(custom_block)s"""
+
+_STRUCTURED_TEMPLATE_FINDINGS_PROMPT = """
+### FINDINGS SECTION - Structured Fill-In Mode
+
+**STRICT FIDELITY REQUIRED**: Preserve template structure with absolute precision.
+
+**Structured Template** (PRESERVE EXACTLY):
+```
+%(template_content)s
+```
+
+**User Findings**:
+%(findings_input)s
+
+**PLACEHOLDER FILLING RULES**:
+
+1. {VAR} placeholders:
+   - Search user findings for variable name (e.g., {LVEF} → find "LVEF" or "ejection fraction")
+   - Replace with exact value found
+   - If NOT found in input → LEAVE AS {VAR} (do not fabricate)
+   - **CRITICAL**: Do NOT replace {VAR} with phrases like "not specified", "not provided", "not measured"
+   - The {VAR} placeholder must remain in output for post-processing detection
+
+2. xxx measurements:
+   - Replace with measurements from findings
+   - If measurement not provided → LEAVE AS xxx EXACTLY (do not estimate)
+   - **CRITICAL**: Do NOT replace xxx with phrases like "not specified", "not provided", "not measured"
+   - The xxx placeholder must remain in output for post-processing detection
+   - When a measurement is present in the input but not explicitly labelled or formatted to match the placeholder, apply clinical and contextual inference to determine whether the value can be unambiguously attributed to that placeholder. Consider the surrounding prose, the anatomical or physiological context, the units implied or expected, and the structure of the input as a whole. If attribution is unambiguous through this reasoning, extract and fill the placeholder. Only leave a placeholder unfilled if genuine ambiguity remains after contextual inference — not simply because the input phrasing does not directly mirror the placeholder syntax.
+   
+   UNIT HANDLING:
+   When extracting a measurement to fill an xxx placeholder, the default action is always to fill. Apply the following in order:
 
-Before generating impression, evaluate ALL incidental findings against clinical action criteria.
+   - If the value is present with explicit, matching units — fill directly.
+   - If the value is present but units are absent or ambiguous — fill the numeric value unconditionally, append [units unconfirmed] immediately after the number, and preserve the template's expected unit label. Never leave a placeholder as xxx solely because units are missing or unconfirmed.
+   - If the numeric value itself is genuinely absent or cannot be attributed to the placeholder through any contextual reasoning — only then leave as xxx.
 
-FOR EACH incidental finding in the report, apply this decision rubric:
+   The threshold for leaving a placeholder unfilled is genuine absence of a numeric value, not absence of explicit units. Unit uncertainty is an annotation problem, not a filling problem.
+   
+   WRONG transformations to AVOID:
+   ✗ "diameter xxx mm" → "diameter is not specified"
+   ✗ "diameter xxx mm" → "diameter not provided"  
+   ✗ "diameter xxx mm" → "diameter not measured"
+   ✗ "measuring xxx mm" → "size not documented"
+   
+   CORRECT behavior:
+   ✓ "diameter xxx mm" → "diameter xxx mm" (unchanged if no measurement)
 
-1. CLINICAL ACTION TEST:
-   Q: Does this finding require ANY specific action?
-   - Specific follow-up imaging (with timeline)?
-   - Specialist referral?
-   - Further workup (biopsy, labs)?
-   - Change in management?
-   → If YES to any: INCLUDE in impression
-   → If NO to all: Continue to Test 2
+3. [option1/option2] alternatives:
+   - SELECT the most appropriate option based on findings
+   - Remove brackets, keep selected option only
+   - Example: "[normal/increased]" → "normal" or "increased"
 
-2. MALIGNANT POTENTIAL TEST:
-   Q: Does this finding have concerning features?
-   - Malignant potential (even if low risk)?
-   - Indeterminate features requiring characterization?
-   - Size/characteristics above reporting thresholds (e.g., lung nodule >6mm)?
-   → If YES to any: INCLUDE in impression
-   → If NO to all: Continue to Test 3
+4. // instructions:
+   - Follow guidance during generation WHEN filling content
+   - STRIP all // lines from final output (do not include in report)
+   - IMPORTANT: // instructions guide HOW to describe WHEN input exists, NOT whether to include the section header
 
-3. ESTABLISHED BENIGN PATTERN TEST:
-   Q: Does this match an established benign pattern requiring NO action?
+5. DETAIL AUGMENTATION:
    
-   BENIGN PATTERNS (omit if failing Tests 1 & 2):
-   ✗ Simple cysts (renal, hepatic, ovarian): thin wall, no enhancement, water density
-   ✗ Hepatic steatosis: diffuse pattern, no focal lesion
-   ✗ Asymptomatic gallstones: if known and not causing obstruction
-   ✗ Age-appropriate degenerative changes: no instability or nerve compression
-   ✗ Atherosclerotic calcification: if not causing stenosis
-   ✗ Calcified granulomas: if stable pattern
+   CORE PRINCIPLE:
+   If user provides clinically significant details not captured by template structure,
+   integrate them naturally into the most relevant template section.
    
-   → If YES (established benign) AND failed Tests 1 & 2: EXCLUDE from impression
+   WHEN TO AUGMENT:
+   ✓ Clinical modifiers that affect diagnosis/management
+   ✓ Specific anatomical structures or distributions
+   ✓ Additional measurements or characteristics
+   ✗ Redundant information already in template
+   ✗ Vague descriptions without clinical value
+   ✗ Details contradicting template selections
+   
+   HOW TO INTEGRATE:
+   
+   Use natural medical prose connectors based on context:
+   • "with" - for associated findings or characteristics
+   • "and" - for additional co-existing features
+   • "including" or "via" - for specifications or pathways
+   • "in" - for locations or distributions
+   • Parentheses - for clarifications or classifications
+   
+   When template already uses a connector, avoid repetition:
+   • Template uses "with" + User adds "with" → Use "and" instead
+   • Template uses "including" + User adds "including" → Combine the lists
+   
+   Keep augmentations concise (1-3 additional descriptors maximum).
+   Maintain template's formal prose style.
+   
+   EXAMPLES (across systems):
+   
+   Cardiac:
+   Template: "Left ventricle is dilated"
+   User: "apical thrombus"
+   → "Left ventricle is dilated with apical thrombus"
+   
+   Vascular:
+   Template: "Origin is abnormal"
+   User: "with thrombus"
+   → "Origin is abnormal with thrombus"
+   
+   Template: "...with abnormal origin"
+   User: "with thrombus"
+   → "...with abnormal origin and thrombus"
+   
+   Template: "Collateral vessels are present"
+   User: "arc of Riolan, marginal artery"
+   → "Collateral vessels are present via arc of Riolan and marginal artery"
+   
+   MSK:
+   Template: "Fracture is present"
+   User: "displaced, comminuted, involves articular surface"
+   → "Fracture is present with displacement and comminution involving articular surface"
+   
+   Neuro:
+   Template: "Mass is present"
+   User: "left frontal with mass effect"
+   → "Mass is present in left frontal lobe with mass effect"
+   
+   Default: When uncertain about integration, prioritize template fidelity
 
-DECISION OUTPUT: Create a list of incidental findings to INCLUDE vs EXCLUDE.""")
-        
-        elif incidental_mode == 'comprehensive':
-            prompt_parts.append("""
-**STEP 1A: INCIDENTAL FINDINGS** (Comprehensive mode active)
+6. CONFLICT RESOLUTION:
+   Before finalising any filled section, check that all elements within it are mutually consistent. If an augmentation, additional finding, or user input contradicts the template default selection or sentence, the default must be modified or replaced — not preserved alongside the contradiction.
+   Specifically:
+
+   - If a [option1/option2] selection is contradicted by a finding you are also documenting in the same section, revise the selection to be consistent with that finding, or restructure the sentence so no contradiction exists.
+   - If the template default sentence asserts a normal or neutral state that is directly incompatible with user input, replace that sentence rather than appending to it. Appending is appropriate only when the additional finding coexists with, rather than contradicts, the default state.
+   - If user input contains measurements or values that can be unambiguously attributed to a placeholder through clinical context — even without explicit labelling — extract and fill them. Do not leave a placeholder unfilled solely because the input uses informal phrasing, provided the attribution is clinically unambiguous.
+
+   Contradiction takes priority over template fidelity. An internally inconsistent section is always a greater error than a deviation from template wording.
+
+7. BLANK SECTIONS (no corresponding input):
+   - **CRITICAL RULE**: ALL section headers MUST be preserved in output, regardless of // instructions
+   - **IMPORTANT DISTINCTION**:
+     • If template has alternatives like [present/absent] or [normal/abnormal] AND user input indicates the negative state (e.g., "no LGE", "normal wall motion"):
+       → FILL the section with the appropriate alternative (e.g., "absent", "normal")
+       → Include the section header and filled content
+       → Do NOT flag as //UNFILLED:
+     • Only flag as //UNFILLED: if there is TRULY no information about that section in the user input
+   - **EVEN IF** a // instruction says "only if X" or "describe only if abnormal":
+     • If user input provides information (even if negative/normal), FILL the section appropriately with the correct alternative
+     • Only flag as //UNFILLED: if no input provided at all
+     • The // instruction guides HOW to describe WHEN input exists, not whether to include the section
+   - **OUTPUT FORMAT FOR BLANK SECTIONS**:
+     • When a section has no input, output ONLY: //UNFILLED: [SECTION_NAME]
+     • **CRITICAL**: The //UNFILLED: marker MUST be on its own line (preceded by a newline, followed by a newline)
+     • Do NOT include the section header line above it
+     • Do NOT embed //UNFILLED: in the middle of sentences or paragraphs
+     • Post-processing will handle highlighting and display
+     • Example CORRECT format:
+       ```
+       Some previous content here.
+       
+       //UNFILLED: THROMBUS
+       
+       Next section content.
+       ```
+     • Example INCORRECT format (DO NOT DO THIS):
+       ```
+       Some text //UNFILLED: THROMBUS more text here.
+       ```
+   - Examples:
+     ```
+     // User input: "No LGE"
+     // Template: "LGE is [present/absent]"
+     // CORRECT OUTPUT:
+     LATE GADOLINIUM ENHANCEMENT
+     LGE is absent.
+     
+     // User input: (no mention of thrombus at all)
+     // Template: "// Describe only if thrombus present\nTHROMBUS\n..."
+     // CORRECT OUTPUT:
+     //UNFILLED: THROMBUS
+     
+     // User input: (no mention of aorta)
+     // Template: "AORTA\n..."
+     // CORRECT OUTPUT:
+     //UNFILLED: AORTA
+     ```
+
+**PLACEHOLDER PRESERVATION - CRITICAL**:
+
+When a placeholder cannot be filled from user input:
+- xxx measurements: LEAVE AS "xxx" - do not substitute explanatory text
+- {VAR} variables: LEAVE AS "{VAR}" - do not substitute explanatory text
+
+Post-processing will detect and highlight unfilled placeholders.
+Your job is template filling, not explaining missing data.
+
+Examples of WRONG behavior (do not do this):
+✗ "diameter xxx mm" → "diameter is not specified"
+✗ "LVEF {LVEF}%%" → "LVEF not provided"
+✗ "measuring xxx cm" → "size not documented"
+
+Examples of CORRECT behavior:
+✓ "diameter xxx mm" → "diameter xxx mm" (unchanged)
+✓ "LVEF {LVEF}%%" → "LVEF {LVEF}%%" (unchanged)
+✓ "measuring xxx cm" → "measuring xxx cm" (unchanged)
+
+**CRITICAL FIDELITY RULES**:
+- PRESERVE template structure and wording as much as possible
+- FLEXIBILITY ALLOWED for:
+  • Following // instruction guidance WHEN filling content (e.g., "// Describe only if abnormal" means describe abnormalities if present, but still flag section as UNFILLED if no input)
+  • Adding appropriate descriptors when clinically relevant (e.g., "moderate" for a 40mm mass)
+  • Minor grammatical adjustments for flow
+- STRICT PRESERVATION required for:
+  • Overall template structure and ALL section headers (never omit)
+  • Core sentence structure and medical terminology
+  • Placeholder syntax (until filled)
+- NEVER fabricate measurements or findings not in user input
+- NEVER fundamentally change the template's underlying format
+- NEVER omit section headers, even if // instructions suggest conditional inclusion
+- British English throughout
+
+%(custom_block)s
+
+Generate the FINDINGS section now.
+"""
+
+# ── Hybrid-section prompts ────────────────────────────────────────────────────
+# _build_hybrid_section_prompt bodies: refine or omit a manual section, or
+# auto-generate TECHNIQUE / COMPARISON / LIMITATIONS from metadata and findings.
+_HYBRID_REFINE_INPUT_PROMPT = """
+### %(section_name)s SECTION - Refine Manual Input
+
+**User Input**:
+%(user_input)s
+
+**Task**: Refine into proper medical prose:
+- Expand any abbreviations to full medical terms
+- Fix grammar/vocabulary errors
+- Convert shorthand notes to complete sentences
+- Maintain user's intended meaning
+- Keep concise and professional
+"""
+
+_HYBRID_OMIT_PROMPT = """
+### %(section_name)s SECTION - Omit
+
+No user input provided. Omit this section entirely from output.
+"""
+
+_HYBRID_TECHNIQUE_PROMPT = """
+### %(section_name)s SECTION - Auto-Generate from Metadata
+
+**Scan Information**:
+- Scan Type: %(scan_type)s
+- Contrast: %(contrast)s
+- Protocol: %(protocol_details)s
+
+**Task**: Generate standard technique statement:
+- Brief (1-2 sentences maximum)
+- Standard radiology phrasing
+- Include scan modality, body region, and contrast protocol if relevant
+- Example format: "Non-contrast CT of the head performed on a 64-slice scanner"
+"""
+
+_HYBRID_COMPARISON_PROMPT = """
+### %(section_name)s SECTION - Extract from Findings
+
+**Findings Text**:
+%(findings)s
+
+**Task**: Extract comparison information from findings:
+- Search for mentions of prior imaging/studies
+- Keywords to look for: "previous", "prior", "comparison", "compared with", "stable", "unchanged", "interval", "as before"
+- If found → Extract and format: "Compared with [modality] [region] [date if mentioned]"
+- If NOT found → Output: "No previous imaging available for comparison"
+- Keep to one concise sentence
+"""
+
+_HYBRID_LIMITATIONS_PROMPT = """
+### %(section_name)s SECTION - Extract from Findings
+
+**Findings Text**:
+%(findings)s
+
+**Task**: Extract technical limitations from findings:
+- Search for limitation mentions in findings
+- Keywords: "limited by", "degraded by", "suboptimal", "artifact", "motion", "incomplete", "technically difficult"
+- If limitations found → Extract and state clearly in professional medical prose
+- If NO limitations found → Omit this section entirely (do NOT output "None" or any text)
+"""
 
-Include ALL incidental findings identified in the report, regardless of clinical significance.
-Document both significant and minor incidental findings with appropriate language to indicate relative importance.""")
-        
-        elif incidental_mode == 'omit':
-            prompt_parts.append("""
-**STEP 1A: INCIDENTAL FINDINGS** (Omit mode active)
+# ── Impression recommendation criteria ────────────────────────────────────────
+# Step 1B blocks of the structured impression prompt; the enabled subset of the
+# four criteria (at most 16 combinations) selects the text, so it is cached.
+_RECOMMENDATION_KEYS = ('specialist_referral', 'further_workup', 'imaging_followup', 'clinical_correlation')
 
-Do NOT include any incidental findings in the impression.
-Focus exclusively on findings that address the primary clinical question.
-Incidentals should remain in the Findings section only.""")
-        
-        # === STEP 1B: RECOMMENDATIONS ASSESSMENT ===
-        enabled_recs = {k: v for k, v in recommendations_config.items() if v}
-        
-        if enabled_recs:
-            rec_parts = ["""
+_RECOMMENDATIONS_ASSESSMENT_HEADER = """
 **STEP 1B: RECOMMENDATIONS ASSESSMENT** (Independent evaluation - not affected by verbosity)
 
 For each enabled criterion, evaluate whether findings warrant a specific recommendation:
-"""]
-            
-            if enabled_recs.get('specialist_referral'):
-                rec_parts.append("""
+"""
+
+_RECOMMENDATION_CRITERIA = MappingProxyType({
+    'specialist_referral': """
 SPECIALIST REFERRAL
 When do findings warrant specialist consultation?
 - Urgent/concerning findings requiring immediate specialist input
@@ -1517,10 +1562,8 @@ When do findings warrant specialist consultation?
 
 → If warranted: Include specific specialty and urgency level
    Example: "Urgent respiratory review for massive pulmonary embolism with RV strain"
-""")
-            
-            if enabled_recs.get('further_workup'):
-                rec_parts.append("""
+""",
+    'further_workup': """
 FURTHER WORK-UP
 When are additional investigations needed?
 - Alternative imaging modality would clarify findings
@@ -1529,10 +1572,8 @@ When are additional investigations needed?
 
 → If warranted: Include specific test/modality and rationale
    Example: "PET-CT for staging of lung mass"
-""")
-            
-            if enabled_recs.get('imaging_followup'):
-                rec_parts.append("""
+""",
+    'imaging_followup': """
 IMAGING FOLLOW-UP
 When is interval imaging appropriate?
 - Indeterminate findings requiring stability assessment
@@ -1541,10 +1582,8 @@ When is interval imaging appropriate?
 
 → If warranted: Include modality, timeframe, and indication
    Example: "CT chest in 3 months to assess 8mm nodule"
-""")
-            
-            if enabled_recs.get('clinical_correlation'):
-                rec_parts.append("""
+""",
+    'clinical_correlation': """
 CLINICAL CORRELATION
 When do findings require clinical/laboratory correlation?
 - Imaging findings need symptom correlation
@@ -1554,838 +1593,1282 @@ When do findings require clinical/laboratory correlation?
 → If warranted: Be specific about which tests/parameters
    Example: "Correlate with troponin and BNP for RV strain assessment"
    Avoid generic: "Clinical correlation advised"
-""")
-            
-            rec_parts.append("""
+""",
+})
+
+_RECOMMENDATIONS_DECISION_OUTPUT = """
 DECISION OUTPUT:
 List applicable recommendations with specific wording.
 Aim for actionable, specific language that guides the referring clinician.
 
-CRITICAL: These recommendations are MANDATORY if warranted - they override verbosity settings.""")
-            
-            prompt_parts.append("\n".join(rec_parts))
-        else:
-            prompt_parts.append("""
-**STEP 1B: RECOMMENDATIONS** (All recommendation criteria disabled)
+CRITICAL: These recommendations are MANDATORY if warranted - they override verbosity settings."""
+
+# Flat recommendation bullets for the deprecated _build_impression_recommendations_guidance
+_LEGACY_RECOMMENDATION_GUIDANCE = MappingProxyType({
+    'specialist_referral': (
+        "- Specialist Referral: If findings warrant specialist input, recommend "
+        "appropriate referral with urgency when applicable (e.g., 'Neurosurgical review', "
+        "'Urgent oncology consultation', 'Respiratory assessment')"
+    ),
+    'further_workup': (
+        "- Further Work-up: If additional investigations would be beneficial, recommend "
+        "alternative imaging, biopsy, procedures, or tests (e.g., 'PET-CT for staging', "
+        "'Image-guided biopsy', 'Ultrasound assessment', 'Tissue diagnosis')"
+    ),
+    'imaging_followup': (
+        "- Imaging Follow-up: If appropriate, include follow-up imaging with "
+        "specific modality and timeframe (e.g., 'CT chest in 3 months', 'Repeat MRI in 6 months')"
+    ),
+    'clinical_correlation': (
+        "- Clinical Correlation: If findings require clinical context, recommend "
+        "correlation with SPECIFIC clinical parameters or laboratory tests. "
+        "BE SPECIFIC - state which exact tests or assessments would be helpful. "
+        "AVOID vague statements like 'clinical correlation advised'. "
+        "Examples: 'Correlate with liver function tests (LFTs)', "
+        "'Check renal function and electrolytes', "
+        "'Assess for symptoms of hypercalcemia', "
+        "'Review thyroid function tests', "
+        "'Clinical examination for lymphadenopathy', "
+        "'Correlate with inflammatory markers (CRP, ESR)', "
+        "'Check serum calcium and PTH levels'"
+    ),
+})
+
+
+@lru_cache(maxsize=32)
+def _recommendations_assessment_block(enabled: frozenset) -> str:
+    """Step 1B prompt block for the enabled recommendation criteria (cached per subset)"""
+    rec_parts = [_RECOMMENDATIONS_ASSESSMENT_HEADER]
+    rec_parts.extend(_RECOMMENDATION_CRITERIA[key] for key in _RECOMMENDATION_KEYS if key in enabled)
+    rec_parts.append(_RECOMMENDATIONS_DECISION_OUTPUT)
+    return "\n".join(rec_parts)
+
+
+@lru_cache(maxsize=32)
+def _legacy_recommendations_guidance(enabled: frozenset) -> str:
+    """Flat recommendation guidance for the enabled criteria (cached per subset)"""
+    guidance = [_LEGACY_RECOMMENDATION_GUIDANCE[key] for key in _RECOMMENDATION_KEYS if key in enabled]
+    if not guidance:
+        return "- Do NOT include any recommendations"
+    
+    preamble = (
+        "RECOMMENDATIONS (include if clinically appropriate - be specific, avoid generic phrases):\n"
+    )
+    return preamble + "\n".join(guidance)
 
-Do NOT include recommendations in the impression.""")
-        
-        # === STEP 2: GENERATION WITH TIER SYSTEM ===
-        step2_parts = ["""
-**STEP 2: GENERATE IMPRESSION**
 
-Now generate the impression using:
+# ── Report generation output models ───────────────────────────────────────────
+# Built once at import rather than per report; titles keep the JSON schema sent
+# to the model identical to the former per-call class names.
+class _TemplateReportOutput(BaseModel):
+    model_config = ConfigDict(title="ReportOutput")
 
-INPUT DATA:
-- Primary findings addressing clinical question: """ + clinical_history + """
-- Incidental findings list (from Step 1A evaluation)
-- Recommendations list (from Step 1B evaluation)
+    report_content: str
+    description: str
+    scan_type: str
 
-OUTPUT REQUIREMENTS:
 
-TIER 1 - MANDATORY CONTENT (include regardless of style):"""]
-        
-        # Build Tier 1 content list
-        tier1_items = ["✓ Diagnostic conclusions for primary findings"]
-        
-        if incidental_mode == 'action_threshold':
-            tier1_items.append("✓ Incidental findings from Step 1A (per action_threshold filter)")
-        elif incidental_mode == 'comprehensive':
-            tier1_items.append("✓ ALL incidental findings (comprehensive mode)")
-        
-        if enabled_recs:
-            tier1_items.append(
-                "✓ ALL recommendations identified in Step 1B\n"
-                "  → These are clinical requirements, not stylistic choices\n"
-                "  → Include even if verbosity=brief"
-            )
-        
-        step2_parts.append("\n".join(tier1_items))
-        
-        # Build Tier 2 - Style guidance
-        step2_parts.append("\nTIER 2 - STYLE APPLICATION (controls HOW to express Tier 1 content):\n")
-        
-        # Get style guidance from existing method (reuse the logic)
-        style_guidance = self._build_tier2_style_guidance(advanced)
-        step2_parts.append(style_guidance)
-        
-        # Add critical sequencing reminder
-        step2_parts.append("""
-CRITICAL SEQUENCING:
-1. First, ensure ALL Tier 1 content is present
-2. Then, apply Tier 2 style preferences to expression
-3. Style preferences do NOT remove Tier 1 content - they only control phrasing/structure
+class _ReportDescription(BaseModel):
+    model_config = ConfigDict(title="_Desc")
 
-**COMMITMENT TO DIAGNOSIS**:
-- When imaging findings are definitive, state diagnosis directly using definitive language
-- Use definitive statements (e.g., "X is present", "Y demonstrates Z") rather than hedging when evidence is clear
-- Reserve uncertainty language ("consistent with", "suspicious for") only when findings are truly non-specific
+    description: str
 
-**NO SEPARATE SECTIONS**:
-- The impression section must contain ALL diagnostic conclusions, recommendations, and follow-up guidance within a single unified section
-- DO NOT create separate sections such as "Recommendations", "Plan", "Follow-up", "Management"
-- All recommendations and guidance must be integrated into the impression text itself""")
-        
-        prompt_parts.append("\n".join(step2_parts))
-        
-        # Add custom instructions if provided
-        if custom_instructions and custom_instructions.strip():
-            prompt_parts.append(f"\n**Custom Instructions**: {custom_instructions}")
-        
-        return "\n\n".join(prompt_parts)
-    
-    def _build_tier2_style_guidance(self, advanced: dict) -> str:
-        """
-        Build Tier 2 style guidance (verbosity, format, differential, etc.)
-        Extracted from old _build_impression_style_guidance for reuse.
-        """
-        guidance_parts = []
-        
-        # Verbosity style
-        verbosity_style = advanced.get('verbosity_style', 'prose')
-        
-        # Backward compatibility: map old values
-        if verbosity_style == 'standard':
-            verbosity_style = 'prose'
-        elif verbosity_style == 'detailed':
-            verbosity_style = 'prose'
-        
-        verbosity_map = {
-            'brief': (
-                "VERBOSITY STYLE: Brief\n"
-                "\n"
-                "Terse, direct phrasing:\n"
-                "- Strip to essential wording\n"
-                "- Minimal elaboration\n"
-                "- Example: 'Acute appendicitis. No perforation or abscess.'\n"
-                "\n"
-                "Transform verbose phrasing:\n"
-                "✗ 'Acute appendicitis is present without evidence of perforation'\n"
-                "✓ 'Acute appendicitis. No perforation.'"
-            ),
-            'prose': (
-                "VERBOSITY STYLE: Prose\n"
-                "\n"
-                "Balanced sentence structure with natural medical prose:\n"
-                "- Primary diagnosis with confidence level when uncertain\n"
-                "- Basic morphological descriptors when relevant\n"
-                "- Standard NHS reporting style\n"
-                "- Example: 'There is a spiculated mass in the right upper lobe, highly suspicious for primary lung malignancy.'"
-            )
-        }
-        guidance_parts.append(verbosity_map.get(verbosity_style, verbosity_map['prose']))
-        
-        # Impression format (frontend sends 'format', legacy uses 'impression_format')
-        impression_format = advanced.get('format') or advanced.get('impression_format', 'prose')
-        format_map = {
-            'prose': "FORMAT: Flowing prose sentences\n- Natural narrative structure",
-            'bullets': "FORMAT: Bullet points\n- Each bullet = one key finding/conclusion\n- Use bullet symbol (•)",
-            'numbered': "FORMAT: Numbered list\n- Numbered items (1., 2., etc.)"
-        }
-        guidance_parts.append(format_map.get(impression_format, format_map['prose']))
-        
-        # Differential (frontend sends 'differential_approach' with none/if_needed/always; legacy uses 'differential_style')
-        diff_raw = advanced.get('differential_approach') or advanced.get('differential_style', 'if_needed')
-        differential_style = 'always_brief' if diff_raw == 'always' else diff_raw
-        differential_map = {
-            'none': "DIFFERENTIAL DIAGNOSIS:\n- Do NOT include differential diagnosis\n- State primary diagnosis only",
-            'if_needed': "DIFFERENTIAL DIAGNOSIS:\n- Include differential ONLY when diagnosis is uncertain or findings are non-specific\n- Provide 2-3 most likely alternatives with reasoning when needed\n- Skip if diagnosis is clear and definitive",
-            'always': "DIFFERENTIAL DIAGNOSIS:\n- ALWAYS include 2-3 top differential diagnoses\n- Brief mention with most likely listed first",
-            'always_brief': "DIFFERENTIAL DIAGNOSIS:\n- ALWAYS include 2-3 top differential diagnoses\n- Brief mention with most likely listed first",
-            'always_detailed': "DIFFERENTIAL DIAGNOSIS:\n- ALWAYS include comprehensive differential diagnosis\n- List 3-5 possibilities with clinical reasoning for each\n- Discuss distinguishing features and supporting/contradicting findings"
-        }
-        guidance_parts.append(differential_map.get(differential_style, differential_map['if_needed']))
-        
-        # Comparison terminology
-        comparison = advanced.get('comparison_terminology', 'measured')
-        if comparison == 'conservative':
-            comparison = 'simple'
-        elif comparison == 'explicit':
-            comparison = 'dated'
-        
-        comparison_map = {
-            'simple': "COMPARISON TERMS:\n- Use descriptive terms: 'larger', 'smaller', 'stable', 'new', 'resolved'\n- No measurements or dates",
-            'measured': "COMPARISON TERMS:\n- Include prior and current measurements when comparing\n- Example: 'increased from 3.2cm to 4cm'",
-            'dated': "COMPARISON TERMS:\n- Include specific dates of prior studies\n- Include measurements and explicit temporal references"
-        }
-        guidance_parts.append(comparison_map.get(comparison, comparison_map['measured']))
-        
-        # Measurement inclusion
-        measurements = advanced.get('measurement_inclusion', 'key_only')
-        if measurements == 'none':
-            guidance_parts.append("MEASUREMENTS:\n- Omit measurements from impression\n- Focus on diagnostic interpretation only")
-        elif measurements == 'full':
-            guidance_parts.append("MEASUREMENTS:\n- Repeat critical measurements\n- Include size for all significant findings")
-        else:  # key_only
-            guidance_parts.append("MEASUREMENTS:\n- Include key measurements for significant findings only\n- Example: '4cm mass' but not every dimension")
-        
-        return "\n\n".join(guidance_parts)
+
+# ── Wizard output models ──────────────────────────────────────────────────────
+# Structured outputs of the wizard and skill-sheet helpers; titles match the
+# class names these models had when they were defined inside each call.
+class _TemplateContentOutput(BaseModel):
+    model_config = ConfigDict(title="TemplateContentOutput")
+
+    content: str
+
+
+class _InstructionsSuggestionsOutput(BaseModel):
+    model_config = ConfigDict(title="InstructionsSuggestionsOutput")
+
+    suggestions: List[str]
+
+
+class _CoverageSections(BaseModel):
+    model_config = ConfigDict(title="CoverageSections")
+
+    sections: List[str]
+
+
+# ── Wizard LLM response cache ─────────────────────────────────────────────────
+# generate_findings_content / suggest_instructions results keyed by SHA-256 of
+# model + rendered prompts, so identical wizard requests skip the model round-trip.
+# Free-text inputs are whitespace-normalised first so near-duplicate requests
+# ("CT chest " vs "CT chest") render the same prompt and share an entry.
+# Process-local with oldest-first eviction; reset on restart.
+_WIZARD_RESPONSE_CACHE: Dict[str, Any] = {}
+_WIZARD_RESPONSE_CACHE_MAX = 512
+
+
+def _wizard_cache_key(*parts: Optional[str]) -> str:
+    return hashlib.sha256("\x1f".join(part or "" for part in parts).encode()).hexdigest()
+
+
+def _wizard_cache_store(cache_key: str, value: Any) -> None:
+    if cache_key not in _WIZARD_RESPONSE_CACHE and len(_WIZARD_RESPONSE_CACHE) >= _WIZARD_RESPONSE_CACHE_MAX:
+        oldest = next(iter(_WIZARD_RESPONSE_CACHE))
+        del _WIZARD_RESPONSE_CACHE[oldest]
+    _WIZARD_RESPONSE_CACHE[cache_key] = value
+
+
+def _normalize_wizard_input(text: Optional[str]) -> str:
+    """Trim a free-text wizard input and collapse runs of spaces/tabs, keeping line breaks"""
+    if not text:
+        return ""
+    return "\n".join(" ".join(line.split()) for line in text.strip().splitlines())
+
+
+@lru_cache(maxsize=512)
+def _extract_variables_cached(template: str) -> Tuple[str, ...]:
+    """Unique {{VARIABLE_NAME}} names in a template (cached per template string)"""
+    # Find all {{VARIABLE_NAME}} patterns
+    variables = _DOUBLE_BRACE_VARIABLE_RE.findall(template)
+    return tuple(dict.fromkeys(variables))  # Remove duplicates, keep first-seen order
+
+
+def _freeze_advanced(value: Any) -> Any:
+    """Hashable, order-independent form of an advanced config (nested dicts/lists included)"""
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze_advanced(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze_advanced(item) for item in value)
+    return value
+
+
+@lru_cache(maxsize=256)
+def _detailed_style_guidance_cached(frozen_advanced: tuple, section_type: str, template_type: Optional[str]) -> str:
+    """Style guidance for a frozen advanced config (cached; the same wizard settings repeat across reports)"""
+    return TemplateManager._render_detailed_style_guidance(dict(frozen_advanced), section_type, template_type)
+
+
+@lru_cache(maxsize=128)
+def _structured_placeholders_cached(template: str) -> Dict[str, List[str]]:
+    """Placeholders of a structured template (cached per template string; never handed out directly)"""
+    placeholders, _ = TemplateManager._scan_structured_placeholders(template)
+    return placeholders
+
+
+@lru_cache(maxsize=128)
+def _structured_template_validation_cached(template: str) -> Dict[str, Any]:
+    """Validation result of a structured template (cached per template string; never handed out directly)"""
+    return TemplateManager._run_structured_template_validation(template)
+
+
+def _copy_placeholders(placeholders: Dict[str, List[str]]) -> Dict[str, List[str]]:
+    return {kind: list(items) for kind, items in placeholders.items()}
+
+
+class TemplateManager:
+    """Manages custom user-created templates"""
     
-    def _build_impression_style_guidance(self, advanced: dict) -> str:
-        """
-        DEPRECATED: This method is no longer used.
-        
-        Use _build_impression_prompt_with_structured_evaluation() instead,
-        which provides structured evaluation workflow with Tier 1/Tier 2 hierarchy.
-        
-        This method is kept for backward compatibility only.
-        
-        Generate IMPRESSION-specific style guidance (old flat structure)
+    @staticmethod
+    def extract_variables(template: str) -> List[str]:
         """
-        guidance_parts = []
-        
-        # Verbosity style (replaces old numeric verbosity)
-        verbosity_style = advanced.get('verbosity_style', 'prose')
-        
-        # Backward compatibility: map old values
-        if verbosity_style == 'standard':
-            verbosity_style = 'prose'
-        elif verbosity_style == 'detailed':
-            verbosity_style = 'prose'
-        
-        verbosity_map = {
-            'brief': (
-                "VERBOSITY STYLE: Brief\n"
-                "\n"
-                "HOW TO EXPRESS:\n"
-                "  - Direct, concise diagnostic statements\n"
-                "  - Minimal adjectives (only if essential for diagnosis)\n"
-                "  - Eliminate filler words and verbose phrasing\n"
-                "  - Think: corridor conversation between consultants\n"
-                "\n"
-                "GOOD EXAMPLES:\n"
-                "  - 'Right upper lobe lung mass.'\n"
-                "  - '4cm right upper lobe mass.' (with measurements)\n"
-                "  - 'No acute intracranial abnormality.'\n"
-                "  - '4cm right upper lobe mass. Recommend CT chest staging.' (with recommendations)\n"
-                "\n"
-                "BAD EXAMPLES:\n"
-                "  - 'There is a spiculated mass located in the right upper lobe which appears suspicious...'\n"
-                "  - 'The scan demonstrates no evidence of acute intracranial abnormality with normal brain parenchyma...'"
-            ),
-            'prose': (
-                "VERBOSITY STYLE: Prose\n"
-                "\n"
-                "HOW TO EXPRESS:\n"
-                "  - Balanced sentence structure with natural medical prose\n"
-                "  - Primary diagnosis with confidence level when uncertain ('highly suspicious for', 'consistent with')\n"
-                "  - Basic morphological descriptors when relevant\n"
-                "  - Standard NHS reporting style\n"
-                "\n"
-                "STRUCTURE:\n"
-                "  - Main finding with clinical impression\n"
-                "  - Significant secondary findings (if present)\n"
-                "  - Recommendations/differential as configured\n"
-                "\n"
-                "GOOD EXAMPLE:\n"
-                "  'There is a spiculated mass in the right upper lobe, highly suspicious for primary lung\n"
-                "   malignancy. A small right pleural effusion is present.'"
-            )
-        }
-        guidance_parts.append(verbosity_map.get(verbosity_style, verbosity_map['prose']))
-        
-        # Impression format (frontend sends 'format', legacy uses 'impression_format')
-        impression_format = advanced.get('format') or advanced.get('impression_format', 'prose')
-        format_map = {
-            'prose': "FORMAT: Flowing prose sentences\n  - Natural narrative structure\n  - Traditional medical prose style",
-            'bullets': "FORMAT: Bullet points\n  - Each bullet = one key finding/conclusion\n  - Use bullet symbol (•) for each point",
-            'numbered': "FORMAT: Numbered list\n  - Numbered items (1., 2., etc.)\n  - Clear sequential structure"
-        }
-        guidance_parts.append(format_map.get(impression_format, format_map['prose']))
-        
-        # Differential (frontend sends 'differential_approach' with none/if_needed/always; legacy uses 'differential_style')
-        diff_raw = advanced.get('differential_approach') or advanced.get('differential_style', 'if_needed')
-        differential_style = 'always_brief' if diff_raw == 'always' else diff_raw
-        differential_map = {
-            'none': "DIFFERENTIAL DIAGNOSIS:\n  - Do NOT include differential diagnosis\n  - State primary diagnosis only",
-            'if_needed': "DIFFERENTIAL DIAGNOSIS:\n  - Include differential ONLY when diagnosis is uncertain or findings are non-specific\n  - Provide 2-3 most likely alternatives with reasoning when needed\n  - Skip if diagnosis is clear and definitive",
-            'always': "DIFFERENTIAL DIAGNOSIS:\n  - ALWAYS include 2-3 top differential diagnoses\n  - Brief mention with most likely listed first\n  - Consider imaging findings and clinical context",
-            'always_brief': "DIFFERENTIAL DIAGNOSIS:\n  - ALWAYS include 2-3 top differential diagnoses\n  - Brief mention with most likely listed first\n  - Consider imaging findings and clinical context",
-            'always_detailed': "DIFFERENTIAL DIAGNOSIS:\n  - ALWAYS include comprehensive differential diagnosis\n  - List 3-5 possibilities with clinical reasoning for each\n  - Discuss distinguishing features and supporting/contradicting findings\n  - Order by likelihood based on imaging features"
-        }
-        guidance_parts.append(differential_map.get(differential_style, differential_map['if_needed']))
-        
-        # Comparison terminology
-        comparison = advanced.get('comparison_terminology', 'measured')
-        comparison_map = {
-            'simple': "COMPARISON TERMS:\n  - Use descriptive terms only: 'larger', 'smaller', 'stable', 'new', 'resolved'\n  - No measurements or dates\n  - Example: 'larger than previously', 'stable compared to prior study'",
-            'measured': "COMPARISON TERMS:\n  - Include prior and current measurements when comparing\n  - Use specific size changes\n  - Example: 'increased from 3.2cm to 4cm', 'decreased from 5cm to 3.5cm'",
-            'dated': "COMPARISON TERMS:\n  - Include specific dates of prior studies\n  - Include measurements and explicit temporal references\n  - Example: 'increased from 3.2cm (15/01/2025) to 4cm on current study'"
-        }
-        # Backward compatibility
-        if comparison == 'conservative':
-            comparison = 'simple'
-        elif comparison == 'explicit':
-            comparison = 'dated'
-        guidance_parts.append(comparison_map.get(comparison, comparison_map['measured']))
-        
-        # Measurement inclusion
-        measurements = advanced.get('measurement_inclusion', 'key_only')
-        if measurements == 'none':
-            guidance_parts.append("MEASUREMENTS:\n  - Omit measurements from impression\n  - Focus on diagnostic interpretation only")
-        elif measurements == 'full':
-            guidance_parts.append("MEASUREMENTS:\n  - Repeat critical measurements\n  - Include size for all significant findings")
-        else:  # key_only
-            guidance_parts.append("MEASUREMENTS:\n  - Include key measurements for significant findings only\n  - Example: '4cm mass' but not every dimension")
+        Extract variable names from a template string
+        Looks for {{VARIABLE_NAME}} pattern
         
-        # Incidental handling
-        incidentals = advanced.get('incidental_handling', 'action_threshold')
-        if incidentals == 'omit':
-            guidance_parts.append(
-                "INCIDENTAL FINDINGS:\n"
-                "  - Do NOT include any incidental findings in the impression\n"
-                "  - Focus exclusively on findings that address the primary clinical question\n"
-                "  - Incidentals should remain in the Findings section only\n"
-                "  - This approach is for focused, targeted reporting"
-            )
-        elif incidentals == 'comprehensive':
-            guidance_parts.append(
-                "INCIDENTAL FINDINGS:\n"
-                "  - Include ALL incidental findings in the impression, regardless of clinical significance\n"
-                "  - Document both significant and minor incidental findings\n"
-                "  - Provide comprehensive coverage of all findings identified\n"
-                "  - Use appropriate language to indicate relative importance (e.g., 'Incidental note is made of...')"
-            )
-        else:  # action_threshold
-            guidance_parts.append(
-                "INCIDENTAL FINDINGS (Include if actionable):\n"
-                "  - Include incidental findings ONLY if they meet actionable criteria:\n"
-                "    • Requires specific follow-up imaging.\n"
-                "    • Has malignant potential or concerning features\n"
-                "    • Needs specialist referral or further investigation\n"
-                "    • Requires intervention or specific clinical action\n"
-                "  - OMIT incidental findings that are:\n"
-                "    • Benign and common (e.g., simple renal cysts, degenerative changes)\n"
-                "    • Below action thresholds (e.g., tiny nodules not warranting follow-up)\n"
-                "    • Require no specific follow-up or intervention\n"
-                "  - Decision rule: If the finding doesn't change immediate management or require specific action, omit from impression"
-            )
+        Args:
+            template: The template string
+            
+        Returns:
+            List of variable names found in the template
+        """
+        return list(_extract_variables_cached(template))
+    
+    @staticmethod
+    def extract_structured_placeholders(template: str) -> Dict[str, List[str]]:
+        """
+        Extract placeholders from a structured template.
         
-        return "\n\n".join(guidance_parts)
+        Args:
+            template: The structured template string
+            
+        Returns:
+            Dict with keys:
+            - 'variables': List of {VARIABLE} patterns
+            - 'measurements': List of XXX placeholder locations (case insensitive)
+            - 'alternatives': List of [option1/option2] patterns (with brackets)
+            - 'instructions': List of // instruction lines
+        """
+        return _copy_placeholders(_structured_placeholders_cached(template))
     
-    def _build_impression_recommendations_guidance(self, recommendations_config: dict) -> str:
+    @staticmethod
+    def _scan_structured_placeholders(template: str) -> Tuple[Dict[str, List[str]], List[str]]:
         """
-        DEPRECATED: This method is no longer used.
+        Single scan behind extract_structured_placeholders.
         
-        Use _build_impression_prompt_with_structured_evaluation() instead,
-        which integrates recommendations as Step 1B with MANDATORY criteria evaluation.
+        Returns:
+            Tuple of (placeholders dict, every {VARIABLE} name in order of appearance
+            including repeats) so validation can count duplicates without rescanning.
+        """
+        # Extract {VARIABLE} patterns (changed from ~VARIABLE~)
+        variables = _VARIABLE_RE.findall(template)
         
-        This method is kept for backward compatibility only.
+        # Count XXX measurement placeholders (case insensitive: xxx, XXX, Xxx, etc.)
+        measurements = _MEASUREMENT_RE.findall(template)
         
-        Generate recommendation guidance from multi-checkbox config (old flat structure)
+        # Extract [option1/option2] alternatives (must have brackets, support spaces and hyphens)
+        # Match anything inside brackets that contains a slash
+        alternatives = _ALTERNATIVE_RE.findall(template)
+        
+        # Extract // instruction lines (exclude //UNFILLED: markers); most templates
+        # have none, so the pass only runs when '//' occurs
+        instructions = _INSTRUCTION_RE.findall(template) if '//' in template else []
+        
+        placeholders = {
+            'variables': list(dict.fromkeys(variables)),
+            'measurements': measurements,  # Keep duplicates for count
+            'alternatives': list(dict.fromkeys(alternatives)),
+            'instructions': instructions
+        }
+        return placeholders, variables
+    
+    @staticmethod
+    def validate_structured_template(template: str) -> Dict[str, Any]:
         """
-        guidance = []
+        Validate a structured template and return errors, warnings, and stats.
         
-        if recommendations_config.get('specialist_referral'):
-            guidance.append(
-                "- Specialist Referral: If findings warrant specialist input, recommend "
-                "appropriate referral with urgency when applicable (e.g., 'Neurosurgical review', "
-                "'Urgent oncology consultation', 'Respiratory assessment')"
-            )
+        Args:
+            template: The structured template string
+            
+        Returns:
+            Dict with keys:
+            - 'valid': bool - True if no errors
+            - 'errors': List of error dicts with 'type', 'message', 'line' (optional)
+            - 'warnings': List of warning dicts with 'type', 'message'
+            - 'stats': Dict with 'variables', 'measurements', 'conditionals', 'alternatives' counts
+        """
+        # The editor re-validates unchanged text often; results are cached per
+        # template and callers get their own containers
+        result = _structured_template_validation_cached(template)
+        return {
+            'valid': result['valid'],
+            'errors': [dict(error) for error in result['errors']],
+            'warnings': [dict(warning) for warning in result['warnings']],
+            'stats': dict(result['stats']),
+            'placeholders': _copy_placeholders(result['placeholders'])
+        }
+    
+    @staticmethod
+    def _run_structured_template_validation(template: str) -> Dict[str, Any]:
+        """Uncached validation behind validate_structured_template."""
+        errors = []
+        warnings = []
         
-        if recommendations_config.get('further_workup'):
-            guidance.append(
-                "- Further Work-up: If additional investigations would be beneficial, recommend "
-                "alternative imaging, biopsy, procedures, or tests (e.g., 'PET-CT for staging', "
-                "'Image-guided biopsy', 'Ultrasound assessment', 'Tissue diagnosis')"
-            )
+        # Extract stats (and the raw variable occurrences for duplicate detection)
+        placeholders, all_variables = TemplateManager._scan_structured_placeholders(template)
+        n_variables = len(placeholders['variables'])
+        n_measurements = len(placeholders['measurements'])
+        n_alternatives = len(placeholders['alternatives'])
+        stats = {
+            'variables': n_variables,
+            'measurements': n_measurements,
+            'alternatives': n_alternatives,
+            'instructions': len(placeholders['instructions'])
+        }
         
-        if recommendations_config.get('imaging_followup'):
-            guidance.append(
-                "- Imaging Follow-up: If appropriate, include follow-up imaging with "
-                "specific modality and timeframe (e.g., 'CT chest in 3 months', 'Repeat MRI in 6 months')"
-            )
+        # Check for errors (breaks functionality). Only lines containing a bracket,
+        # brace or slash can produce a finding, so iterate those directly instead of
+        # splitting the whole template; line numbers come from the skipped newlines.
+        # The same finding can repeat within a line ("{A ... {A"); report it once
+        seen_findings = set()
+        i = 1
+        scanned_to = 0
+        # Plain prose templates have none of those characters at all; membership
+        # tests are far cheaper than letting the line regex scan every line
+        if any(char in template for char in '[]{}/'):
+            checked_lines = _CHECKED_LINE_RE.finditer(template)
+        else:
+            checked_lines = ()
+        for line_match in checked_lines:
+            i += template.count('\n', scanned_to, line_match.start())
+            scanned_to = line_match.start()
+            line = line_match.group()
+            # Unbalanced brackets (most lines have none - skip both counts)
+            if ('[' in line or ']' in line) and line.count('[') != line.count(']'):
+                errors.append({
+                    'type': 'unbalanced_bracket',
+                    'message': f'Unbalanced brackets at line {i}',
+                    'line': i
+                })
+            
+            # Unclosed variables (missing opening or closing brace)
+            # Check for incomplete patterns that aren't part of valid {VAR} patterns
+            if '{' in line or '}' in line:
+                # Find all valid {VAR} patterns and their positions
+                valid_patterns = [match.span() for match in _VARIABLE_RE.finditer(line)]
+                
+                # Every reported {VAR / VAR} contains a brace outside the valid spans
+                # (each valid {VAR} holds exactly one of each), so the incomplete-
+                # pattern regexes only run when such a stray brace exists
+                actual_incomplete = []
+                if line.count('{') + line.count('}') > 2 * len(valid_patterns):
+                    # Find all potential incomplete patterns ({VAR or VAR})
+                    incomplete_matches = []
+                    # Pattern for {VAR (starts with { but doesn't have closing })
+                    for match in _INCOMPLETE_OPEN_RE.finditer(line):
+                        incomplete_matches.append((match.start(), match.end(), match.group()))
+                    # Pattern for VAR} (ends with } but doesn't have opening {)
+                    for match in _INCOMPLETE_CLOSE_RE.finditer(line):
+                        incomplete_matches.append((match.start(), match.end(), match.group()))
+                    
+                    # Filter out incomplete patterns that overlap with valid patterns,
+                    # using a bitmap of the characters covered by valid {VAR} spans
+                    if incomplete_matches:
+                        covered = bytearray(len(line))
+                        for val_start, val_end in valid_patterns:
+                            covered[val_start:val_end] = b'\x01' * (val_end - val_start)
+                        actual_incomplete = [
+                            inc_text
+                            for inc_start, inc_end, inc_text in incomplete_matches
+                            if 1 not in covered[inc_start:inc_end]
+                        ]
+                
+                for var in actual_incomplete:
+                    message = f'Unclosed variable "{var}" at line {i}'
+                    if ('unclosed_variable', message) in seen_findings:
+                        continue
+                    seen_findings.add(('unclosed_variable', message))
+                    errors.append({
+                        'type': 'unclosed_variable',
+                        'message': message,
+                        'line': i
+                    })
+            
+            # Check for unbracketed alternatives (warn user to use brackets)
+            # Both alternative patterns need a '/'; lines holding only braces or
+            # brackets skip the two passes
+            if '/' not in line:
+                continue
+            
+            # Look for word/word patterns that aren't units and aren't already in brackets
+            # Find all [option1/option2] patterns (already bracketed alternatives)
+            # Support spaces, hyphens, and any characters inside brackets
+            bracketed_ranges = []  # Store (start, end) positions of bracketed alternatives
+            for match in _ALTERNATIVE_RE.finditer(line):
+                # Store the character range of the entire bracket pattern including brackets
+                bracketed_ranges.append((match.start(), match.end()))
+            
+            # Find all word/word patterns (including multi-option like word1/word2/word3)
+            # Updated to support hyphens in words: [\w-]+ instead of \w+
+            for match in _UNBRACKETED_ALTERNATIVE_RE.finditer(line):
+                alt_text = match.group(1)
+                alt_start = match.start()
+                alt_end = match.end()
+                
+                # Skip if it's a known unit
+                if alt_text.lower() in _UNIT_PATTERNS:
+                    continue
+                
+                # Skip if this alternative is inside any bracketed alternative range
+                is_inside_brackets = False
+                for br_start, br_end in bracketed_ranges:
+                    # Check if the unbracketed alternative is inside the bracketed range
+                    # (accounting for the brackets themselves)
+                    if br_start < alt_start and alt_end < br_end:
+                        is_inside_brackets = True
+                        break
+                
+                if is_inside_brackets:
+                    continue
+                
+                # Only warn if NOT already bracketed (and not already reported)
+                message = f'Alternative "{alt_text}" at line {i} should be wrapped in brackets: [{alt_text}]'
+                if ('unbracketed_alternative', message) in seen_findings:
+                    continue
+                seen_findings.add(('unbracketed_alternative', message))
+                warnings.append({
+                    'type': 'unbracketed_alternative',
+                    'message': message,
+                    'line': i
+                })
         
-        if recommendations_config.get('clinical_correlation'):
-            guidance.append(
-                "- Clinical Correlation: If findings require clinical context, recommend "
-                "correlation with SPECIFIC clinical parameters or laboratory tests. "
-                "BE SPECIFIC - state which exact tests or assessments would be helpful. "
-                "AVOID vague statements like 'clinical correlation advised'. "
-                "Examples: 'Correlate with liver function tests (LFTs)', "
-                "'Check renal function and electrolytes', "
-                "'Assess for symptoms of hypercalcemia', "
-                "'Review thyroid function tests', "
-                "'Clinical examination for lymphadenopathy', "
-                "'Correlate with inflammatory markers (CRP, ESR)', "
-                "'Check serum calcium and PTH levels'"
-            )
+        # Check for double braces (malformed)
+        if '{{' in template or '}}' in template:
+            errors.append({
+                'type': 'malformed_braces',
+                'message': 'Found double braces ({{ or }}) - did you mean single brace ({VAR})?'
+            })
         
-        if not guidance:
-            return "- Do NOT include any recommendations"
+        # Check for warnings (UX/quality concerns)
+        if n_variables > 10:
+            warnings.append({
+                'type': 'too_many_variables',
+                'message': f'{n_variables} variables detected - consider reducing to 5-7 for better UX',
+                'count': n_variables
+            })
         
-        preamble = (
-            "RECOMMENDATIONS (include if clinically appropriate - be specific, avoid generic phrases):\n"
-        )
-        return preamble + "\n".join(guidance)
+        # Check for duplicate variable names (count occurrences in original template);
+        # only needed when there are more occurrences than unique names
+        if len(all_variables) > n_variables:
+            variable_counts = Counter(all_variables)
+            duplicates = [var for var, count in variable_counts.items() if count > 1]
+            warnings.append({
+                'type': 'duplicate_variables',
+                'message': f'Duplicate variable names found: {", ".join(duplicates)}'
+            })
+        
+        # Check if no placeholders detected (might not be a structured template)
+        total_placeholders = n_variables + n_measurements + n_alternatives
+        if total_placeholders == 0 and len(template.strip()) > 0:
+            warnings.append({
+                'type': 'no_placeholders',
+                'message': 'No placeholders detected - this may not be a structured template'
+            })
+        
+        result = {
+            'valid': len(errors) == 0,
+            'errors': errors,
+            'warnings': warnings,
+            'stats': stats,
+            'placeholders': placeholders
+        }
+        return result
+    
+    @staticmethod
+    def validate_structured_templates(templates: List[str]) -> List[Dict[str, Any]]:
+        """
+        Validate several structured templates (e.g. a bulk import).
+        
+        Repeated templates are served from the per-template validation cache,
+        but every position gets its own result dict. The regex work holds the
+        GIL, so this stays single-threaded.
+        
+        Args:
+            templates: Structured template strings
+            
+        Returns:
+            List of validate_structured_template results, in input order
+        """
+        validate = TemplateManager.validate_structured_template
+        return [validate(template) for template in templates]
     
     # ========================================================================
-    # Content-Style-Specific Prompt Builders for FINDINGS
+    # Style Guidance and Normalization
     # ========================================================================
     
-    def _build_findings_prompt_normal_template(
-        self, 
-        template_content: str, 
-        findings_input: str,
-        advanced: dict
-    ) -> str:
-        """
-        For 'normal_template' style: AI replaces relevant normal statements with abnormalities.
-        Template contains complete normal report, user dictates only abnormalities.
-        
-        Style preferences extracted from advanced config metadata.
+    def _normalize_advanced_config(self, advanced: dict, section_type: str = 'findings') -> dict:
         """
-        # Normalize config with defaults for backward compatibility
-        advanced = self._normalize_advanced_config(advanced, section_type='findings')
-        
-        custom_instructions = advanced.get('instructions', '')
+        Normalize advanced config by filling in defaults for missing fields.
+        Ensures backward compatibility with templates created before new fields.
         
-        organization = advanced.get('organization', 'clinical_priority')
-        is_exact_order = organization == 'template_order'
+        Args:
+            advanced: Current advanced config (may be incomplete)
+            section_type: 'findings' or 'impression'
         
-        priority_reminder = (
-            "**PRIORITY REMINDER**: Template structure takes precedence. The style settings below guide HOW to express findings, not WHAT structure to use."
-            if is_exact_order else
-            "**TEMPLATE ADAPTATION**: Emulate the template's language and content, but PRIORITIZE findings according to the organization style below."
-        )
+        Returns:
+            Complete advanced config with defaults filled in
+        """
+        defaults = _FINDINGS_ADVANCED_DEFAULTS if section_type == 'findings' else _IMPRESSION_ADVANCED_DEFAULTS
         
-        anatomical_instr = (
-            "- Maintain anatomical flow and organization from template"
-            if is_exact_order else
-            "- Apply organization style below (see ORGANIZATION guidance)\n- ANTI-DUPLICATION: Each structure mentioned ONCE only\n- If Clinical Priority: Lead with significant findings + immediate context, then return to template structure\n- When returning to template flow, skip any structures already addressed in priority section"
-        )
-
-        prompt = f"""
-### FINDINGS SECTION - Normal Template Mode
-
-{priority_reminder}
-
-**Template**: Complete normal findings template provided below
-**Your Task**: Replace ONLY the relevant normal statements with the abnormal findings dictated
-
-**Normal Template**:
-{template_content}
-
-**User Dictated Abnormalities**:
-{findings_input}
-
-**Critical Instructions**:
-- Keep all normal statements that are NOT contradicted by user findings
-- Replace only the specific normal statements that relate to dictated abnormalities
-{anatomical_instr}
-- Do NOT add findings beyond what user dictated
-
-**WRITING STYLE REQUIREMENTS**:
-
-{self._build_detailed_style_guidance(advanced, section_type='findings', template_type='normal_template')}
-"""
+        # Merge: existing values override defaults (copy() of the read-only
+        # prototype is a plain dict copy; ** unpacking a proxy is much slower)
+        merged = defaults.copy()
+        merged.update(advanced)
+        # The nested recommendations default is shared; give callers their own dict
+        if 'recommendations' in defaults and 'recommendations' not in advanced:
+            merged['recommendations'] = dict(merged['recommendations'])
         
-        if custom_instructions:
-            prompt += f"\n\n**Custom Instructions**: {custom_instructions}"
+        # BACKWARD COMPATIBILITY: Convert old fields to new structure
+        if section_type == 'impression':
+            # Normalize frontend keys to canonical keys for downstream consumers
+            if 'format' in advanced and 'impression_format' not in advanced:
+                merged['impression_format'] = advanced['format']
+            if 'differential_approach' in advanced:
+                diff_val = advanced['differential_approach']
+                merged['differential_style'] = 'always_brief' if diff_val == 'always' else diff_val
+            # Convert old verbosity (0-2) to new verbosity_style
+            if 'verbosity_style' not in advanced and 'verbosity' in advanced:
+                old_verbosity = advanced.get('verbosity', 0)
+                if old_verbosity == 0:
+                    merged['verbosity_style'] = 'brief'
+                elif old_verbosity == 1:
+                    merged['verbosity_style'] = 'prose'
+                else:  # 2
+                    merged['verbosity_style'] = 'prose'
         
-        return prompt
+        return merged
     
-    def _build_findings_prompt_guided_template(
-        self, 
-        template_content: str, 
-        findings_input: str,
-        advanced: dict
+    # ========================================================================
+    # Template Content Generation (AI-Powered)
+    # ========================================================================
+    
+    async def generate_findings_content(
+        self,
+        scan_type: str,
+        contrast: str,
+        protocol_details: str,
+        content_style: str,
+        instructions: str = "",
+        api_key: str = None,
+        use_cache: bool = True
     ) -> str:
         """
-        For 'guided_template' style: Template has content + // comment guidance.
-        The prose defines report structure; // comments are contextual enrichers.
-        Style preferences extracted from advanced config metadata.
+        Generate FINDINGS template content via AI.
+        Uses conditional prompt construction based on content_style for optimal results.
+        
+        Args:
+            scan_type: Type of scan (e.g., "Chest CT")
+            contrast: Contrast protocol
+            protocol_details: Additional protocol details
+            content_style: "normal_template", "guided_template", "checklist", "headers", or "structured_template"
+            instructions: Optional custom instructions
+            api_key: API key for LLM call
+            use_cache: Reuse the result of an identical earlier request. Pass False to
+                force a fresh generation (e.g. "AI Regenerate"); the new result replaces
+                the cached one.
+            
+        Returns:
+            Generated template content string
         """
-        # Normalize config with defaults for backward compatibility
-        advanced = self._normalize_advanced_config(advanced, section_type='findings')
+        from .enhancement_utils import (
+            MODEL_CONFIG,
+            _get_model_provider,
+            _get_api_key_for_provider,
+            _run_agent_with_model,
+        )
         
-        custom_instructions = advanced.get('instructions', '')
+        # Prompts selected by style
+        system_prompt = _FINDINGS_SYSTEM_PROMPTS.get(content_style, _FINDINGS_FALLBACK_SYSTEM_PROMPT)
+        user_prompt = _FINDINGS_USER_PROMPTS.get(content_style, _FINDINGS_FALLBACK_USER_PROMPT) % {
+            'scan_type': _normalize_wizard_input(scan_type),
+            'contrast': _normalize_wizard_input(contrast),
+            'protocol_details': _normalize_wizard_input(protocol_details) or "Standard protocol",
+            'instructions': _normalize_wizard_input(instructions) or "Standard systematic anatomical review",
+        }
+
+        model_name = MODEL_CONFIG["TEMPLATE_FINDINGS_GENERATOR"]
+        cache_key = _wizard_cache_key("findings", model_name, system_prompt, user_prompt)
+        if use_cache and cache_key in _WIZARD_RESPONSE_CACHE:
+            return _WIZARD_RESPONSE_CACHE[cache_key]
         
-        organization = advanced.get('organization', 'clinical_priority')
-        is_exact_order = organization == 'template_order'
+        # Get API key
+        if not api_key:
+            provider = _get_model_provider(model_name)
+            api_key = _get_api_key_for_provider(provider)
         
-        # For guided templates, emphasize template structure preservation
-        priority_reminder = (
-            "**PRIORITY REMINDER**: Template structure takes precedence. The style settings below guide HOW to express findings, not WHAT structure to use."
-            if is_exact_order else
-            "**TEMPLATE STRUCTURE**: The prose defines your report structure and flow - follow this line by line. Style settings control HOW to express findings within this structure."
+        # Call LLM with higher temperature for variety
+        result = await _run_agent_with_model(
+            model_name=model_name,
+            output_type=_TemplateContentOutput,
+            system_prompt=system_prompt,
+            user_prompt=user_prompt,
+            api_key=api_key,
+            use_thinking=False,
+            model_settings={
+                "temperature": 0.8,
+                "top_p": 0.9,
+                "max_completion_tokens": 4096
+            }
         )
         
-        # Guided templates should maintain their structure - style settings refine expression, not organization
-        anatomical_instr = (
-            "- Follow the template's organizational flow line by line"
-            if is_exact_order else
-            "- Follow the template's prose structure line by line - it defines your organizational flow\n- Style settings (like Clinical Priority) control emphasis and expression WITHIN each section, not overall reorganization\n- ANTI-DUPLICATION: Each structure mentioned ONCE only\n- Replace normal statements with abnormal findings while maintaining the template's structural sequence"
+        _wizard_cache_store(cache_key, result.output.content)
+        return result.output.content
+    
+    async def suggest_instructions(
+        self,
+        section: str,
+        scan_type: str,
+        content_style: str = None,
+        api_key: str = None,
+        use_cache: bool = True
+    ) -> List[str]:
+        """
+        AI-suggest instructions for FINDINGS or IMPRESSION sections.
+        
+        Args:
+            section: "FINDINGS" or "IMPRESSION"
+            scan_type: Type of scan
+            content_style: Optional content style for FINDINGS
+            api_key: API key for LLM call
+            use_cache: Reuse the suggestions of an identical earlier request
+            
+        Returns:
+            List of instruction suggestions
+        """
+        from .enhancement_utils import (
+            MODEL_CONFIG,
+            _get_model_provider,
+            _get_api_key_for_provider,
+            _run_agent_with_model,
         )
 
-        prompt = f"""
-### FINDINGS SECTION - Guided Prose Mode
-
-{priority_reminder}
-
-**Template Structure**: Prose statements (report structure) + // comment lines (contextual enrichers)
-
-**Template**:
-{template_content}
-
-**User Dictated Findings**:
-{findings_input}
-
-**Critical Instructions**:
-- The prose lines define your REPORT STRUCTURE - follow this organizational flow line by line
-- Lines starting with '//' are CONTEXTUAL ENRICHERS - like a colleague's annotations explaining what each section assesses and providing principle-based guidance
-- Replace normal prose statements with abnormal findings where applicable, but MAINTAIN the template's structural flow
-- The // comments explain the assessment principles and coverage for each section - they are NOT output text
-{anatomical_instr}
-
-**WRITING STYLE REQUIREMENTS**:
+        scan_type = _normalize_wizard_input(scan_type)
+        
+        system_prompt = _INSTRUCTIONS_SYSTEM_PROMPT
+        user_prompt = _INSTRUCTIONS_USER_PROMPTS.get(section, _INSTRUCTIONS_USER_PROMPTS["IMPRESSION"]) % {
+            'scan_type': scan_type,
+            'content_style': content_style or "Not specified",
+        }
 
-{self._build_detailed_style_guidance(advanced, section_type='findings', template_type='guided_template')}
-"""
+        model_name = MODEL_CONFIG["TEMPLATE_INSTRUCTION_SUGGESTER"]
+        cache_key = _wizard_cache_key("instructions", model_name, system_prompt, user_prompt)
+        if use_cache and cache_key in _WIZARD_RESPONSE_CACHE:
+            return list(_WIZARD_RESPONSE_CACHE[cache_key])
+        
+        # Get API key  
+        if not api_key:
+            provider = _get_model_provider(model_name)
+            api_key = _get_api_key_for_provider(provider)
         
-        if custom_instructions:
-            prompt += f"\n\n**Custom Instructions**: {custom_instructions}"
+        result = await _run_agent_with_model(
+            model_name=model_name,
+            output_type=_InstructionsSuggestionsOutput,
+            system_prompt=system_prompt,
+            user_prompt=user_prompt,
+            api_key=api_key,
+            use_thinking=False,
+            model_settings={
+                "temperature": 0.7,
+                "top_p": 0.9,
+                "max_completion_tokens": 512
+            }
+        )
         
-        return prompt
+        _wizard_cache_store(cache_key, tuple(result.output.suggestions))
+        return result.output.suggestions
     
-    def _build_findings_prompt_checklist(
-        self, 
-        template_content: str, 
-        findings_input: str,
-        advanced: dict
-    ) -> str:
-        """
-        For 'checklist' style: Bullet point list to expand systematically.
-        Style preferences extracted from advanced config metadata.
+    @staticmethod
+    def _build_detailed_style_guidance(advanced: dict, section_type: str = 'findings', template_type: str = None) -> str:
         """
-        # Normalize config with defaults for backward compatibility
-        advanced = self._normalize_advanced_config(advanced, section_type='findings')
+        Generate detailed, contextual writing style guidance from metadata.
+        Provides concrete examples for each setting to ensure LLM compliance.
         
-        custom_instructions = advanced.get('instructions', '')
+        Args:
+            advanced: Advanced config dict with style preferences
+            section_type: 'findings' or 'impression'
+            template_type: 'normal_template', 'guided_template', or 'checklist' (optional)
         
-        organization = advanced.get('organization', 'clinical_priority')
-        is_exact_order = organization == 'template_order'
+        Returns:
+            Formatted string with detailed style instructions (cached per config)
+        """
+        try:
+            return _detailed_style_guidance_cached(_freeze_advanced(advanced), section_type, template_type)
+        except TypeError:
+            # Unhashable config value - build without the cache
+            return TemplateManager._render_detailed_style_guidance(advanced, section_type, template_type)
+    
+    @staticmethod
+    def _render_detailed_style_guidance(advanced: dict, section_type: str, template_type: Optional[str]) -> str:
+        """Uncached body of _build_detailed_style_guidance"""
+        guidance_parts = []
         
-        priority_reminder = (
-            "**PRIORITY REMINDER**: Template structure takes precedence. The style settings below guide HOW to express findings, not WHAT structure to use."
-            if is_exact_order else
-            "**TEMPLATE ADAPTATION**: Emulate the template's language and content, but PRIORITIZE findings according to the organization style below."
-        )
+        # Get template type from advanced dict if not passed explicitly
+        if template_type is None:
+            template_type = advanced.get('template_type', 'normal_template')
         
-        anatomical_instr = (
-            "- Systematically cover each anatomical structure in checklist"
-            if is_exact_order else
-            "- Apply organization style below (see ORGANIZATION guidance)\n- ANTI-DUPLICATION: Each structure mentioned ONCE only\n- If Clinical Priority: Lead with significant findings + immediate context, then return to template structure\n- When returning to template flow, skip any structures already addressed in priority section"
-        )
-
-        prompt = f"""
-### FINDINGS SECTION - Checklist Mode
-
-{priority_reminder}
+        # Check if template fidelity option is available (not for checklist)
+        is_checklist = template_type == 'checklist'
+        follow_template_style = False if is_checklist else advanced.get('follow_template_style', True)
+        template_defines_style = False
+        
+        if not is_checklist:
+            # Template fidelity option available for normal/guided templates
+            if follow_template_style:
+                # Template fidelity mode - principle-based, flexible guidance
+                guidance_parts.append("""WRITING STYLE - TEMPLATE FIDELITY:
 
-**Checklist**:
-{template_content}
+Emulate the template's linguistic character:
+  - Observe the template's sentence structure patterns (complete vs. telegraphic vs. mixed)
+  - Match its formality register (formal prose vs. concise clinical notes)
+  - Mirror its use of medical terminology density and descriptor richness
+  - Maintain similar rhythm and flow in phrasing
 
-**User Dictated Findings**:
-{findings_input}
+Your goal: Write in a voice that feels consistent with the template's established style
 
-**Critical Instructions**:
-{anatomical_instr}
-- Integrate user findings where relevant
-- Report normal for structures not mentioned in user findings
+Refine for quality:
+  - British English spelling and conventions
+  - Medical terminology accuracy
+  - Grammatical correctness and clarity
+  - Measurement formatting consistency
 
-**WRITING STYLE REQUIREMENTS**:
+Example: If template uses formal complete prose like "The liver demonstrates normal echotexture with no focal lesion", continue in that register throughout rather than shifting to telegraphic style.
 
-{self._build_detailed_style_guidance(advanced, section_type='findings', template_type='checklist')}
-"""
-        
-        if custom_instructions:
-            prompt += f"\n\n**Custom Instructions**: {custom_instructions}"
+Principle: Linguistic consistency with template, not rigid constraint. Adapt naturally while maintaining the established voice.""")
+                
+                # Skip the explicit style choice - template defines the style approach
+                template_defines_style = True
         
-        return prompt
-    
-    def _build_findings_prompt_headers(
-        self, 
-        template_content: str, 
-        findings_input: str,
-        advanced: dict
-    ) -> str:
-        """
-        For 'headers' style: Section headers, AI fills content under each.
-        Style preferences extracted from advanced config metadata.
-        """
-        # Normalize config with defaults for backward compatibility
-        advanced = self._normalize_advanced_config(advanced, section_type='findings')
+        # Only proceed with style dict if template doesn't define style
+        if not template_defines_style:
+            # WRITING STYLE (merged verbosity + sentence structure for FINDINGS)
+            writing_style = advanced.get('writing_style', 'prose')
+            
+            guidance_parts.append(_FINDINGS_WRITING_STYLE_GUIDANCE.get(writing_style) or _FINDINGS_WRITING_STYLE_GUIDANCE['prose'])
         
-        custom_instructions = advanced.get('instructions', '')
+        # MEASUREMENT STYLE
+        measurement_style = advanced.get('measurement_style', 'inline')
+        if measurement_style == 'inline':
+            guidance_parts.append("MEASUREMENTS - INLINE INTEGRATION:\n  - Integrate measurements directly into descriptors\n  - Example: 'A 4cm spiculated mass...'\n  - NOT: 'A spiculated mass is present, measuring 4cm'")
+        else:
+            guidance_parts.append("MEASUREMENTS - SEPARATE CLAUSES:\n  - Report findings first, measurements after\n  - Example: 'A spiculated mass is present, measuring 4cm in maximum diameter'\n  - NOT: 'A 4cm spiculated mass...'")
         
+        # ORGANIZATION (how findings are sequenced)
         organization = advanced.get('organization', 'clinical_priority')
-        is_exact_order = organization == 'template_order'
         
-        priority_reminder = (
-            "**PRIORITY REMINDER**: Template structure takes precedence. The style settings below guide HOW to express findings, not WHAT structure to use."
-            if is_exact_order else
-            "**TEMPLATE ADAPTATION**: Emulate the template's language and content, but PRIORITIZE findings according to the organization style below."
-        )
+        # Consolidation: 'problem_oriented' is now merged into 'clinical_priority'
+        if organization == 'problem_oriented':
+            organization = 'clinical_priority'
+            
+        guidance_parts.append(_FINDINGS_ORGANIZATION_GUIDANCE.get(organization) or _FINDINGS_ORGANIZATION_GUIDANCE['clinical_priority'])
+        
+        # NEGATIVE FINDINGS HANDLING
+        if follow_template_style:
+            guidance_parts.append("""NEGATIVE FINDINGS - PRESERVE TEMPLATE LANGUAGE:
+  Keep all normal statements exactly as authored in the template.
+  Do not consolidate, rephrase, or group structures differently
+  from how they appear in the template body.
+  Enumerate structures explicitly as the template does — do not
+  collapse named structures into grouped summaries for brevity.""")
+        else:
+            negative_style = advanced.get('negative_findings_style', 'grouped')
+            if negative_style == 'distributed':
+                negative_style = 'comprehensive'
+            guidance_parts.append(_FINDINGS_NEGATIVE_GUIDANCE.get(negative_style) or _FINDINGS_NEGATIVE_GUIDANCE['grouped'])
+        
+        # DESCRIPTOR DENSITY
+        descriptor = advanced.get('descriptor_density', 'standard')
+        if descriptor == 'sparse':
+            guidance_parts.append("""
+DESCRIPTOR DENSITY - SPARSE:
+  - Use MINIMAL adjectives and descriptors
+  - Include ONLY essential descriptive words
+  - Omit shape, margins, enhancement patterns unless critical
+  - Focus on WHAT it is, not HOW it looks
+  - Applies to POSITIVE FINDINGS ONLY (not negative findings or review structure)
+  
+  EXAMPLES: 'Mass in liver' | 'Nodule in lung' | 'Lesion in kidney'
+  
+  NOTE: This controls adjectives only, independent of writing style (sentence structure/length)
+""")
+        elif descriptor == 'rich':
+            guidance_parts.append("""
+DESCRIPTOR DENSITY - RICH:
+  - Use COMPREHENSIVE adjectives and descriptors
+  - Include shape, margins, enhancement patterns, internal characteristics
+  - Add anatomical precision (segments, stations, regions)
+  - Full morphological characterization
+  - Applies to POSITIVE FINDINGS ONLY (not negative findings or review structure)
+  
+  EXAMPLES: 'Well-defined 4cm ovoid mass in segment 7 of the liver with smooth margins and homogeneous enhancement'
+  
+  NOTE: This controls adjectives only, independent of writing style (sentence structure/length)
+""")
+        else:  # standard
+            guidance_parts.append("""
+DESCRIPTOR DENSITY - STANDARD:
+  - Use BALANCED adjectives and descriptors
+  - Include key characteristics (size, basic shape/margins when relevant)
+  - Omit excessive morphological detail
+  - Standard NHS reporting level
+  - Applies to POSITIVE FINDINGS ONLY (not negative findings or review structure)
+  
+  EXAMPLES: '4cm well-defined mass in liver' | '3cm spiculated nodule in right upper lobe'
+  
+  NOTE: This controls adjectives only, independent of writing style (sentence structure/length)
+""")
+        
+        # PARAGRAPH GROUPING
+        para_grouping = advanced.get('paragraph_grouping', 'by_finding')
+        # Handle backward compatibility: map 'by_subsection' to 'by_region'
+        if para_grouping == 'by_subsection':
+            para_grouping = 'by_region'
+        
+        guidance_parts.append(_FINDINGS_PARAGRAPH_GUIDANCE.get(para_grouping) or _FINDINGS_PARAGRAPH_GUIDANCE['by_finding'])
         
-        anatomical_instr = (
-            "- Fill content under each header based on user findings\n- Leave headers in place, maintain their order"
-            if is_exact_order else
-            "- Fill content under each header based on user findings\n- Apply organization style below (see ORGANIZATION guidance)\n- ANTI-DUPLICATION: Each structure mentioned ONCE only\n- If Clinical Priority: Lead with significant findings + immediate context, then return to template structure\n- When returning to template flow, skip any structures already addressed in priority section"
-        )
-
-        prompt = f"""
-### FINDINGS SECTION - Headers Mode
-
-{priority_reminder}
-
-**Headers Provided**:
-{template_content}
-
-**User Dictated Findings**:
-{findings_input}
-
-**Critical Instructions**:
-{anatomical_instr}
-
-**WRITING STYLE REQUIREMENTS**:
-
-{self._build_detailed_style_guidance(advanced, section_type='findings', template_type='normal_template')}
-"""
+        # FORMAT (presentation style)
+        format_style = advanced.get('format', 'prose')
+        guidance_parts.append(_FINDINGS_FORMAT_GUIDANCE.get(format_style) or _FINDINGS_FORMAT_GUIDANCE['prose'])
         
-        if custom_instructions:
-            prompt += f"\n\n**Custom Instructions**: {custom_instructions}"
+        # SUBSECTION HEADERS (standalone, can combine with any format)
+        use_headers = advanced.get('use_subsection_headers', False)
+        if use_headers:
+            guidance_parts.append("""SUBSECTION HEADERS - ENABLED:
+  - Use explicit anatomical region headers in CAPS (e.g., "CHEST:", "ABDOMEN:", "PLEURA:")
+  - Blank line before each header
+  - Headers followed by content in the selected format (prose/bullets/mixed)
+  - Example with prose:
+    CHEST WALL:
+    No fracture. Soft tissues unremarkable.
+    
+    LUNGS:
+    4cm spiculated mass in RUL. Otherwise clear.
+    
+    PLEURA:
+    Small right pleural effusion.
+  - Example with bullets:
+    CHEST WALL:
+    • No fracture
+    • Soft tissues unremarkable
+    
+    LUNGS:
+    • 4cm spiculated mass in RUL
+    • Otherwise clear
+  - Use case: Structured reports, multi-region studies, teaching files, enhanced readability""")
         
-        return prompt
+        return "\n\n".join(guidance_parts)
     
-    def _build_findings_prompt_structured_template(
+    def _build_impression_prompt_with_structured_evaluation(
         self,
-        template_content: str,
-        findings_input: str,
-        advanced: dict = None
+        clinical_history: str,
+        advanced: dict,
+        recommendations_config: dict,
+        custom_instructions: str = ''
     ) -> str:
         """
-        Build prompt for structured template style.
-        Template structure is PRESERVED - AI fills in blanks only.
+        Build impression prompt with stepwise evaluation workflow.
+        Uses conditional language injection and directive boundaries.
+        
+        This replaces the old flat structure with:
+        - Step 1A: Incidental findings evaluation (conditional)
+        - Step 1B: Recommendations assessment (conditional)
+        - Step 2: Generation with Tier 1 (mandatory) vs Tier 2 (style) hierarchy
+        
+        Args:
+            clinical_history: Clinical question from patient history
+            advanced: Advanced impression config (verbosity, format, etc.)
+            recommendations_config: Dict of enabled recommendation types
+            custom_instructions: Optional custom instructions
+            
+        Returns:
+            Complete prompt string with structured evaluation workflow
         """
-        custom_instructions = advanced.get('instructions', '') if advanced else ''
+        prompt_parts = []
         
-        return f"""
-### FINDINGS SECTION - Structured Fill-In Mode
-
-**STRICT FIDELITY REQUIRED**: Preserve template structure with absolute precision.
-
-**Structured Template** (PRESERVE EXACTLY):
-```
-{template_content}
-```
-
-**User Findings**:
-{findings_input}
-
-**PLACEHOLDER FILLING RULES**:
-
-1. {{VAR}} placeholders:
-   - Search user findings for variable name (e.g., {{LVEF}} → find "LVEF" or "ejection fraction")
-   - Replace with exact value found
-   - If NOT found in input → LEAVE AS {{VAR}} (do not fabricate)
-   - **CRITICAL**: Do NOT replace {{VAR}} with phrases like "not specified", "not provided", "not measured"
-   - The {{VAR}} placeholder must remain in output for post-processing detection
-
-2. xxx measurements:
-   - Replace with measurements from findings
-   - If measurement not provided → LEAVE AS xxx EXACTLY (do not estimate)
-   - **CRITICAL**: Do NOT replace xxx with phrases like "not specified", "not provided", "not measured"
-   - The xxx placeholder must remain in output for post-processing detection
-   - When a measurement is present in the input but not explicitly labelled or formatted to match the placeholder, apply clinical and contextual inference to determine whether the value can be unambiguously attributed to that placeholder. Consider the surrounding prose, the anatomical or physiological context, the units implied or expected, and the structure of the input as a whole. If attribution is unambiguous through this reasoning, extract and fill the placeholder. Only leave a placeholder unfilled if genuine ambiguity remains after contextual inference — not simply because the input phrasing does not directly mirror the placeholder syntax.
-   
-   UNIT HANDLING:
-   When extracting a measurement to fill an xxx placeholder, the default action is always to fill. Apply the following in order:
-
-   - If the value is present with explicit, matching units — fill directly.
-   - If the value is present but units are absent or ambiguous — fill the numeric value unconditionally, append [units unconfirmed] immediately after the number, and preserve the template's expected unit label. Never leave a placeholder as xxx solely because units are missing or unconfirmed.
-   - If the numeric value itself is genuinely absent or cannot be attributed to the placeholder through any contextual reasoning — only then leave as xxx.
-
-   The threshold for leaving a placeholder unfilled is genuine absence of a numeric value, not absence of explicit units. Unit uncertainty is an annotation problem, not a filling problem.
-   
-   WRONG transformations to AVOID:
-   ✗ "diameter xxx mm" → "diameter is not specified"
-   ✗ "diameter xxx mm" → "diameter not provided"  
-   ✗ "diameter xxx mm" → "diameter not measured"
-   ✗ "measuring xxx mm" → "size not documented"
-   
-   CORRECT behavior:
-   ✓ "diameter xxx mm" → "diameter xxx mm" (unchanged if no measurement)
-
-3. [option1/option2] alternatives:
-   - SELECT the most appropriate option based on findings
-   - Remove brackets, keep selected option only
-   - Example: "[normal/increased]" → "normal" or "increased"
-
-4. // instructions:
-   - Follow guidance during generation WHEN filling content
-   - STRIP all // lines from final output (do not include in report)
-   - IMPORTANT: // instructions guide HOW to describe WHEN input exists, NOT whether to include the section header
-
-5. DETAIL AUGMENTATION:
-   
-   CORE PRINCIPLE:
-   If user provides clinically significant details not captured by template structure,
-   integrate them naturally into the most relevant template section.
-   
-   WHEN TO AUGMENT:
-   ✓ Clinical modifiers that affect diagnosis/management
-   ✓ Specific anatomical structures or distributions
-   ✓ Additional measurements or characteristics
-   ✗ Redundant information already in template
-   ✗ Vague descriptions without clinical value
-   ✗ Details contradicting template selections
-   
-   HOW TO INTEGRATE:
-   
-   Use natural medical prose connectors based on context:
-   • "with" - for associated findings or characteristics
-   • "and" - for additional co-existing features
-   • "including" or "via" - for specifications or pathways
-   • "in" - for locations or distributions
-   • Parentheses - for clarifications or classifications
-   
-   When template already uses a connector, avoid repetition:
-   • Template uses "with" + User adds "with" → Use "and" instead
-   • Template uses "including" + User adds "including" → Combine the lists
-   
-   Keep augmentations concise (1-3 additional descriptors maximum).
-   Maintain template's formal prose style.
-   
-   EXAMPLES (across systems):
-   
-   Cardiac:
-   Template: "Left ventricle is dilated"
-   User: "apical thrombus"
-   → "Left ventricle is dilated with apical thrombus"
-   
-   Vascular:
-   Template: "Origin is abnormal"
-   User: "with thrombus"
-   → "Origin is abnormal with thrombus"
-   
-   Template: "...with abnormal origin"
-   User: "with thrombus"
-   → "...with abnormal origin and thrombus"
-   
-   Template: "Collateral vessels are present"
-   User: "arc of Riolan, marginal artery"
-   → "Collateral vessels are present via arc of Riolan and marginal artery"
-   
-   MSK:
-   Template: "Fracture is present"
-   User: "displaced, comminuted, involves articular surface"
-   → "Fracture is present with displacement and comminution involving articular surface"
-   
-   Neuro:
-   Template: "Mass is present"
-   User: "left frontal with mass effect"
-   → "Mass is present in left frontal lobe with mass effect"
-   
-   Default: When uncertain about integration, prioritize template fidelity
-
-6. CONFLICT RESOLUTION:
-   Before finalising any filled section, check that all elements within it are mutually consistent. If an augmentation, additional finding, or user input contradicts the template default selection or sentence, the default must be modified or replaced — not preserved alongside the contradiction.
-   Specifically:
-
-   - If a [option1/option2] selection is contradicted by a finding you are also documenting in the same section, revise the selection to be consistent with that finding, or restructure the sentence so no contradiction exists.
-   - If the template default sentence asserts a normal or neutral state that is directly incompatible with user input, replace that sentence rather than appending to it. Appending is appropriate only when the additional finding coexists with, rather than contradicts, the default state.
-   - If user input contains measurements or values that can be unambiguously attributed to a placeholder through clinical context — even without explicit labelling — extract and fill them. Do not leave a placeholder unfilled solely because the input uses informal phrasing, provided the attribution is clinically unambiguous.
-
-   Contradiction takes priority over template fidelity. An internally inconsistent section is always a greater error than a deviation from template wording.
-
-7. BLANK SECTIONS (no corresponding input):
-   - **CRITICAL RULE**: ALL section headers MUST be preserved in output, regardless of // instructions
-   - **IMPORTANT DISTINCTION**:
-     • If template has alternatives like [present/absent] or [normal/abnormal] AND user input indicates the negative state (e.g., "no LGE", "normal wall motion"):
-       → FILL the section with the appropriate alternative (e.g., "absent", "normal")
-       → Include the section header and filled content
-       → Do NOT flag as //UNFILLED:
-     • Only flag as //UNFILLED: if there is TRULY no information about that section in the user input
-   - **EVEN IF** a // instruction says "only if X" or "describe only if abnormal":
-     • If user input provides information (even if negative/normal), FILL the section appropriately with the correct alternative
-     • Only flag as //UNFILLED: if no input provided at all
-     • The // instruction guides HOW to describe WHEN input exists, not whether to include the section
-   - **OUTPUT FORMAT FOR BLANK SECTIONS**:
-     • When a section has no input, output ONLY: //UNFILLED: [SECTION_NAME]
-     • **CRITICAL**: The //UNFILLED: marker MUST be on its own line (preceded by a newline, followed by a newline)
-     • Do NOT include the section header line above it
-     • Do NOT embed //UNFILLED: in the middle of sentences or paragraphs
-     • Post-processing will handle highlighting and display
-     • Example CORRECT format:
-       ```
-       Some previous content here.
-       
-       //UNFILLED: THROMBUS
-       
-       Next section content.
-       ```
-     • Example INCORRECT format (DO NOT DO THIS):
-       ```
-       Some text //UNFILLED: THROMBUS more text here.
-       ```
-   - Examples:
-     ```
-     // User input: "No LGE"
-     // Template: "LGE is [present/absent]"
-     // CORRECT OUTPUT:
-     LATE GADOLINIUM ENHANCEMENT
-     LGE is absent.
-     
-     // User input: (no mention of thrombus at all)
-     // Template: "// Describe only if thrombus present\nTHROMBUS\n..."
-     // CORRECT OUTPUT:
-     //UNFILLED: THROMBUS
-     
-     // User input: (no mention of aorta)
-     // Template: "AORTA\n..."
-     // CORRECT OUTPUT:
-     //UNFILLED: AORTA
-     ```
+        # === HEADER ===
+        prompt_parts.append(
+            "=== STRUCTURED EVALUATION & GENERATION WORKFLOW ===\n"
+            "\n"
+            "Complete Steps 1A-1B (evaluation), then Step 2 (generation).\n"
+            "\n"
+            f"**Clinical Question** (from history):\n{clinical_history}"
+        )
+        
+        # === STEP 1A: INCIDENTAL FINDINGS FILTER ===
+        incidental_mode = advanced.get('incidental_handling', 'action_threshold')
+        
+        if incidental_mode == 'action_threshold':
+            prompt_parts.append("""
+**STEP 1A: ACTIONABLE INCIDENTAL FILTER**
 
-**PLACEHOLDER PRESERVATION - CRITICAL**:
+Before generating impression, evaluate ALL incidental findings against clinical action criteria.
 
-When a placeholder cannot be filled from user input:
-- xxx measurements: LEAVE AS "xxx" - do not substitute explanatory text
-- {{VAR}} variables: LEAVE AS "{{VAR}}" - do not substitute explanatory text
+FOR EACH incidental finding in the report, apply this decision rubric:
 
-Post-processing will detect and highlight unfilled placeholders.
-Your job is template filling, not explaining missing data.
+1. CLINICAL ACTION TEST:
+   Q: Does this finding require ANY specific action?
+   - Specific follow-up imaging (with timeline)?
+   - Specialist referral?
+   - Further workup (biopsy, labs)?
+   - Change in management?
+   → If YES to any: INCLUDE in impression
+   → If NO to all: Continue to Test 2
 
-Examples of WRONG behavior (do not do this):
-✗ "diameter xxx mm" → "diameter is not specified"
-✗ "LVEF {{LVEF}}%" → "LVEF not provided"
-✗ "measuring xxx cm" → "size not documented"
+2. MALIGNANT POTENTIAL TEST:
+   Q: Does this finding have concerning features?
+   - Malignant potential (even if low risk)?
+   - Indeterminate features requiring characterization?
+   - Size/characteristics above reporting thresholds (e.g., lung nodule >6mm)?
+   → If YES to any: INCLUDE in impression
+   → If NO to all: Continue to Test 3
 
-Examples of CORRECT behavior:
-✓ "diameter xxx mm" → "diameter xxx mm" (unchanged)
-✓ "LVEF {{LVEF}}%" → "LVEF {{LVEF}}%" (unchanged)
-✓ "measuring xxx cm" → "measuring xxx cm" (unchanged)
+3. ESTABLISHED BENIGN PATTERN TEST:
+   Q: Does this match an established benign pattern requiring NO action?
+   
+   BENIGN PATTERNS (omit if failing Tests 1 & 2):
+   ✗ Simple cysts (renal, hepatic, ovarian): thin wall, no enhancement, water density
+   ✗ Hepatic steatosis: diffuse pattern, no focal lesion
+   ✗ Asymptomatic gallstones: if known and not causing obstruction
+   ✗ Age-appropriate degenerative changes: no instability or nerve compression
+   ✗ Atherosclerotic calcification: if not causing stenosis
+   ✗ Calcified granulomas: if stable pattern
+   
+   → If YES (established benign) AND failed Tests 1 & 2: EXCLUDE from impression
 
-**CRITICAL FIDELITY RULES**:
-- PRESERVE template structure and wording as much as possible
-- FLEXIBILITY ALLOWED for:
-  • Following // instruction guidance WHEN filling content (e.g., "// Describe only if abnormal" means describe abnormalities if present, but still flag section as UNFILLED if no input)
-  • Adding appropriate descriptors when clinically relevant (e.g., "moderate" for a 40mm mass)
-  • Minor grammatical adjustments for flow
-- STRICT PRESERVATION required for:
-  • Overall template structure and ALL section headers (never omit)
-  • Core sentence structure and medical terminology
-  • Placeholder syntax (until filled)
-- NEVER fabricate measurements or findings not in user input
-- NEVER fundamentally change the template's underlying format
-- NEVER omit section headers, even if // instructions suggest conditional inclusion
-- British English throughout
+DECISION OUTPUT: Create a list of incidental findings to INCLUDE vs EXCLUDE.""")
+        
+        elif incidental_mode == 'comprehensive':
+            prompt_parts.append("""
+**STEP 1A: INCIDENTAL FINDINGS** (Comprehensive mode active)
+
+Include ALL incidental findings identified in the report, regardless of clinical significance.
+Document both significant and minor incidental findings with appropriate language to indicate relative importance.""")
+        
+        elif incidental_mode == 'omit':
+            prompt_parts.append("""
+**STEP 1A: INCIDENTAL FINDINGS** (Omit mode active)
 
-{f"**Additional Instructions**: {custom_instructions}" if custom_instructions else ""}
+Do NOT include any incidental findings in the impression.
+Focus exclusively on findings that address the primary clinical question.
+Incidentals should remain in the Findings section only.""")
+        
+        # === STEP 1B: RECOMMENDATIONS ASSESSMENT ===
+        enabled_recs = {k: v for k, v in recommendations_config.items() if v}
+        
+        if enabled_recs:
+            prompt_parts.append(_recommendations_assessment_block(
+                frozenset(key for key in _RECOMMENDATION_KEYS if enabled_recs.get(key))
+            ))
+        else:
+            prompt_parts.append("""
+**STEP 1B: RECOMMENDATIONS** (All recommendation criteria disabled)
 
-Generate the FINDINGS section now.
-"""
+Do NOT include recommendations in the impression.""")
+        
+        # === STEP 2: GENERATION WITH TIER SYSTEM ===
+        step2_parts = ["""
+**STEP 2: GENERATE IMPRESSION**
+
+Now generate the impression using:
+
+INPUT DATA:
+- Primary findings addressing clinical question: """ + clinical_history + """
+- Incidental findings list (from Step 1A evaluation)
+- Recommendations list (from Step 1B evaluation)
+
+OUTPUT REQUIREMENTS:
+
+TIER 1 - MANDATORY CONTENT (include regardless of style):"""]
+        
+        # Build Tier 1 content list
+        tier1_items = ["✓ Diagnostic conclusions for primary findings"]
+        
+        if incidental_mode == 'action_threshold':
+            tier1_items.append("✓ Incidental findings from Step 1A (per action_threshold filter)")
+        elif incidental_mode == 'comprehensive':
+            tier1_items.append("✓ ALL incidental findings (comprehensive mode)")
+        
+        if enabled_recs:
+            tier1_items.append(
+                "✓ ALL recommendations identified in Step 1B\n"
+                "  → These are clinical requirements, not stylistic choices\n"
+                "  → Include even if verbosity=brief"
+            )
+        
+        step2_parts.append("\n".join(tier1_items))
+        
+        # Build Tier 2 - Style guidance
+        step2_parts.append("\nTIER 2 - STYLE APPLICATION (controls HOW to express Tier 1 content):\n")
+        
+        # Get style guidance from existing method (reuse the logic)
+        style_guidance = self._build_tier2_style_guidance(advanced)
+        step2_parts.append(style_guidance)
+        
+        # Add critical sequencing reminder
+        step2_parts.append("""
+CRITICAL SEQUENCING:
+1. First, ensure ALL Tier 1 content is present
+2. Then, apply Tier 2 style preferences to expression
+3. Style preferences do NOT remove Tier 1 content - they only control phrasing/structure
+
+**COMMITMENT TO DIAGNOSIS**:
+- When imaging findings are definitive, state diagnosis directly using definitive language
+- Use definitive statements (e.g., "X is present", "Y demonstrates Z") rather than hedging when evidence is clear
+- Reserve uncertainty language ("consistent with", "suspicious for") only when findings are truly non-specific
+
+**NO SEPARATE SECTIONS**:
+- The impression section must contain ALL diagnostic conclusions, recommendations, and follow-up guidance within a single unified section
+- DO NOT create separate sections such as "Recommendations", "Plan", "Follow-up", "Management"
+- All recommendations and guidance must be integrated into the impression text itself""")
+        
+        prompt_parts.append("\n".join(step2_parts))
+        
+        # Add custom instructions if provided
+        if custom_instructions and custom_instructions.strip():
+            prompt_parts.append(f"\n**Custom Instructions**: {custom_instructions}")
+        
+        return "\n\n".join(prompt_parts)
+    
+    def _build_tier2_style_guidance(self, advanced: dict) -> str:
+        """
+        Build Tier 2 style guidance (verbosity, format, differential, etc.)
+        Extracted from old _build_impression_style_guidance for reuse.
+        """
+        guidance_parts = []
+        
+        # Verbosity style
+        verbosity_style = advanced.get('verbosity_style', 'prose')
+        
+        # Backward compatibility: map old values
+        if verbosity_style == 'standard':
+            verbosity_style = 'prose'
+        elif verbosity_style == 'detailed':
+            verbosity_style = 'prose'
+        
+        guidance_parts.append(_IMPRESSION_VERBOSITY_GUIDANCE.get(verbosity_style) or _IMPRESSION_VERBOSITY_GUIDANCE['prose'])
+        
+        # Impression format (frontend sends 'format', legacy uses 'impression_format')
+        impression_format = advanced.get('format') or advanced.get('impression_format', 'prose')
+        guidance_parts.append(_IMPRESSION_FORMAT_GUIDANCE.get(impression_format) or _IMPRESSION_FORMAT_GUIDANCE['prose'])
+        
+        # Differential (frontend sends 'differential_approach' with none/if_needed/always; legacy uses 'differential_style').
+        # The table carries 'always' alongside legacy 'always_brief', so no remapping is needed
+        differential_style = advanced.get('differential_approach') or advanced.get('differential_style', 'if_needed')
+        guidance_parts.append(_IMPRESSION_DIFFERENTIAL_GUIDANCE.get(differential_style) or _IMPRESSION_DIFFERENTIAL_GUIDANCE['if_needed'])
+        
+        # Comparison terminology
+        comparison = advanced.get('comparison_terminology', 'measured')
+        if comparison == 'conservative':
+            comparison = 'simple'
+        elif comparison == 'explicit':
+            comparison = 'dated'
+        
+        guidance_parts.append(_IMPRESSION_COMPARISON_GUIDANCE.get(comparison) or _IMPRESSION_COMPARISON_GUIDANCE['measured'])
+        
+        # Measurement inclusion
+        measurements = advanced.get('measurement_inclusion', 'key_only')
+        if measurements == 'none':
+            guidance_parts.append("MEASUREMENTS:\n- Omit measurements from impression\n- Focus on diagnostic interpretation only")
+        elif measurements == 'full':
+            guidance_parts.append("MEASUREMENTS:\n- Repeat critical measurements\n- Include size for all significant findings")
+        else:  # key_only
+            guidance_parts.append("MEASUREMENTS:\n- Include key measurements for significant findings only\n- Example: '4cm mass' but not every dimension")
+        
+        return "\n\n".join(guidance_parts)
+    
+    def _build_impression_style_guidance(self, advanced: dict) -> str:
+        """
+        DEPRECATED: This method is no longer used.
+        
+        Use _build_impression_prompt_with_structured_evaluation() instead,
+        which provides structured evaluation workflow with Tier 1/Tier 2 hierarchy.
+        
+        This method is kept for backward compatibility only.
+        
+        Generate IMPRESSION-specific style guidance (old flat structure)
+        """
+        guidance_parts = []
+        
+        # Verbosity style (replaces old numeric verbosity)
+        verbosity_style = advanced.get('verbosity_style', 'prose')
+        
+        # Backward compatibility: map old values
+        if verbosity_style == 'standard':
+            verbosity_style = 'prose'
+        elif verbosity_style == 'detailed':
+            verbosity_style = 'prose'
+        
+        guidance_parts.append(_LEGACY_IMPRESSION_VERBOSITY_GUIDANCE.get(verbosity_style) or _LEGACY_IMPRESSION_VERBOSITY_GUIDANCE['prose'])
+        
+        # Impression format (frontend sends 'format', legacy uses 'impression_format')
+        impression_format = advanced.get('format') or advanced.get('impression_format', 'prose')
+        guidance_parts.append(_LEGACY_IMPRESSION_FORMAT_GUIDANCE.get(impression_format) or _LEGACY_IMPRESSION_FORMAT_GUIDANCE['prose'])
+        
+        # Differential (frontend sends 'differential_approach' with none/if_needed/always; legacy uses 'differential_style').
+        # The table carries 'always' alongside legacy 'always_brief', so no remapping is needed
+        differential_style = advanced.get('differential_approach') or advanced.get('differential_style', 'if_needed')
+        guidance_parts.append(_LEGACY_IMPRESSION_DIFFERENTIAL_GUIDANCE.get(differential_style) or _LEGACY_IMPRESSION_DIFFERENTIAL_GUIDANCE['if_needed'])
+        
+        # Comparison terminology
+        comparison = advanced.get('comparison_terminology', 'measured')
+        # Backward compatibility
+        if comparison == 'conservative':
+            comparison = 'simple'
+        elif comparison == 'explicit':
+            comparison = 'dated'
+        guidance_parts.append(_LEGACY_IMPRESSION_COMPARISON_GUIDANCE.get(comparison) or _LEGACY_IMPRESSION_COMPARISON_GUIDANCE['measured'])
+        
+        # Measurement inclusion
+        measurements = advanced.get('measurement_inclusion', 'key_only')
+        if measurements == 'none':
+            guidance_parts.append("MEASUREMENTS:\n  - Omit measurements from impression\n  - Focus on diagnostic interpretation only")
+        elif measurements == 'full':
+            guidance_parts.append("MEASUREMENTS:\n  - Repeat critical measurements\n  - Include size for all significant findings")
+        else:  # key_only
+            guidance_parts.append("MEASUREMENTS:\n  - Include key measurements for significant findings only\n  - Example: '4cm mass' but not every dimension")
+        
+        # Incidental handling
+        incidentals = advanced.get('incidental_handling', 'action_threshold')
+        if incidentals == 'omit':
+            guidance_parts.append(
+                "INCIDENTAL FINDINGS:\n"
+                "  - Do NOT include any incidental findings in the impression\n"
+                "  - Focus exclusively on findings that address the primary clinical question\n"
+                "  - Incidentals should remain in the Findings section only\n"
+                "  - This approach is for focused, targeted reporting"
+            )
+        elif incidentals == 'comprehensive':
+            guidance_parts.append(
+                "INCIDENTAL FINDINGS:\n"
+                "  - Include ALL incidental findings in the impression, regardless of clinical significance\n"
+                "  - Document both significant and minor incidental findings\n"
+                "  - Provide comprehensive coverage of all findings identified\n"
+                "  - Use appropriate language to indicate relative importance (e.g., 'Incidental note is made of...')"
+            )
+        else:  # action_threshold
+            guidance_parts.append(
+                "INCIDENTAL FINDINGS (Include if actionable):\n"
+                "  - Include incidental findings ONLY if they meet actionable criteria:\n"
+                "    • Requires specific follow-up imaging.\n"
+                "    • Has malignant potential or concerning features\n"
+                "    • Needs specialist referral or further investigation\n"
+                "    • Requires intervention or specific clinical action\n"
+                "  - OMIT incidental findings that are:\n"
+                "    • Benign and common (e.g., simple renal cysts, degenerative changes)\n"
+                "    • Below action thresholds (e.g., tiny nodules not warranting follow-up)\n"
+                "    • Require no specific follow-up or intervention\n"
+                "  - Decision rule: If the finding doesn't change immediate management or require specific action, omit from impression"
+            )
+        
+        return "\n\n".join(guidance_parts)
+    
+    def _build_impression_recommendations_guidance(self, recommendations_config: dict) -> str:
+        """
+        DEPRECATED: This method is no longer used.
+        
+        Use _build_impression_prompt_with_structured_evaluation() instead,
+        which integrates recommendations as Step 1B with MANDATORY criteria evaluation.
+        
+        This method is kept for backward compatibility only.
+        
+        Generate recommendation guidance from multi-checkbox config (old flat structure)
+        """
+        return _legacy_recommendations_guidance(
+            frozenset(key for key in _RECOMMENDATION_KEYS if recommendations_config.get(key))
+        )
+    
+    # ========================================================================
+    # Content-Style-Specific Prompt Builders for FINDINGS
+    # ========================================================================
+    
+    def _build_findings_prompt_normal_template(
+        self, 
+        template_content: str, 
+        findings_input: str,
+        advanced: dict
+    ) -> str:
+        """
+        For 'normal_template' style: AI replaces relevant normal statements with abnormalities.
+        Template contains complete normal report, user dictates only abnormalities.
+        
+        Style preferences extracted from advanced config metadata.
+        """
+        # Normalize config with defaults for backward compatibility
+        advanced = self._normalize_advanced_config(advanced, section_type='findings')
+        
+        custom_instructions = advanced.get('instructions', '')
+        custom_block = f"\n\n**Custom Instructions**: {custom_instructions}" if custom_instructions else ""
+        
+        order_text = _FINDINGS_ORDER_TEXT['normal_template', advanced.get('organization', 'clinical_priority') == 'template_order']
+
+        style_guidance = self._build_detailed_style_guidance(advanced, section_type='findings', template_type='normal_template')
+        return _NORMAL_TEMPLATE_FINDINGS_PROMPT % {
+            'priority_reminder': order_text.priority_reminder,
+            'template_content': template_content,
+            'findings_input': findings_input,
+            'anatomical_instr': order_text.anatomical_instr,
+            'style_guidance': style_guidance,
+            'custom_block': custom_block,
+        }
+    
+    def _build_findings_prompt_guided_template(
+        self, 
+        template_content: str, 
+        findings_input: str,
+        advanced: dict
+    ) -> str:
+        """
+        For 'guided_template' style: Template has content + // comment guidance.
+        The prose defines report structure; // comments are contextual enrichers.
+        Style preferences extracted from advanced config metadata.
+        """
+        # Normalize config with defaults for backward compatibility
+        advanced = self._normalize_advanced_config(advanced, section_type='findings')
+        
+        custom_instructions = advanced.get('instructions', '')
+        custom_block = f"\n\n**Custom Instructions**: {custom_instructions}" if custom_instructions else ""
+        
+        order_text = _FINDINGS_ORDER_TEXT['guided_template', advanced.get('organization', 'clinical_priority') == 'template_order']
+
+        style_guidance = self._build_detailed_style_guidance(advanced, section_type='findings', template_type='guided_template')
+        return _GUIDED_TEMPLATE_FINDINGS_PROMPT % {
+            'priority_reminder': order_text.priority_reminder,
+            'template_content': template_content,
+            'findings_input': findings_input,
+            'anatomical_instr': order_text.anatomical_instr,
+            'style_guidance': style_guidance,
+            'custom_block': custom_block,
+        }
+    
+    def _build_findings_prompt_checklist(
+        self, 
+        template_content: str, 
+        findings_input: str,
+        advanced: dict
+    ) -> str:
+        """
+        For 'checklist' style: Bullet point list to expand systematically.
+        Style preferences extracted from advanced config metadata.
+        """
+        # Normalize config with defaults for backward compatibility
+        advanced = self._normalize_advanced_config(advanced, section_type='findings')
+        
+        custom_instructions = advanced.get('instructions', '')
+        custom_block = f"\n\n**Custom Instructions**: {custom_instructions}" if custom_instructions else ""
+        
+        order_text = _FINDINGS_ORDER_TEXT['checklist', advanced.get('organization', 'clinical_priority') == 'template_order']
+
+        style_guidance = self._build_detailed_style_guidance(advanced, section_type='findings', template_type='checklist')
+        return _CHECKLIST_FINDINGS_PROMPT % {
+            'priority_reminder': order_text.priority_reminder,
+            'template_content': template_content,
+            'findings_input': findings_input,
+            'anatomical_instr': order_text.anatomical_instr,
+            'style_guidance': style_guidance,
+            'custom_block': custom_block,
+        }
+    
+    def _build_findings_prompt_headers(
+        self, 
+        template_content: str, 
+        findings_input: str,
+        advanced: dict
+    ) -> str:
+        """
+        For 'headers' style: Section headers, AI fills content under each.
+        Style preferences extracted from advanced config metadata.
+        """
+        # Normalize config with defaults for backward compatibility
+        advanced = self._normalize_advanced_config(advanced, section_type='findings')
+        
+        custom_instructions = advanced.get('instructions', '')
+        custom_block = f"\n\n**Custom Instructions**: {custom_instructions}" if custom_instructions else ""
+        
+        order_text = _FINDINGS_ORDER_TEXT['headers', advanced.get('organization', 'clinical_priority') == 'template_order']
+
+        style_guidance = self._build_detailed_style_guidance(advanced, section_type='findings', template_type='normal_template')
+        return _HEADERS_FINDINGS_PROMPT % {
+            'priority_reminder': order_text.priority_reminder,
+            'template_content': template_content,
+            'findings_input': findings_input,
+            'anatomical_instr': order_text.anatomical_instr,
+            'style_guidance': style_guidance,
+            'custom_block': custom_block,
+        }
+    
+    def _build_findings_prompt_structured_template(
+        self,
+        template_content: str,
+        findings_input: str,
+        advanced: dict = None
+    ) -> str:
+        """
+        Build prompt for structured template style.
+        Template structure is PRESERVED - AI fills in blanks only.
+        """
+        custom_instructions = advanced.get('instructions', '') if advanced else ''
+        custom_block = f"**Additional Instructions**: {custom_instructions}" if custom_instructions else ""
+        
+        return _STRUCTURED_TEMPLATE_FINDINGS_PROMPT % {
+            'template_content': template_content,
+            'findings_input': findings_input,
+            'custom_block': custom_block,
+        }
     
     # ========================================================================
     # Hybrid Section Handler
@@ -2422,74 +2905,26 @@ Generate the FINDINGS section now.
             # User MUST provide a value - if empty, omit the section
             if user_input and user_input.strip():
                 # User provided input - refine it
-                return f"""
-### {section_name} SECTION - Refine Manual Input
-
-**User Input**:
-{user_input}
-
-**Task**: Refine into proper medical prose:
-- Expand any abbreviations to full medical terms
-- Fix grammar/vocabulary errors
-- Convert shorthand notes to complete sentences
-- Maintain user's intended meaning
-- Keep concise and professional
-"""
+                return _HYBRID_REFINE_INPUT_PROMPT % {
+                    'section_name': section_name,
+                    'user_input': user_input,
+                }
             else:
                 # Manual mode but no input provided - omit section
-                return f"""
-### {section_name} SECTION - Omit
-
-No user input provided. Omit this section entirely from output.
-"""
+                return _HYBRID_OMIT_PROMPT % {'section_name': section_name}
         else:
             # AUTO-GENERATION MODE - extract from findings/metadata
             if section_name == "TECHNIQUE":
-                scan_type = scan_metadata.get('scan_type', '')
-                contrast = scan_metadata.get('contrast', '')
-                protocol_details = scan_metadata.get('protocol_details', '')
-                
-                return f"""
-### {section_name} SECTION - Auto-Generate from Metadata
-
-**Scan Information**:
-- Scan Type: {scan_type}
-- Contrast: {contrast}
-- Protocol: {protocol_details}
-
-**Task**: Generate standard technique statement:
-- Brief (1-2 sentences maximum)
-- Standard radiology phrasing
-- Include scan modality, body region, and contrast protocol if relevant
-- Example format: "Non-contrast CT of the head performed on a 64-slice scanner"
-"""
+                return _HYBRID_TECHNIQUE_PROMPT % {
+                    'section_name': section_name,
+                    'scan_type': scan_metadata.get('scan_type', ''),
+                    'contrast': scan_metadata.get('contrast', ''),
+                    'protocol_details': scan_metadata.get('protocol_details', ''),
+                }
             elif section_name == "COMPARISON":
-                return f"""
-### {section_name} SECTION - Extract from Findings
-
-**Findings Text**:
-{findings}
-
-**Task**: Extract comparison information from findings:
-- Search for mentions of prior imaging/studies
-- Keywords to look for: "previous", "prior", "comparison", "compared with", "stable", "unchanged", "interval", "as before"
-- If found → Extract and format: "Compared with [modality] [region] [date if mentioned]"
-- If NOT found → Output: "No previous imaging available for comparison"
-- Keep to one concise sentence
-"""
+                return _HYBRID_COMPARISON_PROMPT % {'section_name': section_name, 'findings': findings}
             elif section_name == "LIMITATIONS":
-                return f"""
-### {section_name} SECTION - Extract from Findings
-
-**Findings Text**:
-{findings}
-
-**Task**: Extract technical limitations from findings:
-- Search for limitation mentions in findings
-- Keywords: "limited by", "degraded by", "suboptimal", "artifact", "motion", "incomplete", "technically difficult"
-- If limitations found → Extract and state clearly in professional medical prose
-- If NO limitations found → Omit this section entirely (do NOT output "None" or any text)
-"""
+                return _HYBRID_LIMITATIONS_PROMPT % {'section_name': section_name, 'findings': findings}
         
         return ""
     
@@ -2518,7 +2953,6 @@ No user input provided. Omit this section entirely from output.
         When model_override is supplied (e.g. by the quick-report proto), that
         model is used in place of MODEL_CONFIG["TEMPLATE_REPORT_GENERATOR"].
         """
-        from pydantic import BaseModel
         from .enhancement_utils import (
             MODEL_CONFIG,
             _get_model_provider,
@@ -2563,28 +2997,15 @@ conflicts with a global rule, the skill sheet takes precedence.
         # from ~10s to ~60s+. The skill sheet and hardening preamble already
         # carry the full reasoning discipline for the ephemeral-sheet path,
         # so the analysis scaffolds are redundant for Anthropic provider.
+        inputs_block = _SKILL_SHEET_INPUTS_BLOCK % {
+            'scan_type': scan_type,
+            'clinical_history': clinical_history,
+            'findings_input': findings_input,
+        }
         if provider == "anthropic":
-            user_prompt = f"""## INPUTS
-
-Scan Type: {scan_type}
-Clinical History: {clinical_history}
-Findings: {findings_input}
-
-Generate the report now. Output the report content ONLY — no analysis, no commentary, no restatement of the skill sheet. Emit exactly the sections declared in the skill sheet's Structural Pattern, in order.
-
-**Voice.** Write as a consultant dictating clinical observations at pace — each finding a compressed declarative, noun-dense, connective-sparse. Separate observations get separate sentences; a consultant states what is, not what they saw. Hedge only where diagnostic uncertainty is genuine.
-
-**Impression.** Write as a consultant handing over to the referring clinician — they need to know what you concluded and what to do about it, and nothing else. Every sentence earns its place by changing what happens next. The voice is clinical handover: specific, unsentimental, and calibrated by consequence rather than adjective."""
+            user_prompt = inputs_block + _SKILL_SHEET_ANTHROPIC_INSTRUCTIONS
         else:
-            user_prompt = f"""## INPUTS
-
-Scan Type: {scan_type}
-Clinical History: {clinical_history}
-Findings: {findings_input}
-
-{PRE_WRITING_ANALYSIS}
-
-{VERIFICATION_CHECKLIST}"""
+            user_prompt = inputs_block + PRE_WRITING_ANALYSIS + "\n\n" + VERIFICATION_CHECKLIST
 
         # Per-provider model settings. clear_thinking is GLM-4.7-specific (other
         # Cerebras models reject it); Anthropic's non-streaming max_tokens ceiling
@@ -2629,19 +3050,14 @@ Findings: {findings_input}
         async def _generate_description():
             """Parallel lightweight call to summarise findings for the history tab."""
             try:
-                from pydantic import BaseModel as _BM
-
-                class _Desc(_BM):
-                    description: str
-
                 desc_model = "qwen/qwen3-32b"
                 desc_provider = _get_model_provider(desc_model)
                 desc_api_key = _get_api_key_for_provider(desc_provider)
                 desc_result = await _run_agent_with_model(
                     model_name=desc_model,
-                    output_type=_Desc,
+                    output_type=_ReportDescription,
                     system_prompt="You generate brief radiology report descriptions for a history tab. Return a JSON object with a single key 'description' containing 5-15 words summarising the key findings. No scan type, no patient demographics. British English.",
-                    user_prompt=f"Clinical history: {clinical_history}\nFindings: {findings_input}",
+                    user_prompt="Clinical history: %s\nFindings: %s" % (clinical_history, findings_input),
                     api_key=desc_api_key,
                     use_thinking=True,
                     model_settings={"temperature": 0.1, "max_tokens": 3000},
@@ -2650,7 +3066,6 @@ Findings: {findings_input}
             except Exception:
                 return f"Report for {scan_type}"
 
-        import asyncio
         report_task = _run_agent_with_model(
             model_name=model_name,
             output_type=str,
@@ -2703,7 +3118,6 @@ Findings: {findings_input}
         Returns:
             Dict with report_content, description, scan_type
         """
-        from pydantic import BaseModel
         from .enhancement_utils import (
             MODEL_CONFIG,
             _get_model_provider,
@@ -2739,10 +3153,14 @@ Findings: {findings_input}
         section_prompts = []
         template_structure = []  # For final template assembly
         
-        findings_input = user_inputs.get('FINDINGS', '')
-        clinical_history = user_inputs.get('CLINICAL_HISTORY', '')
+        findings_input = str(user_inputs.get('FINDINGS') or '')
+        clinical_history = str(user_inputs.get('CLINICAL_HISTORY') or '')
+        # Any section (included or not) in "Exact" mode (structured_template)
+        has_exact_mode = False
         
         for section in sorted_sections:
+            if section.get('content_style') == 'structured_template':
+                has_exact_mode = True
             if not section.get('included', True):
                 continue
                 
@@ -2759,10 +3177,9 @@ Findings: {findings_input}
 """)
                 continue
             
-            # Build section header for template
-            template_structure.append(f"{display_name}:")
-            template_structure.append(f"{{{{{section_name}}}}}")
-            template_structure.append("")
+            # Build section header for template (trailing newline leaves the blank
+            # separator line once joined)
+            template_structure.append(f"{display_name}:\n{{{{{section_name}}}}}\n")
             
             # Build section-specific prompt instructions
             if generation_mode == 'passthrough':
@@ -2876,96 +3293,26 @@ Findings: {findings_input}
         # Complete separation from old template system
         
         # Build system prompt
-        system_prompt = f"""You are an expert NHS consultant radiologist. Generate professional radiology reports in British English following NHS standards.
-
-CRITICAL: All output must use British English spelling and terminology.
-
-OUTPUT FORMAT: Provide structured JSON with three fields:
-- "report_content": Complete radiology report with proper formatting (line breaks between sections, paragraph structure)
-- "description": Brief 5-15 word summary for history (max 150 chars, exclude scan type)
-- "scan_type": Extract from context (e.g., "CT head non-contrast")
-
-CORE PRINCIPLES:
-- NO hallucination - include ONLY information from provided inputs
-- NO duplication - each finding mentioned once only
-- Protocol consistency - verify findings match scan type/protocol
-- British English throughout
-"""
-        # Determine if any section is using "Exact" mode (structured_template)
-        has_exact_mode = any(s.get('content_style') == 'structured_template' for s in sections_config)
+        system_prompt = _REPORT_SYSTEM_PROMPT
         
-        philosophy_instr = """
-=== TEMPLATE PHILOSOPHY ===
-This report contains "Flexible" and/or "Structured Fill-In" sections. 
-- FLEXIBLE SECTIONS (Normal, Guided, Checklist, Headers): 
-  • Template provides the organizational framework and style guide
-  • User's style settings control HOW findings are organized and expressed
-  • Each anatomical structure/finding mentioned ONCE only
-  
-- STRUCTURED FILL-IN SECTIONS: 
-  • Preserve template structure and wording precisely
-  • Fill placeholders following // instruction guidance
-  • Minor grammatical adjustments for natural flow only
-  • Do NOT fundamentally change core structure or terminology
-""" if has_exact_mode else """
-=== TEMPLATE PHILOSOPHY ===
-All sections in this report are "Flexible".
-- Template provides the organizational framework and style guide
-- User's style settings control HOW findings are organized and expressed  
-- Each anatomical structure/finding mentioned ONCE only
-"""
-
-        output_consistency_rule = """
-=== OUTPUT CONSISTENCY RULE ===
-Any section of the output that synthesises, summarises, or concludes from findings above it must remain faithful to the state of those findings. Specifically:
-
-- A synthesising statement must NOT assert normality or completeness for any finding that remains unfilled, unresolved, or marked //UNFILLED: in the body above.
-- A synthesising statement must NOT contradict or flatten any abnormality, augmentation, or pathological selection present in the body above.
-- Where findings are partially documented, the synthesising statement must reflect that partial state rather than defaulting to either normality or abnormality.
+        philosophy_instr = _PHILOSOPHY_WITH_EXACT if has_exact_mode else _PHILOSOPHY_FLEXIBLE_ONLY
 
-This applies to any template section that draws on preceding content — whether labelled Summary, Conclusion, Impression, Assessment, or otherwise.
-""" if has_exact_mode else ""
+        output_consistency_rule = _OUTPUT_CONSISTENCY_RULE if has_exact_mode else ""
 
         system_prompt = system_prompt + output_consistency_rule
 
         # Build user prompt
-        user_prompt = f"""Generate a radiology report for:
-
-**SCAN TYPE**: {scan_type}
-**CONTRAST**: {contrast}
-**PROTOCOL**: {protocol_details}
-
-{philosophy_instr}
-
-=== INPUT DATA ===
-
-**Clinical History**:
-{clinical_history}
-
-**Findings**:
-{findings_input}
-
-=== SECTION-SPECIFIC GENERATION INSTRUCTIONS ===
-
-{section_instructions}
-
-=== OUTPUT TEMPLATE STRUCTURE ===
-
-{template_string}
-
-=== GENERATION REQUIREMENTS ===
-
-1. Follow each section's specific instructions above
-2. Maintain section order as shown in template
-3. Use proper formatting (double line breaks between sections)
-4. Ensure report_content contains ONLY the report sections shown in template structure
-5. Clinical History: {clinical_history_instruction}
-6. Generate concise description for history tab
-7. Extract accurate scan_type
-8. NO DUPLICATION: Each anatomical structure/finding mentioned once only, regardless of organization method
-
-Generate the report now as valid JSON.
-"""
+        user_prompt = _REPORT_USER_PROMPT % {
+            'scan_type': scan_type,
+            'contrast': contrast,
+            'protocol_details': protocol_details,
+            'philosophy_instr': philosophy_instr,
+            'clinical_history': clinical_history,
+            'findings_input': findings_input,
+            'section_instructions': section_instructions,
+            'template_string': template_string,
+            'clinical_history_instruction': clinical_history_instruction,
+        }
         
         # Generate report: primary zai-glm-4.7 (Cerebras), fallback claude-sonnet-4-6 (Anthropic)
         model_name = MODEL_CONFIG["TEMPLATE_REPORT_GENERATOR"]
@@ -2981,17 +3328,12 @@ Generate the report now as valid JSON.
         if not api_key:
             raise ValueError(f"API key not configured for provider: {provider}")
         
-        class ReportOutput(BaseModel):
-            report_content: str
-            description: str
-            scan_type: str
-        
         try:
             # Try structured output first, fallback to string parsing if it fails
             try:
                 result = await _run_agent_with_model(
                 model_name=model_name,
-                output_type=ReportOutput,
+                output_type=_TemplateReportOutput,
                 system_prompt=system_prompt,
                 user_prompt=user_prompt,
                 api_key=api_key,
@@ -3014,16 +3356,11 @@ Generate the report now as valid JSON.
                 report_output = result.output
                 
                 # LINGUISTIC VALIDATION for zai-glm-4.7 (conditionally enabled)
-                import os
-                ENABLE_LINGUISTIC_VALIDATION = os.getenv("ENABLE_ZAI_GLM_LINGUISTIC_VALIDATION", "true").lower() == "true"
-                
-                if ENABLE_LINGUISTIC_VALIDATION:
+                if _ENABLE_LINGUISTIC_VALIDATION:
                     from .enhancement_utils import validate_template_linguistics
                     
                     try:
-                        print(f"\n{'='*80}")
-                        print(f"🔍 TEMPLATE LINGUISTIC VALIDATION - Starting")
-                        print(f"{'='*80}")
+                        logger.debug("Template linguistic validation starting")
                         
                         validated_content = await validate_template_linguistics(
                             report_content=report_output.report_content,
@@ -3033,19 +3370,16 @@ Generate the report now as valid JSON.
                         )
                         
                         report_output.report_content = validated_content
-                        print(f"✅ TEMPLATE LINGUISTIC VALIDATION COMPLETE")
-                        print(f"{'='*80}\n")
-                    except Exception as e:
-                        print(f"\n{'='*80}")
-                        print(f"⚠️ TEMPLATE LINGUISTIC VALIDATION FAILED - continuing with original")
-                        print(f"{'='*80}")
-                        print(f"[ERROR] {type(e).__name__}: {str(e)[:300]}")
-                        import traceback
-                        print(f"[ERROR] Traceback:")
-                        print(traceback.format_exc()[:500])
-                        print(f"{'='*80}\n")
+                        logger.debug("Template linguistic validation complete")
+                    except Exception as validation_error:
+                        logger.warning(
+                            "Template linguistic validation failed - continuing with original: %s: %.300s",
+                            type(validation_error).__name__,
+                            validation_error,
+                            exc_info=True,
+                        )
                 else:
-                    print(f"[DEBUG] Template linguistic validation disabled (ENABLE_ZAI_GLM_LINGUISTIC_VALIDATION=false)")
+                    logger.debug("Template linguistic validation disabled (ENABLE_ZAI_GLM_LINGUISTIC_VALIDATION=false)")
                 
                 # Append signature AFTER validation (or if validation disabled)
                 if user_signature:
@@ -3070,7 +3404,7 @@ Generate the report now as valid JSON.
                 )
                 
                 if is_structured_output_error:
-                    print(f"[WARNING] Structured output failed for {model_name}, falling back to string output: {e}")
+                    logger.warning("Structured output failed for %s, falling back to string output: %s", model_name, e)
                     # Fallback: Use string output and parse JSON manually
                     try:
                         # Update prompt to explicitly request JSON format
@@ -3098,18 +3432,15 @@ Generate the report now as valid JSON.
                         _log_glm_reasoning(result, f"{model_name} (Template Report Fallback) - GLM Reasoning")
                         
                         # Parse JSON from string response
-                        import json
-                        import re
-                        
                         response_text = str(result.output).strip()
                         
                         # Try to extract JSON from response (handle markdown code blocks)
-                        json_match = re.search(r'```(?:json)?\s*(\{.*?\})\s*```', response_text, re.DOTALL)
+                        json_match = _JSON_FENCED_OBJECT_RE.search(response_text)
                         if json_match:
                             json_str = json_match.group(1)
                         else:
                             # Try to find JSON object directly
-                            json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
+                            json_match = _JSON_OBJECT_RE.search(response_text)
                             if json_match:
                                 json_str = json_match.group(0)
                             else:
@@ -3125,16 +3456,11 @@ Generate the report now as valid JSON.
                         # Don't append signature yet - will append after validation
                         
                         # LINGUISTIC VALIDATION for zai-glm-4.7 (conditionally enabled)
-                        import os
-                        ENABLE_LINGUISTIC_VALIDATION = os.getenv("ENABLE_ZAI_GLM_LINGUISTIC_VALIDATION", "true").lower() == "true"
-                        
-                        if ENABLE_LINGUISTIC_VALIDATION:
+                        if _ENABLE_LINGUISTIC_VALIDATION:
                             from .enhancement_utils import validate_template_linguistics
                             
                             try:
-                                print(f"\n{'='*80}")
-                                print(f"🔍 TEMPLATE LINGUISTIC VALIDATION - Starting (fallback path)")
-                                print(f"{'='*80}")
+                                logger.debug("Template linguistic validation starting (fallback path)")
                                 
                                 validated_content = await validate_template_linguistics(
                                     report_content=report_content,
@@ -3144,18 +3470,16 @@ Generate the report now as valid JSON.
                                 )
                                 
                                 report_content = validated_content
-                                print(f"✅ TEMPLATE LINGUISTIC VALIDATION COMPLETE")
-                                print(f"{'='*80}\n")
-                            except Exception as e:
-                                print(f"\n{'='*80}")
-                                print(f"⚠️ TEMPLATE LINGUISTIC VALIDATION FAILED - continuing with original")
-                                print(f"{'='*80}")
-                                print(f"[ERROR] {type(e).__name__}: {str(e)[:300]}")
-                                print(f"{'='*80}\n")
+                                logger.debug("Template linguistic validation complete")
+                            except Exception as validation_error:
+                                logger.warning(
+                                    "Template linguistic validation failed - continuing with original: %s: %.300s",
+                                    type(validation_error).__name__,
+                                    validation_error,
+                                )
                         
                         # Append signature AFTER validation (or if validation disabled)
                         if user_signature:
-                            from types import SimpleNamespace
                             tmp = SimpleNamespace(report_content=report_content, description=description, scan_type=scan_type)
                             tmp = _append_signature_to_report(tmp, user_signature)
                             report_content = tmp.report_content
@@ -3167,7 +3491,7 @@ Generate the report now as valid JSON.
                             "model_used": model_name,
                         }
                     except Exception as fallback_error:
-                        print(f"[ERROR] Fallback parsing also failed: {fallback_error}")
+                        logger.error("Fallback parsing also failed: %s", fallback_error)
                         raise ValueError(f"Failed to generate report with {model_name}: {str(e)}. Fallback also failed: {str(fallback_error)}")
                 else:
                     # Re-raise if it's not a structured output error
@@ -3175,7 +3499,7 @@ Generate the report now as valid JSON.
         except Exception as primary_error:
             # Try Claude (Anthropic) as fallback when primary fails
             if anthropic_api_key:
-                print(f"⚠️ {model_name} failed ({type(primary_error).__name__}) - falling back to {fallback_model}")
+                logger.warning("%s failed (%s) - falling back to %s", model_name, type(primary_error).__name__, fallback_model)
                 try:
                     report_output = await _generate_report_with_claude_model(
                         fallback_model,
@@ -3192,20 +3516,46 @@ Generate the report now as valid JSON.
                         "model_used": fallback_model,
                     }
                 except Exception as fallback_error:
-                    print(f"❌ Claude fallback also failed: {type(fallback_error).__name__}")
+                    logger.error("Claude fallback also failed: %s", type(fallback_error).__name__)
                     raise ValueError(f"Failed with {model_name} and {fallback_model}. Original: {primary_error}") from primary_error
             else:
                 raise
 
+    async def generate_reports_batch(
+        self,
+        jobs: List[Dict[str, Any]],
+        max_concurrency: int = 10,
+    ) -> List[Union[Dict[str, Any], BaseException]]:
+        """
+        Generate several reports concurrently (e.g. a queue of studies).
+
+        Each job is the keyword arguments of generate_report_from_config. At most
+        max_concurrency reports are in flight; Cerebras calls are additionally
+        bounded by the shared CEREBRAS_MAX_CONCURRENT guard in enhancement_utils.
+        A failing job does not abort the batch: every job runs to completion, so
+        no report is generated in the background with its outcome unobserved.
+
+        Args:
+            jobs: generate_report_from_config kwargs (template_config, user_inputs, ...)
+            max_concurrency: Maximum reports generated at once
+
+        Returns:
+            List in job order holding each job's generate_report_from_config result,
+            or the exception it raised. Callers must check each entry.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def _generate(job: Dict[str, Any]) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.generate_report_from_config(**job)
+
+        return await asyncio.gather(*(_generate(job) for job in jobs), return_exceptions=True)
+
     @staticmethod
     @staticmethod
     async def extract_coverage_sections(skill_sheet: str, api_key: str) -> List[str]:
         """Extract anatomical coverage section names from a skill sheet using an LLM."""
         from .enhancement_utils import MODEL_CONFIG, _run_agent_with_model
-        from pydantic import BaseModel
-
-        class CoverageSections(BaseModel):
-            sections: List[str]
 
         system_prompt = (
             "You are a radiology report structure assistant. Extract the anatomical "
@@ -3236,7 +3586,7 @@ Return a JSON object: {{"sections": ["LIVER", "BILIARY SYSTEM", ...]}}"""
 
         result = await _run_agent_with_model(
             model_name=model_name,
-            output_type=CoverageSections,
+            output_type=_CoverageSections,
             system_prompt=system_prompt,
             user_prompt=user_prompt,
             api_key=api_key,
@@ -3253,10 +3603,8 @@ Return a JSON object: {{"sections": ["LIVER", "BILIARY SYSTEM", ...]}}"""
         Extract a JSON object from a GLM string response.
         Handles markdown code fences and stray leading/trailing text.
         """
-        import json, re
-
         # Strip markdown code fences (```json ... ``` or ``` ... ```)
-        fence_match = re.search(r'```(?:json)?\s*([\s\S]*?)```', raw)
+        fence_match = _JSON_FENCE_RE.search(raw)
         candidate = fence_match.group(1).strip() if fence_match else raw.strip()
 
         # Try direct parse first
@@ -3264,7 +3612,7 @@ Return a JSON object: {{"sections": ["LIVER", "BILIARY SYSTEM", ...]}}"""
             parsed = json.loads(candidate)
         except json.JSONDecodeError:
             # Find the outermost { ... } block
-            brace_match = re.search(r'\{[\s\S]*\}', candidate)
+            brace_match = _JSON_OBJECT_RE.search(candidate)
             if not brace_match:
                 raise ValueError(f"No JSON object found in model response. Raw: {raw[:300]}")
             parsed = json.loads(brace_match.group())
@@ -0,0 +1,85 @@
+"""
+Unit tests for ``prompt_manager.PromptManager`` loading and rendering.
+
+Rendering is pure string work with inline prompt dicts; loading reads the
+bundled ``prompts/`` directory — no fixtures, no DB, no client.
+"""
+from __future__ import annotations
+
+import pytest
+
+from rapid_reports_ai.prompt_manager import PromptManager
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# render_prompt
+# ─────────────────────────────────────────────────────────────────────────────
+
+def test_render_prompt_substitutes_few_variables():
+    pm = PromptManager()
+    prompt = {"template": "Scan: {{SCAN_TYPE}}\nHistory: {{CLINICAL_HISTORY}}"}
+    out = pm.render_prompt(prompt, {"SCAN_TYPE": "CT head", "CLINICAL_HISTORY": "fall"})
+    assert out == "Scan: CT head\nHistory: fall"
+
+
+def test_render_prompt_many_variables_leaves_unknown_placeholders():
+    pm = PromptManager()
+    names = [f"VAR_{i}" for i in range(12)]
+    prompt = {"template": " | ".join(f"{{{{{n}}}}}" for n in names) + " {{UNKNOWN}}"}
+    out = pm.render_prompt(prompt, {n: n.lower() for n in names})
+    assert out == " | ".join(n.lower() for n in names) + " {{UNKNOWN}}"
+
+
+def test_render_prompt_does_not_rescan_substituted_values():
+    """A value that itself contains a placeholder is inserted verbatim."""
+    pm = PromptManager()
+    names = [f"VAR_{i}" for i in range(10)]
+    variables = {n: "" for n in names}
+    variables["VAR_0"] = "{{VAR_1}}"
+    prompt = {"template": "{{VAR_0}}{{VAR_1}}"}
+    assert pm.render_prompt(prompt, variables) == "{{VAR_1}}"
+
+
+def test_render_prompt_returns_static_template_unchanged():
+    pm = PromptManager()
+    prompt = {"template": "No placeholders here."}
+    assert pm.render_prompt(prompt, {"FINDINGS": "x"}) == "No placeholders here."
+    assert pm.render_prompt({"template": "{{FINDINGS}}"}) == "{{FINDINGS}}"
+
+
+def test_render_prompt_coerces_non_string_values():
+    pm = PromptManager()
+    prompt = {"template": "{{COUNT}} / {{CLINICAL_HISTORY}}"}
+    out = pm.render_prompt(prompt, {"COUNT": 3, "CLINICAL_HISTORY": None})
+    assert out == "3 / "
+
+
+def test_render_prompt_strict_drops_unknown_placeholders():
+    pm = PromptManager()
+    prompt = {"template": "{{FINDINGS}}|{{SIGNATURE}}"}
+    assert pm.render_prompt(prompt, {"FINDINGS": "x"}, strict=True) == "x|"
+    assert pm.render_prompt(prompt, strict=True) == "|"
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# load_prompt
+# ─────────────────────────────────────────────────────────────────────────────
+
+def test_load_prompt_returns_cached_read_only_mapping():
+    pm = PromptManager()
+    first = pm.load_prompt("radiology_report")
+    second = pm.load_prompt("radiology_report")
+    assert first is second
+    assert "template" in first
+    with pytest.raises(TypeError):
+        first["template"] = ""
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# extract_variables
+# ─────────────────────────────────────────────────────────────────────────────
+
+def test_extract_variables_returns_unique_names_in_order():
+    pm = PromptManager()
+    names = pm.extract_variables("{{FINDINGS}} {{CLINICAL_HISTORY}} {{FINDINGS}} {{SCAN_TYPE}}")
+    assert names == ["FINDINGS", "CLINICAL_HISTORY", "SCAN_TYPE"]
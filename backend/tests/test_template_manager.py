@@ -0,0 +1,405 @@
+"""
+Unit tests for the pure template helpers on ``template_manager.TemplateManager``.
+
+Placeholder extraction and structured-template validation are plain string
+work — no fixtures, no DB, no client. The wizard LLM helpers are exercised
+with ``_run_agent_with_model`` monkeypatched, so no model is ever called.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from rapid_reports_ai import enhancement_utils, template_manager
+from rapid_reports_ai.template_manager import TemplateManager
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# extract_variables
+# ─────────────────────────────────────────────────────────────────────────────
+
+def test_extract_variables_returns_unique_names_in_order():
+    tm = TemplateManager()
+    names = tm.extract_variables("{{FINDINGS}} {{CLINICAL_HISTORY}} {{FINDINGS}} {single}")
+    assert names == ["FINDINGS", "CLINICAL_HISTORY"]
+
+
+def test_extract_variables_result_is_safe_to_mutate():
+    """Results are cached per template; callers still get their own list."""
+    tm = TemplateManager()
+    first = tm.extract_variables("{{A}} {{B}}")
+    first.append("C")
+    assert tm.extract_variables("{{A}} {{B}}") == ["A", "B"]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# extract_structured_placeholders
+# ─────────────────────────────────────────────────────────────────────────────
+
+STRUCTURED_TEMPLATE = """LV: {LV_SIZE} with EF xxx%.
+RV is [normal/dilated] in size.
+// Describe any wall motion abnormality
+//UNFILLED: septum
+Aorta measures XXX mm, {LV_SIZE} again."""
+
+
+def test_extract_structured_placeholders_dedupes_in_first_seen_order():
+    tm = TemplateManager()
+    placeholders = tm.extract_structured_placeholders("{B} {A} {B} [x/y] [a/b] [x/y]")
+    assert placeholders["variables"] == ["B", "A"]
+    assert placeholders["alternatives"] == ["x/y", "a/b"]
+
+
+def test_extract_structured_placeholders_collects_each_kind():
+    tm = TemplateManager()
+    placeholders = tm.extract_structured_placeholders(STRUCTURED_TEMPLATE)
+    assert placeholders["variables"] == ["LV_SIZE"]
+    assert placeholders["measurements"] == ["xxx", "XXX"]
+    assert placeholders["alternatives"] == ["normal/dilated"]
+    assert placeholders["instructions"] == ["Describe any wall motion abnormality"]
+
+
+def test_extract_structured_placeholders_reads_placeholders_on_instruction_lines():
+    tm = TemplateManager()
+    placeholders = tm.extract_structured_placeholders("// Compare {LV_SIZE} with prior\nNo guidance here.")
+    assert placeholders["variables"] == ["LV_SIZE"]
+    assert placeholders["instructions"] == ["Compare {LV_SIZE} with prior"]
+    assert tm.extract_structured_placeholders("{A} / {B}")["instructions"] == []
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# validate_structured_template
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _types(entries):
+    return [entry["type"] for entry in entries]
+
+
+def test_validate_clean_template_reports_stats_and_duplicates():
+    tm = TemplateManager()
+    result = tm.validate_structured_template(STRUCTURED_TEMPLATE)
+    assert result["valid"] is True
+    assert result["errors"] == []
+    assert _types(result["warnings"]) == ["duplicate_variables"]
+    assert result["warnings"][0]["message"] == "Duplicate variable names found: LV_SIZE"
+    assert result["stats"] == {
+        "variables": 1,
+        "measurements": 2,
+        "alternatives": 1,
+        "instructions": 1,
+    }
+
+
+def test_validate_flags_unbalanced_brackets_and_unclosed_variables():
+    tm = TemplateManager()
+    result = tm.validate_structured_template("Size [normal/large\nValue {LV_SIZE here\nOther VAR} end")
+    assert result["valid"] is False
+    assert result["errors"] == [
+        {"type": "unbalanced_bracket", "message": "Unbalanced brackets at line 1", "line": 1},
+        {"type": "unclosed_variable", "message": 'Unclosed variable "{LV_SIZE" at line 2', "line": 2},
+        {"type": "unclosed_variable", "message": 'Unclosed variable "VAR}" at line 3', "line": 3},
+    ]
+
+
+def test_validate_flags_double_braces():
+    tm = TemplateManager()
+    result = tm.validate_structured_template("Value {{LV_SIZE}}")
+    assert "malformed_braces" in _types(result["errors"])
+
+
+def test_validate_warns_on_unbracketed_alternatives_but_not_units():
+    tm = TemplateManager()
+    result = tm.validate_structured_template(
+        "Flow 5 l/min, {RATE} bpm, LVEDVi 60 ml/m2.\nValve is normal/thickened.\nRV [normal/dilated]."
+    )
+    assert result["warnings"] == [
+        {
+            "type": "unbracketed_alternative",
+            "message": 'Alternative "normal/thickened" at line 2 should be wrapped in brackets: [normal/thickened]',
+            "line": 2,
+        }
+    ]
+
+
+def test_validate_reports_repeated_findings_on_a_line_once():
+    tm = TemplateManager()
+    result = tm.validate_structured_template("normal/abnormal and normal/abnormal {LV {LV\nnormal/abnormal")
+    alternatives = [w for w in result["warnings"] if w["type"] == "unbracketed_alternative"]
+    assert [w["line"] for w in alternatives] == [1, 2]
+    assert [e["message"] for e in result["errors"]] == ['Unclosed variable "{LV" at line 1']
+
+
+def test_validate_warns_on_too_many_and_missing_placeholders():
+    tm = TemplateManager()
+    many = " ".join(f"{{V{i}}}" for i in range(11))
+    assert "too_many_variables" in _types(tm.validate_structured_template(many)["warnings"])
+    plain = tm.validate_structured_template("Normal study.")
+    assert _types(plain["warnings"]) == ["no_placeholders"]
+    assert tm.validate_structured_template("")["warnings"] == []
+    measured = tm.validate_structured_template("Liver measures XXX cm.\nSpleen xxx cm.")
+    assert measured["warnings"] == [] and measured["stats"]["measurements"] == 2
+
+
+def test_validate_structured_template_is_cached_but_safe_to_mutate():
+    tm = TemplateManager()
+    template_manager._structured_template_validation_cached.cache_clear()
+    first = tm.validate_structured_template(STRUCTURED_TEMPLATE)
+    first["warnings"][0]["message"] = "changed"
+    first["placeholders"]["variables"].append("OTHER")
+    second = tm.validate_structured_template(STRUCTURED_TEMPLATE)
+    assert second["warnings"][0]["message"] == "Duplicate variable names found: LV_SIZE"
+    assert second["placeholders"]["variables"] == ["LV_SIZE"]
+    assert template_manager._structured_template_validation_cached.cache_info().hits == 1
+
+
+def test_validate_structured_templates_matches_single_validation_in_order():
+    tm = TemplateManager()
+    templates = [STRUCTURED_TEMPLATE, "Value {LV_SIZE here", STRUCTURED_TEMPLATE]
+    results = tm.validate_structured_templates(templates)
+    assert results == [tm.validate_structured_template(t) for t in templates]
+    # Repeated templates still get independent results
+    results[0]["errors"].append({"type": "mutated"})
+    results[0]["stats"]["variables"] = -1
+    assert results[2] == tm.validate_structured_template(STRUCTURED_TEMPLATE)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# _normalize_advanced_config
+# ─────────────────────────────────────────────────────────────────────────────
+
+def test_normalize_advanced_config_fills_defaults_without_sharing_state():
+    tm = TemplateManager()
+    first = tm._normalize_advanced_config({"format": "bullets"})
+    assert first["format"] == "bullets"
+    assert first["writing_style"] == "prose"
+    first["writing_style"] = "concise"
+    assert tm._normalize_advanced_config({})["writing_style"] == "prose"
+
+
+def test_normalize_advanced_config_maps_legacy_impression_keys():
+    tm = TemplateManager()
+    merged = tm._normalize_advanced_config(
+        {"format": "bullets", "differential_approach": "always", "verbosity": 0},
+        section_type="impression",
+    )
+    assert merged["impression_format"] == "bullets"
+    assert merged["differential_style"] == "always_brief"
+    assert merged["verbosity_style"] == "brief"
+    assert merged["recommendations"]["specialist_referral"] is True
+
+
+def test_normalize_advanced_config_recommendations_are_a_fresh_plain_dict():
+    tm = TemplateManager()
+    first = tm._normalize_advanced_config({}, section_type="impression")
+    assert type(first["recommendations"]) is dict
+    json.dumps(first)
+    first["recommendations"]["imaging_followup"] = True
+    second = tm._normalize_advanced_config({}, section_type="impression")
+    assert second["recommendations"]["imaging_followup"] is False
+
+
+def test_style_guidance_falls_back_to_default_entries():
+    tm = TemplateManager()
+    guidance = tm._build_tier2_style_guidance({"verbosity_style": "detailed", "format": "unknown"})
+    assert guidance.startswith(template_manager._IMPRESSION_VERBOSITY_GUIDANCE["prose"])
+    assert template_manager._IMPRESSION_FORMAT_GUIDANCE["prose"] in guidance
+    with pytest.raises(TypeError):
+        template_manager._IMPRESSION_FORMAT_GUIDANCE["prose"] = ""
+
+
+def test_detailed_style_guidance_is_cached_per_config():
+    template_manager._detailed_style_guidance_cached.cache_clear()
+    advanced = {"writing_style": "concise", "format": "bullets", "recommendations": {"further_workup": True}}
+    first = TemplateManager._build_detailed_style_guidance(advanced)
+    second = TemplateManager._build_detailed_style_guidance(dict(reversed(advanced.items())))
+    assert first is second
+    assert template_manager._detailed_style_guidance_cached.cache_info().hits == 1
+    unhashable = TemplateManager._build_detailed_style_guidance({**advanced, "extra": {1, 2}})
+    assert unhashable == first
+
+
+def test_findings_prompt_follows_organization_setting():
+    tm = TemplateManager()
+    exact = tm._build_findings_prompt_checklist("Liver:", "normal", {"organization": "template_order"})
+    adaptive = tm._build_findings_prompt_checklist("Liver:", "normal", {"organization": "clinical_priority"})
+    assert template_manager._TEMPLATE_ORDER_REMINDER in exact
+    assert "- Systematically cover each anatomical structure in checklist" in exact
+    assert template_manager._TEMPLATE_ADAPTATION_REMINDER in adaptive
+
+
+def test_recommendations_block_lists_only_enabled_criteria():
+    tm = TemplateManager()
+    prompt = tm._build_impression_prompt_with_structured_evaluation(
+        clinical_history="cough",
+        advanced={},
+        recommendations_config={"imaging_followup": True, "further_workup": False},
+        custom_instructions="",
+    )
+    assert "IMAGING FOLLOW-UP" in prompt
+    assert "FURTHER WORK-UP" not in prompt
+    assert tm._build_impression_recommendations_guidance({}) == "- Do NOT include any recommendations"
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Wizard LLM response cache
+# ─────────────────────────────────────────────────────────────────────────────
+
+@pytest.fixture
+def fake_agent(monkeypatch):
+    """Record agent calls and answer with a canned output."""
+    calls = []
+
+    async def _fake_run_agent_with_model(**kwargs):
+        calls.append(kwargs)
+        return SimpleNamespace(
+            output=SimpleNamespace(content=f"content {len(calls)}", suggestions=[f"tip {len(calls)}"])
+        )
+
+    monkeypatch.setattr(enhancement_utils, "_run_agent_with_model", _fake_run_agent_with_model)
+    monkeypatch.setattr(template_manager, "_WIZARD_RESPONSE_CACHE", {})
+    return calls
+
+
+async def test_generate_findings_content_reuses_identical_request(fake_agent):
+    tm = TemplateManager()
+    args = dict(scan_type="CT chest", contrast="With IV contrast", protocol_details="",
+                content_style="checklist", api_key="test")
+    assert await tm.generate_findings_content(**args) == "content 1"
+    assert await tm.generate_findings_content(**args) == "content 1"
+    assert await tm.generate_findings_content(**{**args, "content_style": "headers"}) == "content 2"
+    assert len(fake_agent) == 2
+
+
+async def test_generate_findings_content_regenerate_bypasses_cache(fake_agent):
+    tm = TemplateManager()
+    args = dict(scan_type="CT chest", contrast="With IV contrast", protocol_details="",
+                content_style="checklist", api_key="test")
+    await tm.generate_findings_content(**args)
+    assert await tm.generate_findings_content(**args, use_cache=False) == "content 2"
+    # The fresh result replaces the cached one
+    assert await tm.generate_findings_content(**args) == "content 2"
+    assert len(fake_agent) == 2
+
+
+async def test_generate_findings_content_ignores_stray_whitespace(fake_agent):
+    tm = TemplateManager()
+    args = dict(contrast="With IV contrast", content_style="checklist", api_key="test")
+    await tm.generate_findings_content(scan_type="CT chest", protocol_details="",
+                                       instructions="Review lungs\nThen mediastinum", **args)
+    again = await tm.generate_findings_content(scan_type="  CT   chest ", protocol_details="   ",
+                                               instructions="Review  lungs \n Then mediastinum\n", **args)
+    assert again == "content 1"
+    assert len(fake_agent) == 1
+    assert "Instructions: Review lungs\nThen mediastinum" in fake_agent[0]["user_prompt"]
+
+
+async def test_generate_findings_content_keeps_static_prompt_prefix(fake_agent):
+    """Request inputs come after the style rules, so calls share a cacheable prefix."""
+    tm = TemplateManager()
+    for scan_type in ("CT chest", "MRI brain"):
+        await tm.generate_findings_content(scan_type=scan_type, contrast="None", protocol_details="",
+                                           content_style="structured_template", api_key="test")
+    first, second = (call["user_prompt"] for call in fake_agent)
+    assert fake_agent[0]["system_prompt"] == fake_agent[1]["system_prompt"]
+    static_rules = first[:first.index("Scan Type:")]
+    assert "CRITICAL PLACEHOLDER RULES" in static_rules
+    assert second.startswith(static_rules)
+
+
+async def test_suggest_instructions_cached_list_is_a_copy(fake_agent):
+    tm = TemplateManager()
+    first = await tm.suggest_instructions("IMPRESSION", "CT chest", api_key="test")
+    first.append("mutated")
+    assert await tm.suggest_instructions("IMPRESSION", "CT chest", api_key="test") == ["tip 1"]
+    assert len(fake_agent) == 1
+
+
+def test_suggest_instructions_endpoint_regenerate_bypasses_cache(client, fake_agent, monkeypatch):
+    from rapid_reports_ai import main
+    from rapid_reports_ai.auth import get_current_user
+
+    main.app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(id=1)
+    monkeypatch.setattr(main, "get_system_api_key", lambda *args: "test")
+    body = {"section": "IMPRESSION", "scan_type": "CT chest"}
+
+    def suggest(**extra):
+        response = client.post("/api/templates/suggest-instructions", json={**body, **extra})
+        return response.json()["suggestions"]
+
+    assert suggest() == ["tip 1"]
+    assert suggest() == ["tip 1"]
+    assert suggest(regenerate=True) == ["tip 2"]
+    # The fresh suggestion replaces the cached one
+    assert suggest() == ["tip 2"]
+    assert len(fake_agent) == 2
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Template linguistic validation cache
+# ─────────────────────────────────────────────────────────────────────────────
+
+async def test_validate_template_linguistics_reuses_identical_request(monkeypatch):
+    calls = []
+
+    async def _fake_run_agent_with_model(**kwargs):
+        calls.append(kwargs)
+        return SimpleNamespace(output=f"Refined report number {len(calls)}. " * 3)
+
+    monkeypatch.setattr(enhancement_utils, "_run_agent_with_model", _fake_run_agent_with_model)
+    monkeypatch.setattr(enhancement_utils, "_get_api_key_for_provider", lambda provider: "test")
+    monkeypatch.setattr(enhancement_utils, "_TEMPLATE_VALIDATION_CACHE", {})
+    config = {"sections": [{"name": "FINDINGS", "advanced": {"writing_style": "concise"}}]}
+    inputs = {"FINDINGS": "liver lesion"}
+
+    first = await enhancement_utils.validate_template_linguistics("Report A", config, inputs, "CT")
+    assert await enhancement_utils.validate_template_linguistics("Report A", config, inputs, "CT") == first
+    await enhancement_utils.validate_template_linguistics("Report B", config, inputs, "CT")
+    await enhancement_utils.validate_template_linguistics("Report A", config, inputs, "MRI")
+    assert len(calls) == 3
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# generate_reports_batch
+# ─────────────────────────────────────────────────────────────────────────────
+
+async def test_generate_reports_batch_bounds_concurrency_and_keeps_order(monkeypatch):
+    tm = TemplateManager()
+    in_flight, peak = 0, 0
+
+    async def _fake_generate(template_config, user_inputs, user_signature=None, model_override=None):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01 * (3 - template_config["n"] % 3))
+        in_flight -= 1
+        return {"report_content": f"report {template_config['n']}"}
+
+    monkeypatch.setattr(tm, "generate_report_from_config", _fake_generate)
+    jobs = [{"template_config": {"n": n}, "user_inputs": {}} for n in range(7)]
+    results = await tm.generate_reports_batch(jobs, max_concurrency=3)
+    assert [r["report_content"] for r in results] == [f"report {n}" for n in range(7)]
+    assert peak == 3
+
+
+async def test_generate_reports_batch_returns_failures_in_place(monkeypatch):
+    tm = TemplateManager()
+    finished = []
+
+    async def _fake_generate(template_config, user_inputs, user_signature=None, model_override=None):
+        n = template_config["n"]
+        if n == 1:
+            raise ValueError("model unavailable")
+        await asyncio.sleep(0.01)
+        finished.append(n)
+        return {"report_content": f"report {n}"}
+
+    monkeypatch.setattr(tm, "generate_report_from_config", _fake_generate)
+    jobs = [{"template_config": {"n": n}, "user_inputs": {}} for n in range(4)]
+    results = await tm.generate_reports_batch(jobs, max_concurrency=2)
+    # Every other job completed before the batch returned
+    assert sorted(finished) == [0, 2, 3]
+    assert isinstance(results[1], ValueError)
+    assert [r["report_content"] for i, r in enumerate(results) if i != 1] == ["report 0", "report 2", "report 3"]